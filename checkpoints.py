@@ -0,0 +1,98 @@
+import numpy as np
+
+# NOTE: Copy-on-write checkpoints of a soft body's state (positions + velocities) for undo.
+# The state is split into blocks of BLOCK_VERTICES consecutive vertices. A checkpoint is a
+# list of references to immutable blocks: a new snapshot copies only the blocks that changed
+# since the previous checkpoint and shares the rest, so a squeeze that moved one region of a
+# large mesh costs that region, not the mesh. Blocks no checkpoint references any more are
+# freed. When the stored blocks exceed the memory budget the oldest checkpoints are dropped.
+# A block counts as changed once any value moved by more than CHANGE_TOLERANCE, so a mesh that
+# is still settling by tiny amounts everywhere does not copy every block on each snapshot.
+
+BLOCK_VERTICES = 256
+CHANGE_TOLERANCE = 1e-4 # Mesh units (positions) / units per second (velocities)
+CHECKPOINT_BUDGET = 64 * 1024 * 1024 # Bytes of block data kept for undo
+MAX_CHECKPOINTS = 64
+
+
+class CheckpointStore:
+    def __init__(self, budget=CHECKPOINT_BUDGET, max_checkpoints=MAX_CHECKPOINTS):
+        self.budget = budget
+        self.max_checkpoints = max_checkpoints
+        self.checkpoints = [] # Oldest first; each is a list of block ids
+        self.blocks = {}      # Block id -> (BLOCK_VERTICES, 6) float32 array (read-only)
+        self.refs = {}        # Block id -> number of checkpoints referencing it
+        self.next_id = 0
+        self.num_vertices = None
+        self.latest = None    # Full state of the newest checkpoint (diff base), padded to whole blocks
+        self.bytes = 0
+
+    def _pack(self, positions, velocities):
+        n = len(positions)
+        padded = -(-n // BLOCK_VERTICES) * BLOCK_VERTICES
+        state = np.zeros((padded, 6), dtype=np.float32)
+        state[:n, :3] = positions
+        state[:n, 3:] = velocities
+        return state.reshape(-1, BLOCK_VERTICES, 6)
+
+    def snapshot(self, positions, velocities):
+        """ Stores the state as a new checkpoint. Returns the number of blocks copied. """
+        if self.num_vertices != len(positions):
+            self.clear() # Topology changed (cut): older checkpoints no longer fit the mesh
+            self.num_vertices = len(positions)
+        state = self._pack(positions, velocities)
+
+        if self.latest is None:
+            changed = np.arange(len(state))
+            ids = [None] * len(state)
+        else:
+            changed = np.flatnonzero(np.abs(state - self.latest).max(axis=(1, 2)) > CHANGE_TOLERANCE)
+            ids = list(self.checkpoints[-1])
+        for b in changed:
+            block = state[b].copy()
+            block.flags.writeable = False
+            ids[b] = self.next_id
+            self.blocks[self.next_id] = block
+            self.refs[self.next_id] = 0
+            self.bytes += block.nbytes
+            self.next_id += 1
+        for block_id in ids:
+            self.refs[block_id] += 1
+        self.checkpoints.append(ids)
+        # Diff base = what is stored, so skipped sub-tolerance changes cannot add up over snapshots
+        if self.latest is None:
+            self.latest = state
+        else:
+            self.latest[changed] = state[changed]
+
+        while len(self.checkpoints) > 1 and (self.bytes > self.budget or len(self.checkpoints) > self.max_checkpoints):
+            self._release(self.checkpoints.pop(0))
+        return len(changed)
+
+    def undo(self):
+        """ Removes the newest checkpoint and returns its (positions, velocities), or None if empty. """
+        if not self.checkpoints:
+            return None
+        ids = self.checkpoints.pop()
+        state = np.stack([self.blocks[i] for i in ids]).reshape(-1, 6)[:self.num_vertices]
+        self._release(ids)
+        self.latest = self._materialize(self.checkpoints[-1]) if self.checkpoints else None
+        return state[:, :3].copy(), state[:, 3:].copy()
+
+    def _materialize(self, ids):
+        return np.stack([self.blocks[i] for i in ids])
+
+    def _release(self, ids):
+        for block_id in ids:
+            self.refs[block_id] -= 1
+            if self.refs[block_id] == 0:
+                self.bytes -= self.blocks.pop(block_id).nbytes
+                del self.refs[block_id]
+
+    def clear(self):
+        self.checkpoints, self.blocks, self.refs = [], {}, {}
+        self.latest = None
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self.checkpoints)
@@ -87,13 +87,13 @@ def deform_mesh(points, normals, cutter_pos, cut_radius=1.5, depth_factor=0.8):
             
     return deformed_points, intensities
 
-def save_to_ply(filename, points, faces, colors):
+def save_to_ply(filename, points, faces, colors, binary=False):
     """
     Saves the mesh to a PLY file (readable by standard 3D viewers).
-    Supports vertex colors.
+    Supports vertex colors. binary=True writes a little-endian file that loads much faster.
     """
     header = f"""ply
-format ascii 1.0
+format {'binary_little_endian' if binary else 'ascii'} 1.0
 element vertex {len(points)}
 property float x
 property float y
@@ -106,6 +106,20 @@ property list uchar int vertex_index
 end_header
 """
     print(f"Saving to {filename}...")
+    if binary:
+        vertex_block = np.zeros(len(points), dtype=[('p', '<f4', (3,)), ('c', 'u1', (3,))])
+        vertex_block['p'] = points
+        vertex_block['c'] = colors
+        face_block = np.zeros(len(faces), dtype=[('n', 'u1'), ('idx', '<i4', (4,))])
+        face_block['n'] = 4
+        face_block['idx'] = faces
+        with open(filename, 'wb') as f:
+            f.write(header.encode('ascii'))
+            f.write(vertex_block.tobytes())
+            f.write(face_block.tobytes())
+        print("Done.")
+        return
+
     with open(filename, 'w') as f:
         f.write(header)
         # Write Vertices + Colors
@@ -0,0 +1,365 @@
+import os
+import sys
+import json
+import time
+import zlib
+import queue
+import struct
+import bisect
+import threading
+import numpy as np
+from soft_body import column_view
+
+# NOTE: Compressed recording of deformation sessions (.dcap) and a playback viewer.
+#
+#   DCAP1\n
+#   {"vertices": N, "triangles": T, "step": ..., "keyframe_interval": K, ...}\n
+#   chunk*: <u4 kind> <u4 first frame> <u4 frame count> <u4 payload bytes> <zlib payload>
+#
+# Chunk 0 (KIND_MESH) holds the rest pose and triangles, so a capture plays back without
+# the original model. Every KIND_FRAMES chunk starts with a keyframe; a frame stores only the
+# vertices whose quantized displacement (position - rest, in units of 'step') changed since
+# the previous frame, as index gaps + integer deltas. Seeking decodes one chunk from its keyframe.
+# Looking a frame up by time reads only FRAME_HEADERs: the first frame time of every chunk when
+# the file is opened, the whole chunk's times once when it is first searched (no frame decoded).
+# The render thread only copies the displayed positions into a queue; quantizing, encoding and
+# compression run on the writer thread. Vertices added after the capture started (cuts) are not recorded.
+#
+#   python deformation_capture.py play <file.dcap>  -> playback viewer (space: pause, arrows: step)
+#   python deformation_capture.py info <file.dcap>  -> frame count, duration, size
+
+CAPTURE_MAGIC = b"DCAP1\n"
+CAPTURE_EXTENSION = ".dcap"
+CAPTURE_FOLDER = "Captures"
+QUANT_STEP = 1e-3        # Displacement resolution in mesh units (organs are normalized to 10 units)
+KEYFRAME_INTERVAL = 60   # Frames per chunk; seeking decodes at most this many frames
+QUEUE_FRAMES = 120       # Frames buffered for the writer; newer frames are dropped once it is full
+ZLIB_LEVEL = 3
+
+KIND_MESH = 0
+KIND_FRAMES = 1
+CHUNK_HEADER = struct.Struct("<IIII")
+FRAME_HEADER = struct.Struct("<dIB") # time, changed vertex count, value width in bytes
+
+
+def capture_path(name, folder=CAPTURE_FOLDER):
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}{CAPTURE_EXTENSION}")
+
+
+def encode_frame(t, current, previous):
+    """ One frame record: vertices whose quantized displacement differs from 'previous'. """
+    changed = np.flatnonzero((current != previous).any(axis=1))
+    delta = current[changed] - previous[changed]
+    wide = len(delta) and np.abs(delta).max() > 32767
+    values = delta.astype(np.int32 if wide else np.int16)
+    gaps = np.diff(changed, prepend=-1).astype(np.uint32)
+    return FRAME_HEADER.pack(t, len(changed), values.itemsize) + gaps.tobytes() + values.tobytes()
+
+
+def decode_frame(buf, offset, state):
+    """ Applies one frame record to 'state' (quantized displacements) in place. Returns (time, next offset). """
+    t, count, width = FRAME_HEADER.unpack_from(buf, offset)
+    offset += FRAME_HEADER.size
+    gaps = np.frombuffer(buf, dtype=np.uint32, count=count, offset=offset)
+    offset += 4 * count
+    values = np.frombuffer(buf, dtype=np.int32 if width == 4 else np.int16, count=3 * count, offset=offset)
+    offset += width * 3 * count
+    state[np.cumsum(gaps, dtype=np.int64) - 1] += values.reshape(-1, 3)
+    return t, offset
+
+
+def first_frame_time(file, size):
+    """ Time of the first frame of a chunk whose payload starts at the file position (inflates only its header). """
+    inflate = zlib.decompressobj()
+    head = b""
+    while len(head) < FRAME_HEADER.size and size > 0:
+        data = file.read(min(size, 1024))
+        if not data:
+            break
+        size -= len(data)
+        head += inflate.decompress(data, FRAME_HEADER.size - len(head))
+    return FRAME_HEADER.unpack_from(head)[0] if len(head) >= FRAME_HEADER.size else 0.0
+
+
+class CaptureWriter:
+    """
+    Records the displayed vertex positions of one mesh on a background thread.
+    submit() is called by the render thread and never blocks.
+    """
+    def __init__(self, path, rest, normals, triangles, step=QUANT_STEP, keyframe_interval=KEYFRAME_INTERVAL):
+        self.path = path
+        self.rest = np.array(rest, dtype=np.float32)
+        self.num_vertices = len(self.rest)
+        self.step = step
+        self.keyframe_interval = keyframe_interval
+        self.start_time = time.perf_counter()
+
+        # Stats
+        self.frames = 0          # Frames written
+        self.dropped = 0         # Frames lost because the writer fell behind
+        self.raw_bytes = 0       # Encoded size before compression
+        self.file_bytes = 0
+        self.submit_time = 0.0   # Render-thread cost
+        self.encode_time = 0.0   # Writer-thread cost
+        self.last_error = None
+
+        self.file = open(path, "wb")
+        header = {"vertices": self.num_vertices, "triangles": len(triangles), "step": step,
+                  "keyframe_interval": keyframe_interval, "created": time.time()}
+        self.file.write(CAPTURE_MAGIC + json.dumps(header).encode() + b"\n")
+        mesh = (self.rest.tobytes() + np.asarray(normals, dtype=np.float32)[:self.num_vertices].tobytes()
+                + np.asarray(triangles, dtype=np.uint32).tobytes())
+        self._write_chunk(KIND_MESH, 0, 0, mesh)
+
+        self.queue = queue.Queue(maxsize=QUEUE_FRAMES)
+        self.thread = threading.Thread(target=self._run, name="DeformationCapture", daemon=True)
+        self.thread.start()
+
+    def submit(self, positions):
+        """ Queues a copy of the first num_vertices positions (any (n, 3) array or strided view). """
+        start = time.perf_counter()
+        try:
+            self.queue.put_nowait((start - self.start_time, np.array(positions[:self.num_vertices], dtype=np.float32)))
+        except queue.Full:
+            self.dropped += 1
+        self.submit_time += time.perf_counter() - start
+
+    def close(self):
+        """ Writes the pending frames and closes the file. """
+        self.queue.put(None)
+        self.thread.join()
+        self.file.close()
+
+    def stats(self):
+        submitted = self.frames + self.dropped
+        return {"frames": self.frames, "dropped": self.dropped, "mb": self.file_bytes / 1e6,
+                "ratio": self.raw_bytes / max(self.file_bytes, 1),
+                "submit_ms": self.submit_time * 1000 / max(submitted, 1),
+                "encode_ms": self.encode_time * 1000 / max(self.frames, 1)}
+
+    def _write_chunk(self, kind, first, count, payload):
+        self.raw_bytes += len(payload)
+        data = zlib.compress(payload, ZLIB_LEVEL)
+        self.file.write(CHUNK_HEADER.pack(kind, first, count, len(data)) + data)
+        self.file_bytes = self.file.tell()
+
+    def _run(self):
+        previous = np.zeros((self.num_vertices, 3), dtype=np.int32)
+        chunk, first = [], 0
+        while True:
+            item = self.queue.get()
+            if item is not None:
+                t, positions = item
+                start = time.perf_counter()
+                current = np.rint((positions - self.rest) / self.step).astype(np.int32)
+                if not chunk:
+                    previous.fill(0) # Keyframe: all displacements, relative to the rest pose
+                chunk.append(encode_frame(t, current, previous))
+                previous = current
+                self.frames += 1
+                self.encode_time += time.perf_counter() - start
+            if chunk and (item is None or len(chunk) == self.keyframe_interval):
+                try:
+                    self._write_chunk(KIND_FRAMES, first, len(chunk), b"".join(chunk))
+                except OSError as e:
+                    self.last_error = e
+                    print(f"Capture Error: {e}")
+                first += len(chunk)
+                chunk = []
+            if item is None:
+                self.file.flush()
+                return
+
+
+class CaptureReader:
+    """ Random access to the frames of a .dcap file. """
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        if self.file.readline() != CAPTURE_MAGIC:
+            raise ValueError(f"{path} is not a deformation capture.")
+        self.header = json.loads(self.file.readline())
+        self.step = self.header["step"]
+        n = self.header["vertices"]
+
+        # Chunk table from the headers alone; a capture cut short by a crash keeps its complete chunks
+        self.chunks = [] # (first frame, frame count, payload offset, payload bytes)
+        self.first_times = [] # Time of each chunk's keyframe
+        mesh = None
+        while True:
+            head = self.file.read(CHUNK_HEADER.size)
+            if len(head) < CHUNK_HEADER.size:
+                break
+            kind, first, count, size = CHUNK_HEADER.unpack(head)
+            offset = self.file.tell()
+            if kind == KIND_MESH:
+                mesh = zlib.decompress(self.file.read(size))
+            else:
+                self.chunks.append((first, count, offset, size))
+                self.first_times.append(first_frame_time(self.file, size))
+                self.file.seek(offset + size)
+        if mesh is None:
+            raise ValueError(f"{path} has no mesh.")
+        self.rest = np.frombuffer(mesh, dtype=np.float32, count=3 * n).reshape(-1, 3)
+        self.normals = np.frombuffer(mesh, dtype=np.float32, count=3 * n, offset=12 * n).reshape(-1, 3)
+        self.triangles = np.frombuffer(mesh, dtype=np.uint32, offset=24 * n).reshape(-1, 3)
+        self.starts = [c[0] for c in self.chunks]
+        self.num_frames = self.chunks[-1][0] + self.chunks[-1][1] if self.chunks else 0
+
+        # Decoder position: sequential playback continues from here instead of the keyframe
+        self.state = np.zeros((n, 3), dtype=np.int32)
+        self.payload = None
+        self.chunk_index = -1
+        self.frame_index = -1
+        self.frame_offset = 0
+        self.times = {} # Chunk -> its frame times, see chunk_times()
+
+    def close(self):
+        self.file.close()
+
+    def duration(self):
+        return float(self.chunk_times(len(self.chunks) - 1)[-1]) if self.num_frames else 0.0
+
+    def chunk_times(self, chunk):
+        """ Times of the frames of one chunk, read from their FRAME_HEADERs once (nothing is decoded). """
+        times = self.times.get(chunk)
+        if times is None:
+            _, count, offset, size = self.chunks[chunk]
+            if chunk == self.chunk_index:
+                payload = self.payload
+            else:
+                self.file.seek(offset)
+                payload = zlib.decompress(self.file.read(size))
+            times = np.empty(count, dtype=np.float64)
+            position = 0
+            for i in range(count):
+                times[i], changed, width = FRAME_HEADER.unpack_from(payload, position)
+                position += FRAME_HEADER.size + (4 + 3 * width) * changed
+            self.times[chunk] = times
+        return times
+
+    def frame(self, index):
+        """ (time, positions) of one frame. Seeks through the nearest keyframe when needed. """
+        index = max(0, min(index, self.num_frames - 1))
+        chunk = bisect.bisect_right(self.starts, index) - 1
+        first, _, offset, size = self.chunks[chunk]
+        if chunk != self.chunk_index or index < self.frame_index:
+            if chunk != self.chunk_index:
+                self.file.seek(offset)
+                self.payload = zlib.decompress(self.file.read(size))
+                self.chunk_index = chunk
+            self.state.fill(0)
+            self.frame_index = first - 1
+            self.frame_offset = 0
+        while self.frame_index < index:
+            _, self.frame_offset = decode_frame(self.payload, self.frame_offset, self.state)
+            self.frame_index += 1
+        return float(self.chunk_times(chunk)[index - first]), self.rest + self.state * np.float32(self.step)
+
+    def frame_at(self, t):
+        """
+        Index of the last frame recorded at or before time t: a binary search over the chunks'
+        first times, then over the frame times of one chunk. The decoder position is untouched.
+        """
+        if not self.num_frames:
+            return 0
+        chunk = max(bisect.bisect_right(self.first_times, t) - 1, 0)
+        times = self.chunk_times(chunk)
+        return self.chunks[chunk][0] + max(int(np.searchsorted(times, t, side='right')) - 1, 0)
+
+
+def run_viewer(path):
+    from direct.showbase.ShowBase import ShowBase
+    from direct.gui.DirectGui import DirectSlider
+    from direct.gui.OnscreenText import OnscreenText
+    from direct.task import Task
+    from panda3d.core import Material, DirectionalLight, AmbientLight, TextNode
+    from ply_loader import build_geom_node
+
+    class CaptureViewer(ShowBase):
+        """ Plays a capture back at its recorded speed; the slider seeks to any frame. """
+        def __init__(self, reader):
+            ShowBase.__init__(self)
+            self.reader = reader
+            self.setBackgroundColor(0.1, 0.1, 0.12, 1)
+            self.disableMouse()
+            self.camera.setPos(0, -35, 5)
+            self.camera.lookAt(0, 0, 0)
+
+            mesh = {'points': reader.rest, 'normals': reader.normals, 'colors': None, 'triangles': reader.triangles}
+            self.model = self.render.attachNewNode(build_geom_node(mesh, "capture"))
+            m = Material()
+            m.setBaseColor((0.6, 0.1, 0.1, 1))
+            self.model.setMaterial(m, 1)
+            sun = self.render.attachNewNode(DirectionalLight("sun"))
+            sun.setHpr(-30, -45, 0)
+            self.render.setLight(sun)
+            ambient = self.render.attachNewNode(AmbientLight("ambient"))
+            ambient.node().setColor((0.3, 0.3, 0.3, 1))
+            self.render.setLight(ambient)
+            self.vdata = self.model.node().modifyGeom(0).modifyVertexData()
+
+            self.index = 0
+            self.clock = 0.0
+            self.playing = True
+            self.slider = DirectSlider(range=(0, max(reader.num_frames - 1, 1)), value=0, pageSize=1,
+                                       pos=(0, 0, -0.9), scale=0.8, command=self.seek)
+            self.lbl = OnscreenText(text="", pos=(-1.3, 0.9), scale=0.05, fg=(0.8, 0.8, 0.8, 1),
+                                    align=TextNode.ALeft, mayChange=True)
+            self.accept('space', self.toggle_play)
+            self.accept('arrow_right', self.step_frames, [1])
+            self.accept('arrow_left', self.step_frames, [-1])
+            self.accept('arrow_right-repeat', self.step_frames, [1])
+            self.accept('arrow_left-repeat', self.step_frames, [-1])
+            self.accept('escape', sys.exit)
+            self.show(0)
+            self.taskMgr.add(self.update, "CapturePlayback")
+
+        def show(self, index):
+            start = time.perf_counter()
+            self.index = max(0, min(index, self.reader.num_frames - 1))
+            self.clock, positions = self.reader.frame(self.index)
+            column_view(self.vdata, 'vertex', modify=True)[:] = positions
+            self.lbl.setText(f"Frame {self.index + 1}/{self.reader.num_frames} | {self.clock:.2f} s | "
+                             f"decode {(time.perf_counter() - start) * 1000:.2f} ms | "
+                             f"{'playing' if self.playing else 'paused'} (space, arrows)")
+
+        def seek(self):
+            index = int(self.slider['value'])
+            if index != self.index:
+                self.show(index)
+
+        def toggle_play(self):
+            self.playing = not self.playing
+
+        def step_frames(self, delta):
+            self.playing = False
+            self.show(self.index + delta)
+            self.slider['value'] = self.index
+
+        def update(self, task):
+            if self.playing and self.reader.num_frames:
+                self.clock += globalClock.getDt()
+                index = self.reader.frame_at(self.clock)
+                if index >= self.reader.num_frames - 1 and self.index == index:
+                    index, self.clock = 0, 0.0 # Loop
+                if index != self.index:
+                    self.show(index)
+                    self.slider['value'] = self.index
+            return Task.cont
+
+    CaptureViewer(CaptureReader(path)).run()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "play" and len(sys.argv) > 2:
+        run_viewer(sys.argv[2])
+    elif command == "info" and len(sys.argv) > 2:
+        reader = CaptureReader(sys.argv[2])
+        size = os.path.getsize(sys.argv[2])
+        print(f"{reader.header['vertices']} vertices, {reader.num_frames} frames, {reader.duration():.1f} s, "
+              f"{len(reader.chunks)} keyframes, {size / 1e6:.2f} MB")
+        reader.close()
+    else:
+        print("Usage: python deformation_capture.py play <file.dcap> | info <file.dcap>")
@@ -0,0 +1,356 @@
+import os
+import json
+import queue
+import struct
+import threading
+from collections import OrderedDict
+import numpy as np
+from panda3d.core import Texture, TextNode, SamplerState
+from direct.gui.DirectGui import DirectFrame, DirectButton, DirectSlider, DGG
+from direct.gui.OnscreenText import OnscreenText
+from direct.showbase.DirectObject import DirectObject
+
+# NOTE: In-engine model browser for the simulators (replaces a blocking Tk file dialog).
+# Drawn with DirectGui inside the running ShowBase: directory listings, metadata and previews
+# are produced on a background thread and picked up by a task, so the frame loop never waits
+# on the disk. The list is virtualized (a fixed pool of row buttons over the entries), so a
+# folder with thousands of files costs the same to show as a folder with ten.
+# Metadata (vertex / face counts) comes from file headers where the format has them; the
+# preview is a small front-view point splat. Both are cached per (path, mtime, size).
+
+MODEL_EXTENSIONS = (".obj", ".fbx", ".gltf", ".glb", ".egg", ".stl", ".ply", ".bam")
+VISIBLE_ROWS = 14
+PREVIEW_SIZE = 96            # Preview image resolution (pixels)
+PREVIEW_POINTS = 20000       # Vertices sampled for a preview
+PREVIEW_MAX_BYTES = 64 << 20 # Larger files get metadata only (no full parse for a thumbnail)
+CACHE_ENTRIES = 256
+BG = (0.1, 0.1, 0.15, 0.95)
+ROW = (0.18, 0.18, 0.22, 1)
+ROW_SELECTED = (0.0, 0.55, 0.65, 1)
+ACCENT = (0.0, 0.9, 1.0, 1)
+
+
+# --- Header readers (background thread) ---
+def _count_in_file(path, needles):
+    """ Occurrences of each byte string in the file, read in 8 MB chunks. """
+    counts = [0] * len(needles)
+    tail = b"\n" # So a match on the first line counts
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(8 << 20)
+            if not chunk:
+                break
+            data = tail + chunk
+            for i, needle in enumerate(needles):
+                counts[i] += data.count(needle) - tail.count(needle)
+            tail = data[-16:]
+    return counts
+
+
+def _gltf_counts(doc):
+    verts = faces = 0
+    accessors = doc.get("accessors", [])
+    for mesh in doc.get("meshes", []):
+        for prim in mesh.get("primitives", []):
+            position = prim.get("attributes", {}).get("POSITION")
+            if position is not None:
+                verts += accessors[position].get("count", 0)
+            if "indices" in prim:
+                faces += accessors[prim["indices"]].get("count", 0) // 3
+    return verts, faces
+
+
+def read_metadata(path):
+    """ {'vertices', 'faces'} from the file header when the format has one (None = unknown). """
+    ext = os.path.splitext(path)[1].lower()
+    size = os.path.getsize(path)
+    verts = faces = None
+    if ext == ".ply":
+        from ply_loader import read_ply_header
+        with open(path, "rb") as f:
+            _, elements = read_ply_header(f)
+        counts = {name: count for name, count, _ in elements}
+        verts, faces = counts.get("vertex"), counts.get("face")
+    elif ext == ".stl":
+        with open(path, "rb") as f:
+            head = f.read(84)
+        triangles = struct.unpack_from("<I", head, 80)[0] if len(head) == 84 else -1
+        if size == 84 + 50 * triangles: # Binary STL
+            faces = triangles
+        else:
+            faces = _count_in_file(path, [b"facet normal"])[0]
+        verts = 3 * faces
+    elif ext == ".obj":
+        verts, faces = _count_in_file(path, [b"\nv ", b"\nf "])
+    elif ext == ".egg":
+        verts, faces = _count_in_file(path, [b"<Vertex>", b"<Polygon>"])
+    elif ext == ".gltf":
+        with open(path, "r", encoding="utf-8") as f:
+            verts, faces = _gltf_counts(json.load(f))
+    elif ext == ".glb":
+        with open(path, "rb") as f:
+            magic, _, _, length, kind = struct.unpack("<4sIIII", f.read(20))
+            if magic == b"glTF" and kind == 0x4E4F534A: # First chunk is JSON
+                verts, faces = _gltf_counts(json.loads(f.read(length)))
+    elif ext == ".bam":
+        from organ_bundle import arrays_path
+        if os.path.exists(arrays_path(path)):
+            with np.load(arrays_path(path)) as data:
+                meta = json.loads(str(data["meta"]))
+            verts, faces = meta.get("vertices"), meta.get("triangles")
+    return {"vertices": verts, "faces": faces, "bytes": size}
+
+
+def read_preview_points(path):
+    """ Up to PREVIEW_POINTS vertex positions for the thumbnail, or None. """
+    ext = os.path.splitext(path)[1].lower()
+    if os.path.getsize(path) > PREVIEW_MAX_BYTES:
+        return None
+    points = None
+    if ext == ".ply":
+        from ply_loader import read_ply
+        points = read_ply(path)['points']
+    elif ext == ".stl":
+        with open(path, "rb") as f:
+            data = f.read()
+        triangles = struct.unpack_from("<I", data, 80)[0] if len(data) >= 84 else 0
+        if len(data) == 84 + 50 * triangles:
+            record = np.dtype([('n', '<f4', 3), ('v', '<f4', (3, 3)), ('attr', '<u2')])
+            points = np.frombuffer(data, dtype=record, count=triangles, offset=84)['v'].reshape(-1, 3)
+    elif ext == ".obj":
+        with open(path, "rb") as f:
+            lines = [l for l in f.read().split(b"\n") if l.startswith(b"v ")]
+        step = max(1, len(lines) // PREVIEW_POINTS)
+        points = np.array([l.split()[1:4] for l in lines[::step]], dtype=np.float32)
+    elif ext == ".bam":
+        from organ_bundle import arrays_path
+        if os.path.exists(arrays_path(path)):
+            with np.load(arrays_path(path)) as data:
+                points = data["rest_positions"]
+    if points is None or len(points) == 0:
+        return None
+    step = max(1, len(points) // PREVIEW_POINTS)
+    return np.asarray(points[::step], dtype=np.float32)
+
+
+def render_preview(points, size=PREVIEW_SIZE):
+    """ Front view (x right, z up) point density as a (size, size, 4) BGRA uint8 image. """
+    xz = points[:, [0, 2]]
+    lo, hi = xz.min(axis=0), xz.max(axis=0)
+    scale = (size - 4) / max(float((hi - lo).max()), 1e-9)
+    pix = ((xz - (lo + hi) / 2) * scale + size / 2).astype(np.int64).clip(0, size - 1)
+    density = np.zeros((size, size), dtype=np.float32)
+    np.add.at(density, (pix[:, 1], pix[:, 0]), 1.0) # Row 0 = bottom (Panda textures start at the bottom)
+    density = np.sqrt(density / max(density.max(), 1.0))
+    image = np.zeros((size, size, 4), dtype=np.uint8)
+    image[..., 0] = (255 * density).astype(np.uint8)        # B
+    image[..., 1] = (230 * density).astype(np.uint8)        # G
+    image[..., 2] = (60 * density).astype(np.uint8)         # R
+    image[..., 3] = np.where(density > 0, 255, 0).astype(np.uint8)
+    return image
+
+
+class FileBrowser:
+    """
+    Modal model picker. open(on_pick) shows it; on_pick(path) is called on the main thread.
+    """
+    def __init__(self, base, extensions=MODEL_EXTENSIONS, start_dir=None):
+        self.base = base
+        self.extensions = extensions
+        self.directory = os.path.abspath(start_dir or os.getcwd())
+        self.entries = []      # (name, is_dir)
+        self.offset = 0
+        self.selected = None   # Full path of the selected file
+        self.on_pick = None
+        self.cache = OrderedDict() # (path, mtime, size) -> (metadata, preview image or None)
+        self.pending = set()   # Paths whose metadata is being read
+        self.listing_id = 0    # Stale listings (user navigated on) are ignored
+
+        self.jobs = queue.Queue()
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="FileBrowser", daemon=True)
+        self.thread.start()
+        self.events = DirectObject() # Own listener, so closing does not drop the app's bindings
+        self._build_ui()
+        self.frame.hide()
+
+    # --- UI ---
+    def _build_ui(self):
+        self.frame = DirectFrame(parent=self.base.aspect2d, frameColor=BG, frameSize=(-1.2, 1.2, -0.8, 0.8))
+        self.lbl_path = OnscreenText(parent=self.frame, text="", pos=(-1.15, 0.7), scale=0.045,
+                                     fg=ACCENT, align=TextNode.ALeft, mayChange=True)
+        self.rows = []
+        for i in range(VISIBLE_ROWS):
+            row = DirectButton(parent=self.frame, text="", text_align=TextNode.ALeft, text_pos=(-10.5, -0.2),
+                               text_fg=(1, 1, 1, 1), scale=0.045, frameSize=(-11, 11, -0.6, 0.75),
+                               pos=(-0.6, 0, 0.58 - i * 0.085), frameColor=ROW, relief=DGG.FLAT,
+                               command=self._click_row, extraArgs=[i])
+            self.rows.append(row)
+        self.slider = DirectSlider(parent=self.frame, range=(0, 1), value=0, orientation=DGG.VERTICAL,
+                                   pos=(-0.05, 0, 0.0), scale=0.6, command=self._slider_moved,
+                                   thumb_frameColor=ACCENT, frameColor=(0.3, 0.3, 0.3, 1))
+
+        self.preview = DirectFrame(parent=self.frame, frameColor=(0, 0, 0, 1), frameSize=(-0.25, 0.25, -0.25, 0.25),
+                                   pos=(0.55, 0, 0.33))
+        self.lbl_info = OnscreenText(parent=self.frame, text="", pos=(0.55, 0.0), scale=0.04,
+                                     fg=(0.8, 0.8, 0.8, 1), mayChange=True)
+        for text, x, cmd in (("Up", -0.95, self.go_up), ("Open", 0.4, self.confirm), ("Cancel", 0.85, self.close)):
+            DirectButton(parent=self.frame, text=text, scale=0.05, pos=(x, 0, -0.72), frameSize=(-2.5, 2.5, -0.65, 0.75),
+                         text_fg=(1, 1, 1, 1), frameColor=ROW, relief=DGG.FLAT, command=cmd)
+
+    def open(self, on_pick):
+        self.on_pick = on_pick
+        self.frame.show()
+        self.list_directory(self.directory)
+        self.base.taskMgr.add(self._poll, "FileBrowserPoll")
+        self.events.accept('wheel_up', self.scroll, [-3])
+        self.events.accept('wheel_down', self.scroll, [3])
+
+    def close(self):
+        self.frame.hide()
+        self.base.taskMgr.remove("FileBrowserPoll")
+        self.events.ignoreAll()
+
+    def confirm(self):
+        if self.selected and self.on_pick:
+            path, self.selected = self.selected, None
+            self.close()
+            self.on_pick(path)
+
+    def go_up(self):
+        self.list_directory(os.path.dirname(self.directory))
+
+    def list_directory(self, directory):
+        self.directory = directory
+        self.listing_id += 1
+        self.entries, self.offset, self.selected = [], 0, None
+        self.lbl_path.setText(f"{directory}  (loading...)")
+        self.jobs.put(("list", self.listing_id, directory))
+        self._refresh_rows()
+
+    def scroll(self, delta):
+        top = max(0, len(self.entries) - VISIBLE_ROWS)
+        self.offset = max(0, min(self.offset + delta, top))
+        self.slider['value'] = top - self.offset # Inverted like _slider_moved (slider top = first entry)
+        self._refresh_rows()
+
+    def _slider_moved(self):
+        # Slider top = first entry
+        top = max(0, len(self.entries) - VISIBLE_ROWS)
+        offset = int(round(top - self.slider['value'])) if top else 0
+        if offset != self.offset:
+            self.offset = offset
+            self._refresh_rows()
+
+    def _refresh_rows(self):
+        for i, row in enumerate(self.rows):
+            k = self.offset + i
+            if k < len(self.entries):
+                name, is_dir = self.entries[k]
+                row['text'] = f"[{name}]" if is_dir else name
+                path = os.path.join(self.directory, name)
+                row['frameColor'] = ROW_SELECTED if path == self.selected else ROW
+                row.show()
+            else:
+                row.hide()
+
+    def _click_row(self, i):
+        name, is_dir = self.entries[self.offset + i]
+        path = os.path.join(self.directory, name)
+        if is_dir:
+            self.list_directory(path)
+        elif path == self.selected:
+            self.confirm() # Second click opens
+        else:
+            self.selected = path
+            self._refresh_rows()
+            self._show_details(path)
+
+    def _show_details(self, path):
+        key = self._cache_key(path)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            self._apply_details(path, *self.cache[key])
+            return
+        self.lbl_info.setText("reading...")
+        self.preview['frameTexture'] = None
+        if path not in self.pending:
+            self.pending.add(path)
+            self.jobs.put(("meta", key, path))
+
+    def _apply_details(self, path, meta, image):
+        if path != self.selected:
+            return
+        fmt = lambda v: "?" if v is None else f"{v:,}"
+        self.lbl_info.setText(f"{os.path.basename(path)}\n{fmt(meta['vertices'])} vertices\n"
+                              f"{fmt(meta['faces'])} faces\n{meta['bytes'] / 1e6:.2f} MB")
+        if image is None:
+            self.preview['frameTexture'] = None
+            return
+        tex = Texture("preview")
+        tex.setup2dTexture(image.shape[1], image.shape[0], Texture.T_unsigned_byte, Texture.F_rgba8)
+        tex.setRamImage(image.tobytes())
+        tex.setMagfilter(SamplerState.FT_nearest)
+        self.preview['frameTexture'] = tex
+
+    @staticmethod
+    def _cache_key(path):
+        try:
+            st = os.stat(path)
+            return (path, st.st_mtime, st.st_size)
+        except OSError:
+            return (path, 0, 0)
+
+    # --- Main thread: pick up background results ---
+    def _poll(self, task):
+        while True:
+            try:
+                kind, key, payload = self.results.get_nowait()
+            except queue.Empty:
+                return task.cont
+            if kind == "list" and key == self.listing_id:
+                self.entries = payload
+                self.lbl_path.setText(f"{self.directory}  ({len(payload)} items)")
+                self.slider['range'] = (0, max(1, len(payload) - VISIBLE_ROWS))
+                self.slider['value'] = self.slider['range'][1]
+                self._refresh_rows()
+            elif kind == "list_error" and key == self.listing_id:
+                self.lbl_path.setText(f"{self.directory}  ({payload})")
+            elif kind == "meta":
+                path = key[0]
+                self.pending.discard(path)
+                self.cache[key] = payload
+                while len(self.cache) > CACHE_ENTRIES:
+                    self.cache.popitem(last=False)
+                self._apply_details(path, *payload)
+
+    # --- Background thread ---
+    def _run(self):
+        while True:
+            kind, key, path = self.jobs.get()
+            if kind == "list":
+                try:
+                    entries = []
+                    with os.scandir(path) as it:
+                        for e in it:
+                            if e.name.startswith("."):
+                                continue
+                            if e.is_dir():
+                                entries.append((e.name, True))
+                            elif e.name.lower().endswith(self.extensions):
+                                entries.append((e.name, False))
+                    entries.sort(key=lambda e: (not e[1], e[0].lower()))
+                    self.results.put(("list", key, entries))
+                except OSError as e:
+                    self.results.put(("list_error", key, e.strerror or str(e)))
+            elif kind == "meta":
+                try:
+                    meta = read_metadata(path)
+                except Exception:
+                    meta = {"vertices": None, "faces": None, "bytes": key[2]}
+                try:
+                    points = read_preview_points(path)
+                    image = render_preview(points) if points is not None else None
+                except Exception:
+                    image = None
+                self.results.put(("meta", key, (meta, image)))
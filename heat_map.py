@@ -0,0 +1,180 @@
+import sys
+import time
+import numpy as np
+from panda3d.core import (
+    Geom, GeomVertexData, GeomVertexFormat, GeomVertexArrayFormat, InternalName, Material
+)
+from soft_body import column_views
+
+# NOTE: Vertex coloring by deformation, like get_colors_based_on_depth() in cutting.py but live.
+#   displacement -> distance of every vertex from its rest position
+#   stress       -> mean strain |length / rest length - 1| of the edges around every vertex
+# Values go through a 256 entry blue -> green -> yellow -> red palette in one vectorized
+# lookup. The physics thread computes the colors after a step whenever the render thread has
+# taken the previous frame (at most once per rendered frame, PhysicsWorker.set_heat_map)
+# and upload() writes them through the same modifyArray() handle as the positions, so the
+# color column costs no second pass over the GeomVertexData.
+#
+#   python heat_map.py [sizes ...]   -> cost of the colors and the upload per mesh size
+
+HEAT_MODES = ("off", "displacement", "stress")
+DISPLACEMENT_RANGE = 1.5 # Mesh units shown fully red
+STRAIN_RANGE = 0.25      # Mean edge strain shown fully red
+HEAT_STOPS = [(0.0, (40, 60, 200)), (0.35, (40, 190, 120)), (0.65, (240, 220, 50)), (1.0, (220, 30, 30))]
+BENCH_SIZES = [1000, 10000, 100000, 1000000]
+
+
+def heat_palette():
+    """ (256, 4) uint8 RGBA lookup table interpolated between HEAT_STOPS. """
+    t = np.linspace(0.0, 1.0, 256)
+    stops = [s for s, _ in HEAT_STOPS]
+    palette = np.full((256, 4), 255, dtype=np.uint8)
+    for channel in range(3):
+        palette[:, channel] = np.interp(t, stops, [c[channel] for _, c in HEAT_STOPS]).astype(np.uint8)
+    return palette
+
+
+def ensure_color_column(geom_node):
+    """
+    Vertex data of the first Geom with an RGBA8 color column in the same array as the
+    positions, converting (and re-attaching) the data if the column is missing.
+    """
+    geom = geom_node.modifyGeom(0)
+    vdata = geom.modifyVertexData()
+    fmt = vdata.getFormat()
+    column = fmt.getColumn(InternalName.getColor())
+    if column is not None and column.getNumericType() == Geom.NT_uint8 and column.getNumComponents() == 4 \
+            and fmt.getArrayWith(InternalName.getColor()) == fmt.getArrayWith(InternalName.getVertex()):
+        return vdata
+
+    new_format = GeomVertexFormat(fmt)
+    if column is not None:
+        new_format.removeColumn(InternalName.getColor())
+    index = fmt.getArrayWith(InternalName.getVertex())
+    array = GeomVertexArrayFormat(new_format.getArray(index))
+    array.addColumn(InternalName.getColor(), 4, Geom.NT_uint8, Geom.C_color)
+    new_format.setArray(index, array)
+    converted = GeomVertexData(vdata.convertTo(GeomVertexFormat.registerFormat(new_format)))
+    converted.setUsageHint(Geom.UH_dynamic)
+    colors = column_views(converted, ['color'], modify=True)[0]
+    colors[:] = 255 # Missing colors convert to black
+    geom.setVertexData(converted)
+    return geom.modifyVertexData()
+
+
+def heat_material():
+    """ Material without a base color, so the vertex colors show through the lighting. """
+    m = Material()
+    m.setSpecular((0.5, 0.5, 0.5, 1))
+    m.setShininess(60.0)
+    return m
+
+
+def mesh_colors(worker, vdata):
+    """ The mesh's own vertex colors: a restore still pending on the worker, else the color column. """
+    with worker.lock:
+        if worker.restore_colors is not None:
+            return worker.restore_colors.copy()
+    colors = column_views(vdata, ['color'])[0]
+    return None if colors is None else colors.copy()
+
+
+class HeatMap:
+    """
+    Colors of one body. base_colors keeps the mesh's own vertex colors (None if it has none)
+    so they can be put back; cuts extend them like the cutter extends the vertex rows.
+    """
+    def __init__(self, mode="displacement", base_colors=None):
+        self.mode = mode
+        self.base_colors = None if base_colors is None else np.array(base_colors, dtype=np.uint8)
+        self.palette = heat_palette()
+        self._edges = None       # Edge list the cached arrays below belong to
+        self._rest_lengths = None
+        self._ends = None
+        self._inv_count = None
+
+    def extend(self, sources):
+        """ New vertices of a cut copy the base color of their source rows. """
+        if self.base_colors is not None:
+            self.base_colors = np.concatenate([self.base_colors, self.base_colors[sources]])
+
+    def compute(self, body, out):
+        """ Fills out (N, 4) uint8 with the colors of the body's current positions. """
+        if self.mode == "stress":
+            values = self.edge_strain(body.positions, body.rest, body.mesh.edges) * (255.0 / STRAIN_RANGE)
+        else:
+            offset = body.positions - body.rest
+            values = np.sqrt(np.einsum('ij,ij->i', offset, offset)) * (255.0 / DISPLACEMENT_RANGE)
+        np.take(self.palette, np.minimum(values, 255.0).astype(np.uint8), axis=0, out=out)
+
+    def edge_strain(self, positions, rest, edges):
+        """ Per-vertex mean of |l / l0 - 1| over the vertex's edges. """
+        if edges is not self._edges: # Topology changed (cut): new rest lengths and edge counts
+            lengths = np.linalg.norm(rest[edges[:, 1]] - rest[edges[:, 0]], axis=1)
+            self._rest_lengths = np.maximum(lengths, 1e-9).astype(np.float32)
+            self._ends = np.ascontiguousarray(edges.T).ravel() # Both ends of every edge, one bincount
+            self._inv_count = 1.0 / np.maximum(np.bincount(self._ends, minlength=len(rest)), 1)
+            self._edges = edges
+        d = positions[edges[:, 1]] - positions[edges[:, 0]]
+        strain = np.abs(np.sqrt(np.einsum('ij,ij->i', d, d)) / self._rest_lengths - 1.0)
+        n = len(positions)
+        total = np.bincount(self._ends, np.concatenate([strain, strain]), minlength=n)
+        return total[:n] * self._inv_count[:n]
+
+
+# --- BENCHMARK ---
+class _BenchBody:
+    """ Positions, rest pose and edges of a ring-connected point cloud (stands in for a SoftBody). """
+    def __init__(self, n, rng):
+        self.rest = rng.standard_normal((n, 3)).astype(np.float32) * 5.0
+        self.positions = self.rest + rng.standard_normal((n, 3)).astype(np.float32) * 0.3
+        i = np.arange(n, dtype=np.int32)
+        # About 3 edges per vertex, like a closed triangle mesh
+        self.mesh = type("Mesh", (), {})()
+        self.mesh.edges = np.concatenate([np.column_stack([i, (i + k) % n]) for k in (1, 2, 37)])
+
+
+def _best_ms(fn, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def benchmark(sizes=BENCH_SIZES):
+    """ Prints the color and upload cost per mesh size (best of several runs). """
+    from ply_loader import get_vertex_format
+    rng = np.random.default_rng(0)
+    heat = HeatMap()
+    print(f"{'vertices':>10} | {'displace':>9} | {'stress':>9} | {'upload pos':>10} | {'pos+color':>10}")
+    for n in sizes:
+        body = _BenchBody(n, rng)
+        colors = np.empty((n, 4), dtype=np.uint8)
+        vdata = GeomVertexData("bench", get_vertex_format(), Geom.UH_dynamic)
+        vdata.uncleanSetNumRows(n)
+        repeats = max(3, min(50, 2000000 // n))
+
+        heat.mode = "displacement"
+        displacement_ms = _best_ms(lambda: heat.compute(body, colors), repeats)
+        heat.mode = "stress"
+        heat.compute(body, colors) # Rest lengths
+        stress_ms = _best_ms(lambda: heat.compute(body, colors), repeats)
+
+        def upload_positions():
+            column_views(vdata, ['vertex'], modify=True)[0][:] = body.positions
+
+        def upload_both():
+            view, color = column_views(vdata, ['vertex', 'color'], modify=True)
+            view[:] = body.positions
+            color[:] = colors
+
+        positions_ms = _best_ms(upload_positions, repeats)
+        both_ms = _best_ms(upload_both, repeats)
+        print(f"{n:>10} | {displacement_ms:>6.3f} ms | {stress_ms:>6.3f} ms | {positions_ms:>7.3f} ms | "
+              f"{both_ms:>7.3f} ms")
+
+
+if __name__ == "__main__":
+    benchmark([int(a) for a in sys.argv[1:]] or BENCH_SIZES)
@@ -0,0 +1,58 @@
+import numpy as np
+
+# NOTE: Implicit (backward Euler) integration for stiff tissue.
+# Every vertex is anchored to its rest position (spring_k) and linked to its mesh
+# neighbours (edge_k). On the displacement u = x - rest both are linear, so the
+# system matrix
+#     A = (m + h c) I + h^2 (spring_k I + edge_k L)      (L = graph Laplacian of the edges)
+# only changes when the mesh, material or timestep changes. It is factored once
+# (sparse LU) and each step is a single back-substitution for x, y and z together,
+# which stays stable for stiffness values that make explicit Euler explode.
+
+try:
+    import scipy.sparse as sp
+    from scipy.sparse.linalg import splu
+    SCIPY_SUPPORT = True
+except ImportError:
+    SCIPY_SUPPORT = False
+    print("WARNING: 'scipy' not installed. Implicit solver unavailable, using explicit physics.")
+
+
+def graph_laplacian(edges, num_vertices):
+    """ Sparse (CSC) Laplacian D - A of the undirected edge list. """
+    i, j = edges[:, 0], edges[:, 1]
+    ones = np.ones(len(edges))
+    adjacency = sp.coo_matrix((np.concatenate([ones, ones]), (np.concatenate([i, j]), np.concatenate([j, i]))),
+                              shape=(num_vertices, num_vertices)).tocsr()
+    degree = sp.diags(np.asarray(adjacency.sum(axis=1)).ravel())
+    return (degree - adjacency).tocsc()
+
+
+class ImplicitSolver:
+    """ Prefactored backward Euler step over a SoftBody's arrays. """
+    def __init__(self, mesh):
+        self.laplacian = graph_laplacian(mesh.edges, mesh.num_vertices)
+        self.identity = sp.identity(mesh.num_vertices, format="csc")
+        self.factor = None
+        self.factor_key = None
+        self.factor_count = 0 # How often the system was (re)factored
+
+    def prepare(self, dt, mass, spring_k, edge_k, damping):
+        """ Factors the system matrix if any of its inputs changed since the last step. """
+        key = (dt, mass, spring_k, edge_k, damping)
+        if key == self.factor_key:
+            return
+        stiffness = spring_k * self.identity + edge_k * self.laplacian
+        system = (mass + dt * damping) * self.identity + (dt * dt) * stiffness
+        self.factor = splu(system.tocsc())
+        self.stiffness = stiffness.tocsr()
+        self.factor_key = key
+        self.factor_count += 1
+
+    def step(self, body, dt, ext_force):
+        """ v' = A^-1 (m v + h (f_ext - K u)), x' = x + h v'. Updates body.positions/velocities in place. """
+        self.prepare(dt, body.mass, body.spring_k, body.edge_k, body.damping)
+        displacement = body.positions - body.rest
+        rhs = body.mass * body.velocities + dt * (ext_force - self.stiffness @ displacement)
+        body.velocities[:] = self.factor.solve(rhs.astype(np.float64))
+        body.positions += dt * body.velocities
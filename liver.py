@@ -1,18 +1,28 @@
 import sys
 import os
-import math
 import tempfile
 from direct.showbase.ShowBase import ShowBase
 from panda3d.core import (
     AmbientLight, DirectionalLight, Spotlight, PerspectiveLens,
     Material, LVector3, LPoint3, Vec3, TextNode,
-    GeomVertexData, GeomVertexWriter, GeomVertexReader, GeomVertexRewriter,
     GeomNode, CollisionRay, CollisionNode, CollisionTraverser, CollisionHandlerQueue,
-    WindowProperties, AntialiasAttrib, Filename, Shader, TransparencyAttrib,
+    WindowProperties, Filename, Shader, TransparencyAttrib,
     KeyboardButton
 )
 from direct.gui.DirectGui import *
 from direct.task import Task
+from soft_body import MeshData, SoftBody, PhysicsWorker, Contact, SphereContact, column_view, PHYSICS_HZ
+from pbd_solver import PBDConstraints
+from ply_loader import load_ply_model # Fast PLY import (meshes exported by cutting.py)
+from deformation_capture import CaptureWriter, capture_path
+from quality_governor import QualityGovernor, simulator_knobs
+from render_profiles import PROFILES, select_profile, configure_window, apply_profile
+from organ_bundle import normalize_model, bundle_has_colors
+from organ_library import OrganLibrary
+from checkpoints import CheckpointStore
+from heat_map import HEAT_MODES, HeatMap, ensure_color_column, heat_material, mesh_colors
+from file_browser import FileBrowser
+from mesh_cutting import MeshCutter, CutRequest
 
 # Try imports for STL support
 try:
@@ -52,20 +62,25 @@ WINDOW_HEIGHT = 900
 # --- SOUND PATH ---
 SOUND_FILE_PATH = r"D:\Downloads\task4\task4 data\slimey-gooey-squash-joshua-chivers-4-4-00-03.wav"
 
+# Keys per emulated hand: up, down, left, right, push in, pull out
+VR_HAND_KEYS = ("wsadqe", "ikjluo")
+
 # --- VR EMULATION CLASS ---
 class VRHandEmulator:
     """
-    Simulates a VR Controller using Keyboard (WASD+QE) and Mouse.
+    Simulates a VR Controller using Keyboard (WASD+QE, or the given keys) and Mouse.
     This creates a 3D cursor that physically interacts with the mesh.
     """
-    def __init__(self, render_node, loader):
+    def __init__(self, render_node, loader, keys=VR_HAND_KEYS[0], start=(0, -10, 0)):
+        self.keys = keys
         self.root = render_node.attachNewNode("VRHandRoot")
-        self.root.setPos(0, -10, 0) # Start slightly in front of camera
+        self.root.setPos(*start) # Start slightly in front of camera
         
         # Visual Representation (The "Virtual Hand")
         self.model = loader.loadModel("models/misc/sphere")
         self.model.reparentTo(self.root)
-        self.model.setScale(1.5) 
+        self.radius = 1.5 # Solid sphere used for contact
+        self.model.setScale(self.radius) 
         self.model.setTransparency(TransparencyAttrib.MAlpha)
         self.model.setColor(0, 1, 0, 0.3) # Transparent Green
         self.model.setRenderModeWireframe() # Wireframe look for "virtual" feel
@@ -93,12 +108,13 @@ class VRHandEmulator:
         # Emulate 3D movement (WASD = X/Z plane, Q/E = Y depth)
         move_vec = Vec3(0, 0, 0)
         
-        if input_state.is_pressed('w'): move_vec.addZ(1)
-        if input_state.is_pressed('s'): move_vec.addZ(-1)
-        if input_state.is_pressed('a'): move_vec.addX(-1)
-        if input_state.is_pressed('d'): move_vec.addX(1)
-        if input_state.is_pressed('q'): move_vec.addY(1) # Push in
-        if input_state.is_pressed('e'): move_vec.addY(-1) # Pull out
+        up, down, left, right, push, pull = self.keys
+        if input_state.is_pressed(up): move_vec.addZ(1)
+        if input_state.is_pressed(down): move_vec.addZ(-1)
+        if input_state.is_pressed(left): move_vec.addX(-1)
+        if input_state.is_pressed(right): move_vec.addX(1)
+        if input_state.is_pressed(push): move_vec.addY(1) # Push in
+        if input_state.is_pressed(pull): move_vec.addY(-1) # Pull out
 
         self.root.setPos(self.root.getPos() + move_vec * self.speed * dt)
 
@@ -107,16 +123,19 @@ class VRHandEmulator:
 
 class BioSimFinal(ShowBase):
     def __init__(self):
+        # Render quality profile (--quality low|medium|high or render_quality.json)
+        self.render_profile = select_profile()
+        configure_window(self.render_profile)
         ShowBase.__init__(self)
         
         # 1. Window Setup
         props = WindowProperties()
         props.setTitle("BioSim: Liver Squeeze & VR Emulation")
         props.setSize(WINDOW_WIDTH, WINDOW_HEIGHT)
-        self.win.requestProperties(props)
+        if hasattr(self.win, 'requestProperties'): # Offscreen buffers (benchmark) have no window properties
+            self.win.requestProperties(props)
         self.setBackgroundColor(BG_COLOR)
-        self.render.setAntialias(AntialiasAttrib.MAuto)
-        self.render.setShaderAuto()
+        apply_profile(self.render, self.render_profile)
 
         # 2. Camera
         self.disableMouse()
@@ -131,8 +150,16 @@ class BioSimFinal(ShowBase):
         # 4. State Variables
         self.liver_model = None
         self.vdata = None
-        self.original_verts = [] 
-        self.vertex_velocities = [] 
+        self.physics = None # PhysicsWorker stepping the mesh on its own thread
+        self.capture = None # CaptureWriter while a session is being recorded
+        self.organ_library = OrganLibrary() # Rest poses shared by every load of the same file
+        self.rest_pose = None # RestPose of the loaded file (None = placeholder)
+        self.checkpoints = CheckpointStore() # Undo levels of the current mesh
+        self.file_browser = None # Created on first use
+        self.heat_mode = "off" # Vertex coloring: off, displacement, stress (heat_map.py)
+        self.heat_map = None
+        self.model_material = None # Material the heat map replaced
+        self.hud_timer = 0.0
         
         # Interaction State
         self.is_squeezing = False  # Left Click
@@ -143,13 +170,27 @@ class BioSimFinal(ShowBase):
         # Physics Params
         self.user_force = 60.0
         self.recovery_speed = 8.0 
+        self.edge_stiffness = 2000.0 # Neighbour springs in "hard" mode (implicit solver)
+        self.use_pbd = False         # Position-based dynamics: dents spread to neighbouring vertices
+        self.pbd_iterations = 4      # More iterations = stiffer surface, longer physics step
+        self.preserve_volume = False # PBD only: pull the closed surface back to its rest volume
+
+        # Quality governor: lowers these (and shadows / AA) when frames run over budget
+        self.physics_rate = PHYSICS_HZ
+        self.pbd_iterations_cap = 32
+        self.contact_radius_cap = None
+        self.governor = QualityGovernor(simulator_knobs(self))
+        self.cut_mode = False        # Left drag cuts the surface instead of squeezing it
+        self.last_cut_point = None   # Previous blade point of the current drag (liver space)
         
         # Mouse Tracking
         self.last_mouse_x = 0
         self.last_mouse_y = 0
 
         # 5. VR Emulation Init
-        self.vr_hand = VRHandEmulator(self.render, self.loader)
+        # Two hands (WASD+QE and IJKL+UO); each one is its own contact
+        self.vr_hands = [VRHandEmulator(self.render, self.loader, keys, (i * 8, -10, 0))
+                         for i, keys in enumerate(VR_HAND_KEYS)]
         # self.vr_hand.toggle() # Removed: We trigger this via toggle_vr_mode later for consistent state
         self.keys_pressed = set() # Track keys manually for smoother movement
 
@@ -174,10 +215,23 @@ class BioSimFinal(ShowBase):
         self.accept('mouse3-up', self.set_rotate, [False])
         
         # Keyboard Inputs for VR Controller
-        for key in ['w', 'a', 's', 'd', 'q', 'e']:
+        for key in "".join(VR_HAND_KEYS):
             self.accept(key, self.register_key, [key, True])
             self.accept(f'{key}-up', self.register_key, [key, False])
 
+        # PBD quality ([ = faster, ] = stiffer)
+        self.accept('[', self.change_pbd_iterations, [-1])
+        self.accept(']', self.change_pbd_iterations, [1])
+        self.accept('b', self.toggle_volume)
+        self.accept('g', self.toggle_governor)
+
+        # Checkpoints: C = snapshot, Z = undo to the last snapshot
+        self.accept('c', self.save_checkpoint)
+        self.accept('z', self.undo_checkpoint)
+
+        # Heat map: H cycles material color -> displacement -> stress
+        self.accept('h', self.cycle_heat_map)
+
         self.accept('escape', sys.exit)
         
         # 9. Loop
@@ -204,7 +258,9 @@ class BioSimFinal(ShowBase):
         self.spotlight.setColor((1, 0.95, 0.9, 1))
         lens = PerspectiveLens()
         lens.setFov(60)
-        self.spotlight.setShadowCaster(True, 2048, 2048)
+        shadow_size = PROFILES[self.render_profile]["shadow_map"]
+        if shadow_size:
+            self.spotlight.setShadowCaster(True, shadow_size, shadow_size)
         self.spotlight.setLens(lens)
         slnp = self.render.attachNewNode(self.spotlight)
         slnp.setPos(0, -40, 40)
@@ -249,15 +305,39 @@ class BioSimFinal(ShowBase):
         self.add_btn("Import Liver", 0.52, UI_BTN, lambda: self.open_file_dialog("liver"))
         self.add_del_btn("X", 0.52, lambda: self.delete_liver())
         self.add_btn("Reset Mesh", 0.42, UI_BTN, self.restore_immediate)
+        self.btn_cut = DirectButton(
+            parent=self.panel, text="CUT", pos=(0.38, 0, 0.42),
+            scale=0.06, frameSize=(-1.2, 1.2, -0.65, 0.65),
+            command=self.toggle_cut, text_fg=(1,1,1,1),
+            frameColor=UI_BTN, relief=DGG.FLAT, pressEffect=1
+        )
 
         # 2. VR MODE
         self.add_label("INTERACTION MODE", 0.30)
         self.btn_vr = self.add_btn("Enable VR Hand", 0.22, UI_BTN, self.toggle_vr_mode)
+        self.btn_rec = DirectButton(
+            parent=self.panel, text="REC", pos=(0.38, 0, 0.22),
+            scale=0.06, frameSize=(-1.2, 1.2, -0.65, 0.65),
+            command=self.toggle_capture, text_fg=(1,1,1,1),
+            frameColor=UI_BTN, relief=DGG.FLAT, pressEffect=1
+        )
 
         # 3. PHYSICS MODE
         self.add_label("SQUEEZE TYPE", 0.05)
         self.btn_hard = self.add_btn("Hard (Bone)", -0.03, UI_ACCENT, lambda: self.set_mode("hard"))
         self.btn_soft = self.add_btn("Soft (Flesh)", -0.13, UI_BTN, lambda: self.set_mode("soft"))
+        self.btn_pbd = DirectButton(
+            parent=self.panel, text="PBD", pos=(0.38, 0, -0.13),
+            scale=0.06, frameSize=(-1.2, 1.2, -0.65, 0.65),
+            command=self.toggle_pbd, text_fg=(1,1,1,1),
+            frameColor=UI_BTN, relief=DGG.FLAT, pressEffect=1
+        )
+        self.btn_volume = DirectButton(
+            parent=self.panel, text="VOL", pos=(0.38, 0, -0.03),
+            scale=0.06, frameSize=(-1.2, 1.2, -0.65, 0.65),
+            command=self.toggle_volume, text_fg=(1,1,1,1),
+            frameColor=UI_BTN, relief=DGG.FLAT, pressEffect=1
+        )
 
         # 4. FORCE
         self.add_label("FORCE CONTROL", -0.28)
@@ -268,6 +348,10 @@ class BioSimFinal(ShowBase):
         self.add_label("CONTROLS", -0.55, color=UI_ACCENT)
         self.lbl_controls = self.add_small_label("LEFT CLICK: Squeeze\nRIGHT CLICK: Rotate", -0.65)
 
+        # 6. PHYSICS HUD (top-left)
+        self.lbl_physics = OnscreenText(parent=self.a2dTopLeft, text="", pos=(0.05, -0.08), scale=0.04,
+                                        fg=(0.7,0.7,0.7,1), align=TextNode.ALeft, mayChange=True)
+
     # --- UI HELPERS ---
     def add_label(self, text, y, scale=0.045, color=(0.9,0.9,0.9,1), bold=False):
         font = self.loader.loadFont("cmr12.egg") if not bold else self.loader.loadFont("cmtt12.egg")
@@ -314,21 +398,64 @@ class BioSimFinal(ShowBase):
         self.btn_hard['frameColor'] = UI_ACCENT if mode == "hard" else UI_BTN
         self.btn_soft['frameColor'] = UI_ACCENT if mode == "soft" else UI_BTN
 
+    def toggle_capture(self):
+        if self.capture:
+            self.stop_capture()
+        elif self.physics:
+            body = self.physics.body
+            path = capture_path("liver")
+            self.capture = CaptureWriter(path, body.rest, body.rest_normals, body.mesh.triangles)
+            self.btn_rec['frameColor'] = UI_WARN
+            print(f"Recording deformation to {path}")
+
+    def stop_capture(self):
+        if not self.capture: return
+        self.capture.close()
+        s = self.capture.stats()
+        print(f"SUCCESS: Saved capture {self.capture.path} ({s['frames']} frames, {s['mb']:.2f} MB, "
+              f"dropped {s['dropped']})")
+        self.capture = None
+        self.btn_rec['frameColor'] = UI_BTN
+
+    def toggle_pbd(self):
+        self.use_pbd = not self.use_pbd
+        self.btn_pbd['frameColor'] = UI_ACCENT if self.use_pbd else UI_BTN
+
+    def toggle_volume(self):
+        # Volume constraint of the PBD solver (B); cut meshes have no closed volume to keep
+        self.preserve_volume = not self.preserve_volume
+        self.btn_volume['frameColor'] = UI_ACCENT if self.preserve_volume else UI_BTN
+
+    def toggle_cut(self):
+        self.cut_mode = not self.cut_mode
+        self.btn_cut['frameColor'] = UI_WARN if self.cut_mode else UI_BTN
+        self.last_cut_point = None
+
+    def toggle_governor(self):
+        self.governor.enabled = not self.governor.enabled
+        if not self.governor.enabled:
+            self.governor.reset()
+        print(f"Quality governor {'on' if self.governor.enabled else 'off'}")
+
+    def change_pbd_iterations(self, delta):
+        self.pbd_iterations = max(1, min(self.pbd_iterations + delta, 32))
+
     def toggle_vr_mode(self):
-        active = self.vr_hand.toggle()
+        active = [hand.toggle() for hand in self.vr_hands][0]
         self.vr_mode_active = active
         if active:
             self.btn_vr['frameColor'] = UI_VR
             self.btn_vr['text'] = "VR Active (WASD+QE)"
             # Update text to show Rotate is available
-            self.lbl_controls.setText("WASD: Move Hand | RIGHT CLICK: Rotate\nHand Pushes Mesh Automatically")
+            self.lbl_controls.setText("WASD+QE / IJKL+UO: Move Hands\nRIGHT CLICK: Rotate | LEFT CLICK: Squeeze\nHands Push Mesh Automatically")
         else:
             self.btn_vr['frameColor'] = UI_BTN
             self.btn_vr['text'] = "Enable VR Hand"
-            self.lbl_controls.setText("LEFT CLICK: Squeeze\nRIGHT CLICK: Rotate")
+            self.lbl_controls.setText("LEFT CLICK: Squeeze (CUT: drag to cut)\nRIGHT CLICK: Rotate")
 
     def set_squeeze(self, status):
         self.is_squeezing = status
+        self.last_cut_point = None # Every drag is a new blade stroke
         # Audio Logic
         if self.squash_sfx:
             if status:
@@ -346,6 +473,7 @@ class BioSimFinal(ShowBase):
             self.last_mouse_y = m.y
 
     def delete_liver(self):
+        self.stop_physics()
         if self.liver_model:
             self.liver_model.removeNode()
             self.liver_model = None
@@ -353,47 +481,47 @@ class BioSimFinal(ShowBase):
 
     # --- FILE LOADING ---
     def open_file_dialog(self, target_type):
-        try:
-            import tkinter as tk
-            from tkinter import filedialog
-            root = tk.Tk()
-            root.withdraw()
-            root.wm_attributes('-topmost', 1) 
-            
-            file_path = filedialog.askopenfilename(
-                title=f"Select {target_type.upper()} Model",
-                filetypes=[("3D Models", "*.obj *.fbx *.gltf *.glb *.egg *.stl")]
-            )
-            root.destroy()
-            if file_path:
-                self.load_asset(file_path, target_type)
-        except Exception as e:
-            print(f"Dialog Error: {e}")
+        # In-engine browser: the simulation keeps running while a file is picked
+        if self.file_browser is None:
+            self.file_browser = FileBrowser(self)
+        self.file_browser.open(lambda path: self.load_asset(path, target_type))
 
-    def load_asset(self, path, target_type):
+    def load_model_file(self, path):
+        """ File -> (normalized NodePath, has vertex colors, bundle .bam or None), or None if it cannot be loaded. """
         final_path = path
-        if path.lower().endswith(".stl"):
-            if not STL_SUPPORT: 
-                print("TRIMESH REQUIRED FOR STL")
-                return
-            mesh = trimesh.load(path)
-            with tempfile.NamedTemporaryFile(suffix=".glb", delete=False) as tmp:
-                final_path = tmp.name
-            mesh.export(final_path)
-
-        model = self.loader.loadModel(Filename.fromOsSpecific(final_path))
+        has_vertex_colors = False
+        bundle_path = None
+        if path.lower().endswith(".bam"):
+            # Preprocessed bundle (organ_bundle.py): already flattened and normalized
+            model = self.loader.loadModel(Filename.fromOsSpecific(path))
+            has_vertex_colors = bundle_has_colors(path)
+            bundle_path = path
+        elif path.lower().endswith(".ply"):
+            # Direct NumPy -> GeomVertexData path (no trimesh, no temp file)
+            model, has_vertex_colors = load_ply_model(path)
+        else:
+            if path.lower().endswith(".stl"):
+                if not STL_SUPPORT: 
+                    print("TRIMESH REQUIRED FOR STL")
+                    return
+                mesh = trimesh.load(path)
+                with tempfile.NamedTemporaryFile(suffix=".glb", delete=False) as tmp:
+                    final_path = tmp.name
+                mesh.export(final_path)
+
+            model = self.loader.loadModel(Filename.fromOsSpecific(final_path))
         
         # Center and Scale
-        model.flattenStrong()
-        b = model.getTightBounds()
-        if b:
-            dims = b[1] - b[0]
-            max_dim = max(dims.x, dims.y, dims.z)
-            scale = 10.0 / max_dim
-            model.setScale(scale)
-            center = (b[0] + b[1]) / 2.0
-            model.setPos(-center * scale)
-            model.flattenLight()
+        if not bundle_path:
+            normalize_model(model)
+        return model, has_vertex_colors, bundle_path
+
+    def load_asset(self, path, target_type):
+        # Loading the same file again reuses its rest pose (organ_library.py)
+        rest_pose = self.organ_library.get(path, self.load_model_file)
+        if rest_pose is None:
+            return
+        model = rest_pose.instantiate()
 
         if target_type == "liver":
             if self.liver_model: self.liver_model.removeNode()
@@ -401,10 +529,12 @@ class BioSimFinal(ShowBase):
             self.liver_model.reparentTo(self.render)
             
             m = Material()
-            m.setBaseColor(COLOR_LIVER)
+            # Keep the per-vertex colors of PLY meshes (e.g. cut depth shading)
+            if not rest_pose.has_colors: m.setBaseColor(COLOR_LIVER)
             m.setSpecular((0.9, 0.9, 0.9, 1))
             m.setShininess(90.0)
             self.liver_model.setMaterial(m, 1)
+            self.rest_pose = rest_pose
             self.extract_vertex_data()
 
     def create_placeholder_liver(self):
@@ -419,6 +549,7 @@ class BioSimFinal(ShowBase):
         m.setSpecular((0.9,0.9,0.9,1))
         m.setShininess(90.0)
         self.liver_model.setMaterial(m, 1)
+        self.rest_pose = None
         self.extract_vertex_data()
 
     def extract_vertex_data(self):
@@ -431,20 +562,72 @@ class BioSimFinal(ShowBase):
         vdata = geom.modifyVertexData()
         self.vdata = vdata
         
-        reader = GeomVertexReader(vdata, 'vertex')
-        self.original_verts = []
-        while not reader.isAtEnd():
-            self.original_verts.append(LVector3(reader.getData3()))
-        self.vertex_velocities = [LVector3(0,0,0) for _ in self.original_verts]
+        # Rest pose as NumPy arrays; the body is stepped on the physics thread
+        self.stop_physics()
+        if self.rest_pose:
+            # Rest pose, adjacency, grid and constraints are shared; only the dynamic state is new
+            body = self.rest_pose.new_body()
+            if body is None:
+                return
+        else:
+            try:
+                mesh = MeshData(self.geom_node)
+                # Edge constraints for the PBD solver, built once per mesh as flat CSR arrays
+                body = SoftBody(mesh, PBDConstraints(mesh))
+            except ValueError as e:
+                print(f"WARNING: Mesh cannot be deformed. {e}")
+                return
+        # Reserves room in the Geom so cuts patch it in place
+        cutter = MeshCutter(self.geom_node, body)
+        self.vdata = self.geom_node.modifyGeom(0).modifyVertexData()
+        self.checkpoints = CheckpointStore()
+        self.heat_mode = "off" # New model: back to its own material
+        self.heat_map = None
+        self.physics = PhysicsWorker(body, rate=self.physics_rate, cutter=cutter)
+        if self.rest_pose:
+            self.rest_pose.report(body, self.vdata, self.physics, cutter)
+
+    def cycle_heat_map(self):
+        """ Colors the liver by displacement, then by edge stress, then by its material again. """
+        if not self.physics or not self.liver_model: return
+        self.heat_mode = HEAT_MODES[(HEAT_MODES.index(self.heat_mode) + 1) % len(HEAT_MODES)]
+        if self.heat_mode == "off":
+            self.physics.set_heat_map(None) # Puts the mesh's own colors back on the next upload
+            self.heat_map = None
+            self.liver_model.setMaterial(self.model_material, 1)
+        elif self.heat_map:
+            self.heat_map.mode = self.heat_mode
+        else:
+            # Colors are written with the positions, so the vertex array needs a color column
+            self.vdata = ensure_color_column(self.geom_node)
+            own = mesh_colors(self.physics, self.vdata) if self.rest_pose and self.rest_pose.has_colors else None
+            self.heat_map = HeatMap(self.heat_mode, own)
+            self.physics.set_heat_map(self.heat_map)
+            self.model_material = self.liver_model.getMaterial()
+            self.liver_model.setMaterial(heat_material(), 1)
+
+    def stop_physics(self):
+        self.stop_capture() # A capture belongs to one mesh
+        if self.physics:
+            self.physics.stop()
+            self.physics = None
 
     # --- PHYSICS LOOP ---
     def update_loop(self, task):
+        self.governor.update(globalClock.getDt())
         dt = min(globalClock.getDt(), 0.05)
         
         # Update VR Hand Position
-        self.vr_hand.update(dt, self)
+        for hand in self.vr_hands:
+            hand.update(dt, self)
+
+        # Swap in the newest finished physics frame (never waits for the worker)
+        if self.physics and self.vdata:
+            if self.physics.upload(self.vdata) and self.capture:
+                self.capture.submit(column_view(self.vdata, 'vertex'))
+            self.update_physics_hud(dt)
 
-        if not self.mouseWatcherNode.hasMouse(): 
+        if not self.mouseWatcherNode or not self.mouseWatcherNode.hasMouse(): # No mouse offscreen (benchmark)
             return Task.cont
 
         mpos = self.mouseWatcherNode.getMouse()
@@ -461,98 +644,109 @@ class BioSimFinal(ShowBase):
         self.last_mouse_y = mpos.y
 
         # 2. PHYSICS (Interaction)
-        if self.liver_model and self.vdata:
-            hit_p = None
-            hit_n = None
-            
-            # --- INTERACTION SOURCE SELECTION ---
+        if self.liver_model and self.physics:
+            # Every tool that touches the mesh becomes one contact; all are evaluated in one pass
+            contacts = []
+            interaction_radius = 2.0 if self.squeeze_mode == "hard" else 4.0
+            if self.contact_radius_cap:
+                interaction_radius = min(interaction_radius, self.contact_radius_cap)
+            # Reduced multiplier (1.2) for gentler reaction
+            force = self.user_force * 1.2
+
+            # --- VR HANDS (interaction is ALWAYS active: passive physics) ---
             if self.vr_mode_active:
-                # [FIX APPLIED HERE]
-                # Get Hand Position in World Space
-                world_hand_pos = self.vr_hand.get_pos()
-                # Convert to Liver's Local Coordinate Space
-                hit_p = self.liver_model.getRelativePoint(self.render, world_hand_pos)
-            else:
-                # Legacy Mouse Picking
-                if self.is_squeezing:
-                    self.picker_ray.setFromLens(self.camNode, mpos.x, mpos.y)
-                    self.trav.traverse(self.render)
-                    if self.queue.getNumEntries() > 0:
-                        self.queue.sortEntries()
-                        entry = self.queue.getEntry(0)
-                        if entry.hasSurfacePoint():
-                            hit_p = entry.getSurfacePoint(self.liver_model)
-                            hit_n = entry.getSurfaceNormal(self.liver_model)
+                for i, hand in enumerate(self.vr_hands):
+                    # Convert Hand Position and Size from World Space to Liver's Local Coordinate Space
+                    center = self.liver_model.getRelativePoint(self.render, hand.get_pos())
+                    radius = self.liver_model.getRelativeVector(self.render, Vec3(hand.radius, 0, 0)).length()
+                    # Solid sphere: pushes the surface out of the hand, swept from its last position
+                    contacts.append(SphereContact(center, radius, key=i))
+
+            # --- MOUSE PICK (requires clicking) ---
+            if self.is_squeezing:
+                self.picker_ray.setFromLens(self.camNode, mpos.x, mpos.y)
+                self.trav.traverse(self.render)
+                if self.queue.getNumEntries() > 0:
+                    self.queue.sortEntries()
+                    entry = self.queue.getEntry(0)
+                    if entry.hasSurfacePoint():
+                        hit_p = entry.getSurfacePoint(self.liver_model)
+                        hit_n = entry.getSurfaceNormal(self.liver_model)
+                        if self.cut_mode:
+                            # Scalpel: the blade runs from the last drag point to this one, into the view
+                            if self.last_cut_point is not None and (hit_p - self.last_cut_point).length() > 0.05:
+                                direction = self.liver_model.getRelativeVector(self.picker_np, self.picker_ray.getDirection())
+                                self.physics.request_cut(CutRequest(self.last_cut_point, hit_p, direction))
+                                self.last_cut_point = hit_p
+                            elif self.last_cut_point is None:
+                                self.last_cut_point = hit_p
+                        else:
+                            # Legacy Mouse Push (Normal based)
+                            contacts.append(Contact(hit_p, interaction_radius, force, kernel="cubic", mode="press", normal=hit_n))
             
-            # Run Physics
-            self.deform_mesh(dt, hit_p, hit_n)
+            # Hand the contacts to the physics thread
+            # Hard tissue runs on the prefactored implicit solver with springs along the mesh edges
+            hard = self.squeeze_mode == "hard"
+            self.physics.publish(contacts,
+                                 spring_k=self.recovery_speed * 5.0,
+                                 damping=10.0, # Increased damping for smoother, less "snappy" reaction
+                                 solver="pbd" if self.use_pbd else ("implicit" if hard else "explicit"),
+                                 edge_k=self.edge_stiffness if hard else 0.0,
+                                 pbd_iterations=min(self.pbd_iterations, self.pbd_iterations_cap),
+                                 preserve_volume=self.preserve_volume)
 
         return Task.cont
 
-    def deform_mesh(self, dt, hit_p, hit_n):
-        rewriter = GeomVertexRewriter(self.vdata, 'vertex')
-        
-        mass = 1.0
-        damping = 10.0 # Increased damping for smoother, less "snappy" reaction
-        spring_k = self.recovery_speed * 5.0
-        
-        i = 0
-        while not rewriter.isAtEnd():
-            cur_pos = rewriter.getData3()
-            orig_pos = self.original_verts[i]
-            velocity = self.vertex_velocities[i]
-            
-            ext_force = LVector3(0,0,0)
-            
-            # [FIX APPLIED HERE]
-            # Changed logic: If VR mode is active, interaction is ALWAYS active (passive physics)
-            # If not VR mode (Mouse), then require Clicking (is_squeezing)
-            active_interaction = self.vr_mode_active or (self.is_squeezing)
-            
-            if active_interaction and hit_p:
-                dist = (orig_pos - hit_p).length()
-                
-                # --- FORCE CALCULATION ---
-                
-                interaction_radius = 2.0 if self.squeeze_mode == "hard" else 4.0
-                
-                # If VR Mode, increase radius slightly to compensate for sphere size
-                if self.vr_mode_active: interaction_radius += 1.5
-
-                if dist < interaction_radius:
-                    influence = math.pow((1.0 - dist/interaction_radius), 3.0)
-                    
-                    # Direction of force
-                    if self.vr_mode_active:
-                        # Repel from center of VR hand (Volumetric Squeeze)
-                        push_dir = (orig_pos - hit_p).normalized() 
-                        # Reduced multiplier (1.2) for gentler reaction
-                        push = push_dir * (self.user_force * 1.2) * influence
-                    else:
-                        # Legacy Mouse Push (Normal based)
-                        # Reduced multiplier (1.2)
-                        push = hit_n * -1 * (self.user_force * 1.2) * influence if hit_n else LVector3(0,0,0)
-
-                    ext_force = push
-
-            # Physics Integration
-            displacement = cur_pos - orig_pos
-            spring_force = displacement * -spring_k
-            damping_force = velocity * -damping
-            
-            accel = (ext_force + spring_force + damping_force) / mass
-            new_vel = velocity + accel * dt
-            new_pos = cur_pos + new_vel * dt
-            
-            self.vertex_velocities[i] = new_vel
-            rewriter.setData3(new_pos)
-            i += 1
+    def update_physics_hud(self, dt):
+        self.hud_timer += dt
+        if self.hud_timer < 0.5: return
+        self.hud_timer = 0.0
+        s = self.physics.stats()
+        solver = self.physics.body.solver
+        if solver == "pbd": solver += f" x{min(self.pbd_iterations, self.pbd_iterations_cap)}" + (" + volume" if self.preserve_volume else "")
+        self.lbl_physics.setText(f"Physics ({solver}): {s['steps']} steps | {s['step_ms']:.2f} ms/step | "
+                                 f"late {s['late']} | dropped {s['dropped']} | stale frames {s['stale']}"
+                                 + self.capture_hud() + self.governor_hud()
+                                 + f"\nUndo (C / Z): {len(self.checkpoints)} levels | {self.checkpoints.bytes / 1e6:.2f} MB"
+                                 + f" | Heat map (H): {self.heat_mode}")
+
+    def governor_hud(self):
+        g = self.governor
+        state = f"{g.frame_ms():.1f} ms / {1000 / g.target_fps:.1f} ms" if g.enabled else "off (G)"
+        return f"\nQuality [{state}]: {g.summary()}"
+
+    def capture_hud(self):
+        if not self.capture: return ""
+        c = self.capture.stats()
+        return (f"\nREC {c['frames']} frames | {c['mb']:.2f} MB (x{c['ratio']:.0f}) | "
+                f"{c['submit_ms']:.3f} ms/frame | dropped {c['dropped']}")
+
+    def save_checkpoint(self):
+        if not self.physics: return
+        store = self.checkpoints
+        def snapshot(body):
+            copied = store.snapshot(body.positions, body.velocities)
+            print(f"Checkpoint {len(store)}: {copied} blocks copied, {store.bytes / 1e6:.2f} MB stored")
+        self.physics.call_between_steps(snapshot)
+
+    def undo_checkpoint(self):
+        if not self.physics: return
+        store = self.checkpoints
+        def undo(body):
+            # Checked before popping: checkpoints taken before a cut no longer fit the mesh
+            if store.num_vertices != len(body.positions):
+                store.clear()
+            state = store.undo()
+            if state is None:
+                print("Nothing to undo.")
+                return
+            body.set_state(*state)
+            print(f"Undo: {len(store)} checkpoints left")
+        self.physics.call_between_steps(undo)
 
     def restore_immediate(self):
-        if not self.vdata: return
-        w = GeomVertexWriter(self.vdata, 'vertex')
-        for v in self.original_verts: w.setData3(v)
-        self.vertex_velocities = [LVector3(0,0,0) for _ in self.original_verts]
+        if not self.physics: return
+        self.physics.reset()
 
 if __name__ == "__main__":
     app = BioSimFinal()
@@ -3,6 +3,10 @@ from tkinter import messagebox
 import subprocess
 import os
 import sys
+import time
+import threading
+from record_index import RecordIndex
+from record_browser import RecordCatalog, VirtualRecordList, open_path
 
 # Import the Notes class
 try:
@@ -10,6 +14,9 @@ try:
 except ImportError:
     pass 
 
+RECORDS_FOLDER = "Patient_Records"
+GRADIENT_CACHE_SIZE = 4 # Background images kept for recently used window sizes
+
 class InformationCenter:
     """Displays System Info and Saved Patient Records"""
     def __init__(self, parent_window):
@@ -20,10 +27,93 @@ class InformationCenter:
 
         tk.Label(self.window, text="Records Center", font=("Montserrat", 20, "bold"), bg="#E3F2FD", fg="#0D47A1").pack(pady=20)
         
-        # List files button
-        tk.Button(self.window, text="Open Patient Records Folder", 
-                  command=lambda: os.startfile("Patient_Records") if os.path.exists("Patient_Records") else os.makedirs("Patient_Records"),
-                  bg="#1565C0", fg="white", font=("Segoe UI", 12)).pack(pady=20)
+        # Open folder button (works on Windows, macOS and Linux)
+        tk.Button(self.window, text="Open Patient Records Folder", command=self.open_folder,
+                  bg="#1565C0", fg="white", font=("Segoe UI", 12)).pack(pady=(0, 20))
+
+        # Full-text search over the records (keywords, "phrases", stickers)
+        search_frame = tk.Frame(self.window, bg="#E3F2FD")
+        search_frame.pack(fill=tk.X, padx=40)
+        self.search_var = tk.StringVar()
+        search_entry = tk.Entry(search_frame, textvariable=self.search_var, font=("Segoe UI", 12))
+        search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, ipady=4)
+        search_entry.bind("<Return>", lambda e: self.run_search())
+        tk.Button(search_frame, text="🔍 Search", command=self.run_search,
+                  bg="#1565C0", fg="white", font=("Segoe UI", 11), relief=tk.FLAT).pack(side=tk.LEFT, padx=(10, 0))
+
+        self.lbl_status = tk.Label(self.window, text="Scanning records...", bg="#E3F2FD", fg="#546E7A", font=("Segoe UI", 10))
+        self.lbl_status.pack(anchor=tk.W, padx=40, pady=(5, 0))
+
+        # Virtualized list: only the visible rows are drawn
+        self.record_list = VirtualRecordList(self.window, on_open=self.open_record,
+                                             highlightbackground="#B0BEC5", highlightthickness=1)
+        self.record_list.pack(expand=True, fill=tk.BOTH, padx=40, pady=(5, 20))
+
+        # Show the cached catalog instantly, then refresh catalog and index in the background
+        self.catalog = RecordCatalog(RECORDS_FOLDER)
+        self.index = RecordIndex(RECORDS_FOLDER)
+        self.load_cached_rows()
+        self.record_list.set_rows(self.all_rows)
+        self.scan_result = None
+        threading.Thread(target=self.refresh_records, daemon=True).start()
+        self.window.after(100, self.check_refresh)
+
+    def load_cached_rows(self):
+        self.metadata = {row[0]: row for row in self.catalog.cached()}
+        self.all_rows = [(*row, "") for row in self.metadata.values()]
+
+    def refresh_records(self):
+        start = time.perf_counter()
+        try:
+            changed = self.catalog.refresh()
+            updated, removed = self.index.update()
+            self.scan_result = (changed, f"scanned in {time.perf_counter() - start:.2f} s ({updated} re-indexed)")
+        except Exception as e:
+            self.scan_result = (0, f"Scan failed: {e}")
+
+    def check_refresh(self):
+        # Tk is not thread-safe: the worker only sets a flag, the UI thread shows it
+        if not self.window.winfo_exists():
+            return
+        if self.scan_result is None:
+            self.window.after(100, self.check_refresh)
+            return
+        changed, message = self.scan_result
+        if changed:
+            self.load_cached_rows()
+            if not self.search_var.get().strip():
+                self.record_list.set_rows(self.all_rows)
+        self.lbl_status.config(text=f"{len(self.all_rows)} records | {message}")
+
+    def run_search(self):
+        query = self.search_var.get().strip()
+        if not query:
+            self.record_list.set_rows(self.all_rows)
+            self.lbl_status.config(text=f"{len(self.all_rows)} records")
+            return
+        start = time.perf_counter()
+        results = self.index.search(query)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        rows = []
+        for name, hits in results:
+            meta = self.metadata.get(name, (name, 0, 0, ""))
+            rows.append((*meta, f"{hits} hits"))
+        self.record_list.set_rows(rows)
+        self.lbl_status.config(text=f"{len(rows)} records match in {elapsed:.1f} ms")
+
+    def open_record(self, name):
+        try:
+            SmartMedicalNotes(self.window).load_file(os.path.join(RECORDS_FOLDER, name))
+        except NameError:
+            messagebox.showerror("Error", "note.py not found.")
+
+    def open_folder(self):
+        os.makedirs(RECORDS_FOLDER, exist_ok=True)
+        try:
+            open_path(os.path.abspath(RECORDS_FOLDER))
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not open folder:\n{e}")
 
 class MedicalVRMenu:
     def __init__(self, root):
@@ -83,12 +173,38 @@ class MedicalVRMenu:
                   font=("Segoe UI", 12), bg="#FFEBEE", fg="#C62828", bd=0, padx=20, pady=5).pack(side=tk.BOTTOM, pady=10)
 
     def create_gradient_background(self, width, height):
-        for i in range(0, height, 2):
+        # One image item instead of one rectangle per 2 px; re-rendered only when the size changes
+        self.gradient_cache = {}
+        self.gradient_size = None
+        self.gradient_item = self.canvas.create_image(0, 0, anchor=tk.NW)
+        self.update_gradient(width, height)
+        self.canvas.bind("<Configure>", lambda e: self.update_gradient(e.width, e.height))
+
+    def update_gradient(self, width, height):
+        if (width, height) == self.gradient_size or width < 2 or height < 2:
+            return
+        self.gradient_size = (width, height)
+        image = self.gradient_cache.get((width, height))
+        if image is None:
+            start = time.perf_counter()
+            image = self.render_gradient(width, height)
+            if len(self.gradient_cache) >= GRADIENT_CACHE_SIZE:
+                self.gradient_cache.pop(next(iter(self.gradient_cache)))
+            self.gradient_cache[(width, height)] = image
+            print(f"Gradient {width}x{height} rendered in {(time.perf_counter() - start) * 1000:.1f} ms")
+        self.canvas.itemconfigure(self.gradient_item, image=image)
+
+    def render_gradient(self, width, height):
+        # Vertical gradient: build a 1 px wide column, then let Tk stretch it horizontally
+        rows = []
+        for i in range(height):
             r = int(227 + (255 - 227) * (i/height))
             g = int(242 + (255 - 242) * (i/height))
             b = int(253 + (255 - 253) * (i/height))
-            color = f'#{r:02x}{g:02x}{b:02x}'
-            self.canvas.create_rectangle(0, i, width, i+2, fill=color, outline=color)
+            rows.append(f'{{#{r:02x}{g:02x}{b:02x}}}')
+        column = tk.PhotoImage(width=1, height=height)
+        column.put(" ".join(rows), to=(0, 0))
+        return column.zoom(width, 1)
 
     def create_card_button(self, parent, title, icon, desc):
         # Increased height slightly to accommodate larger button
@@ -148,6 +264,9 @@ class MedicalVRMenu:
             messagebox.showinfo("Simulation", f"Launching standard VR module for: {module}")
 
 if __name__ == "__main__":
+    start = time.perf_counter()
     root = tk.Tk()
     app = MedicalVRMenu(root)
+    root.update_idletasks()
+    print(f"Menu ready in {(time.perf_counter() - start) * 1000:.0f} ms")
     root.mainloop()
\ No newline at end of file
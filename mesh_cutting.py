@@ -0,0 +1,266 @@
+import numpy as np
+from panda3d.core import Geom, GeomTriangles
+from soft_body import column_view
+from pbd_solver import build_csr, edge_keys
+
+# NOTE: Incremental cutting of a soft-body mesh (scalpel tool of the simulators).
+# A cut is a blade swept along the tool path: the plane through the path segment and
+# the view direction, limited to the segment length and a fixed depth.
+# Every mesh edge crossing the blade gets two new vertices at the crossing point, one for
+# each side, and the triangles around it are re-split so the two sides no longer share
+# vertices. Only the touched triangles change:
+#   - physics side (worker thread): SoftBody arrays, spatial hash and PBD edges are extended in place
+#   - render side (main thread): new GeomVertexData rows and triangle indices are written into
+#     capacity reserved up front, so the Geom is patched instead of rebuilt.
+# The work per cut follows the blade, not the mesh: candidate triangles are gathered from the
+# spatial hash around the blade (vertex -> triangle CSR), and edges are looked up by sorted
+# int64 keys built when the cutter is created.
+
+CUT_RESERVE_VERTICES = 8192   # Extra vertex rows reserved for cuts
+CUT_RESERVE_TRIANGLES = 16384 # Extra triangles reserved for cuts
+CUT_DEPTH_FRACTION = 0.12     # Blade depth as a fraction of the mesh size
+CUT_GAP_FRACTION = 0.04       # Rest-pose opening between the two sides, relative to the blade depth
+EDGE_STRETCH = 1.5            # Longest deformed edge, relative to the longest rest edge (candidate reach)
+
+
+class CutRequest:
+    """ One blade stroke in mesh-local space: from start to end, cutting along direction (into the tissue). """
+    def __init__(self, start, end, direction):
+        self.start = np.asarray(start, dtype=np.float32)
+        self.end = np.asarray(end, dtype=np.float32)
+        self.direction = np.asarray(direction, dtype=np.float32)
+
+
+class CutPatch:
+    """ Geometry changes of one cut, applied to the Geom on the main thread. """
+    def __init__(self, first_vertex, sources, normals, rows, triangles, appended):
+        self.first_vertex = first_vertex # Index of the first new vertex row
+        self.sources = sources           # Row whose attributes (color, uv) each new vertex copies
+        self.normals = normals           # Normals of the new vertices
+        self.rows = rows                 # Existing triangles that are overwritten...
+        self.triangles = triangles       # ...with these indices
+        self.appended = appended         # New triangles added at the end
+
+
+class MeshCutter:
+    def __init__(self, geom_node, body):
+        self.geom_node = geom_node
+        rest = body.rest
+        extent = float((rest.max(axis=0) - rest.min(axis=0)).max()) if len(rest) else 1.0
+        self.depth = CUT_DEPTH_FRACTION * extent
+        self.cuts = 0
+
+        # Existing edges: sorted keys of the build (cleared in edge_alive when cut) + keys added by cuts
+        edges = body.mesh.edges
+        self.edge_keys = np.sort(edge_keys(edges))
+        self.edge_alive = np.ones(len(self.edge_keys), dtype=bool)
+        self.extra_keys = np.empty(0, dtype=np.int64)
+        if body.constraints is not None:
+            body.constraints.build_lookup()
+        lengths = np.linalg.norm(rest[edges[:, 1]] - rest[edges[:, 0]], axis=1) if len(edges) else np.zeros(1)
+        self.reach = EDGE_STRETCH * float(lengths.max())
+
+        # Vertex -> triangle corners of the build; rows changed or added by cuts are kept apart
+        order, self.corner_indptr = build_csr(body.mesh.triangles.reshape(-1).astype(np.intp), len(rest))
+        self.corner_rows = (order // 3).astype(np.int64)
+        self.changed_rows = np.empty(0, dtype=np.int64)
+
+        # One indexed uint32 GeomTriangles in the same order as body.mesh.triangles, with room to grow
+        geom = geom_node.modifyGeom(0)
+        vdata = geom.modifyVertexData()
+        vdata.setUsageHint(Geom.UH_dynamic)
+        self.build_rows = vdata.getNumRows() # Vertex rows before any cut
+        vdata.reserveNumRows(self.build_rows + CUT_RESERVE_VERTICES)
+
+        triangles = body.mesh.triangles
+        prim = GeomTriangles(Geom.UH_dynamic)
+        prim.setIndexType(Geom.NT_uint32)
+        self.reserved_indices = 3 * (len(triangles) + CUT_RESERVE_TRIANGLES)
+        prim.reserveNumVertices(self.reserved_indices)
+        handle = prim.modifyVertices()
+        handle.uncleanSetNumRows(3 * len(triangles))
+        np.frombuffer(memoryview(handle).cast('B'), dtype=np.uint32)[:] = triangles.ravel()
+        geom.clearPrimitives()
+        geom.addPrimitive(prim)
+
+    def buffer_bytes(self):
+        """
+        Render memory the cutter owns: its private uint32 index buffer (with the triangle reserve)
+        and the vertex rows reserved for cuts beyond those in use.
+        """
+        geom = self.geom_node.getGeom(0)
+        vdata = geom.getVertexData()
+        fmt = vdata.getFormat()
+        stride = sum(fmt.getArray(i).getStride() for i in range(fmt.getNumArrays()))
+        indices = 4 * max(geom.getPrimitive(0).getNumVertices(), self.reserved_indices)
+        spare_rows = max(self.build_rows + CUT_RESERVE_VERTICES - vdata.getNumRows(), 0)
+        return indices + spare_rows * stride
+
+    # --- Physics side (worker thread) ---
+    def cut(self, body, request):
+        """ Applies one blade stroke to the body's topology. Returns a CutPatch, or None if nothing was cut. """
+        P, R, T = body.positions, body.rest, body.mesh.triangles
+        n = len(R)
+
+        # Blade frame: along the stroke (sd), into the tissue (dd), plane normal
+        a = request.start
+        stroke = request.end - a
+        length = float(np.linalg.norm(stroke))
+        if length < 1e-6:
+            return None
+        sd = stroke / length
+        dd = request.direction - (request.direction @ sd) * sd
+        if np.linalg.norm(dd) < 1e-6:
+            return None
+        dd /= np.linalg.norm(dd)
+        normal = np.cross(sd, dd)
+
+        # Sides of the plane, only for the vertices of the triangles near the blade
+        candidates = self.candidate_triangles(body, a, request.end, dd)
+        verts = np.zeros(n, dtype=bool)
+        verts[T[candidates]] = True
+        verts = np.flatnonzero(verts)
+        dist = np.zeros(n, dtype=np.float32)
+        dist[verts] = (P[verts] - a) @ normal
+        side = dist >= 0
+        tri_side = side[T[candidates]]
+        straddle = candidates[tri_side.any(axis=1) & ~tri_side.all(axis=1)]
+        if len(straddle) == 0:
+            return None
+
+        # Unique crossing edges of those triangles, cut where the crossing lies on the blade
+        tris = T[straddle]
+        eu, ev = tris.ravel(), tris[:, [1, 2, 0]].ravel()
+        crossing = side[eu] != side[ev]
+        keys = np.unique(np.minimum(eu, ev)[crossing].astype(np.int64) * n + np.maximum(eu, ev)[crossing])
+        u, v = keys // n, keys % n
+        t = dist[u] / (dist[u] - dist[v])
+        hit = P[u] + t[:, None] * (P[v] - P[u])
+        along = (hit - a) @ sd
+        deep = (hit - a) @ dd
+        on_blade = (along >= 0) & (along <= length) & (deep >= -0.25 * self.depth) & (deep <= self.depth)
+        if not on_blade.any():
+            return None
+        u, v, t = u[on_blade], v[on_blade], t[on_blade].astype(np.float32)
+        edge_id = {(int(x), int(y)): i for i, (x, y) in enumerate(zip(u, v))}
+
+        # Two new vertices per cut edge: first + 2i on the positive side, first + 2i + 1 on the negative side
+        gap = np.float32(0.5 * CUT_GAP_FRACTION * self.depth) * normal
+        offsets = np.array([gap, -gap], dtype=np.float32)
+        rest_new = (R[u] + t[:, None] * (R[v] - R[u]))[:, None, :] + offsets
+        pos_new = (P[u] + t[:, None] * (P[v] - P[u]))[:, None, :] + offsets
+        normals = body.rest_normals[u] + t[:, None] * (body.rest_normals[v] - body.rest_normals[u])
+        normals /= np.maximum(np.linalg.norm(normals, axis=1), 1e-9)[:, None]
+        normals = np.repeat(normals, 2, axis=0)
+        sources = np.repeat(np.where(t < 0.5, u, v), 2)
+        first = body.append_vertices(rest_new.reshape(-1, 3), normals, pos_new.reshape(-1, 3))
+
+        def split(x, y, positive):
+            i = edge_id.get((min(x, y), max(x, y)))
+            return None if i is None else first + 2 * i + (0 if positive else 1)
+
+        rows, replaced, appended = [], [], []
+        for row, tri in zip(straddle, tris):
+            x0, x1, x2 = (int(i) for i in tri)
+            cut_edges = [(p, q, r) for p, q, r in ((x0, x1, x2), (x1, x2, x0), (x2, x0, x1))
+                         if split(p, q, True) is not None]
+            if len(cut_edges) == 2:
+                # Rotate so y0 is the lone vertex on its side of the blade
+                for y0, y1, y2 in ((x0, x1, x2), (x1, x2, x0), (x2, x0, x1)):
+                    if side[y1] == side[y2] != side[y0]:
+                        break
+                p01, q01 = split(y0, y1, side[y0]), split(y0, y1, side[y1])
+                p02, q02 = split(y0, y2, side[y0]), split(y0, y2, side[y2])
+                new = [(y0, p01, p02), (q01, y1, y2), (q01, y2, q02)]
+            elif len(cut_edges) == 1:
+                # End of the blade: split the one edge, the crack stops at the opposite vertex
+                y0, y1, y2 = cut_edges[0]
+                new = [(y0, split(y0, y1, side[y0]), y2), (split(y0, y1, side[y1]), y1, y2)]
+            else:
+                continue
+            rows.append(row)
+            replaced.append(new[0])
+            appended.extend(new[1:])
+
+        rows = np.array(rows, dtype=np.int64)
+        replaced = np.array(replaced, dtype=np.int32).reshape(-1, 3)
+        appended = np.array(appended, dtype=np.int32).reshape(-1, 3)
+        triangles = np.concatenate([T, appended]) # New array: T may be shared with other instances
+        triangles[rows] = replaced
+
+        # Edges: the cut ones are gone, edges of the new triangles are added if they are new
+        removed = np.column_stack([u, v])
+        self.remove_keys(edge_keys(removed))
+        new_triangles = np.concatenate([replaced, appended])
+        keys = np.unique(edge_keys(new_triangles[:, [0, 1, 1, 2, 2, 0]]))
+        keys = keys[~self.has_keys(keys)]
+        self.extra_keys = np.union1d(self.extra_keys, keys)
+        added = np.column_stack([keys >> 32, keys & 0xFFFFFFFF])
+        self.changed_rows = np.union1d(self.changed_rows,
+                                       np.concatenate([rows, len(T) + np.arange(len(appended), dtype=np.int64)]))
+        body.update_topology(triangles, removed, added)
+
+        self.cuts += 1
+        return CutPatch(first, sources, normals, rows, replaced, appended)
+
+    def candidate_triangles(self, body, a, b, dd):
+        """
+        Rows of the triangles that may cross the blade (a -> b, cutting along dd): those with a
+        vertex within reach of the blade in the spatial hash, plus any row cuts changed.
+        Without a grid (small mesh) every triangle is a candidate.
+        """
+        T, grid = body.mesh.triangles, body.grid
+        if grid is None:
+            return np.arange(len(T), dtype=np.int64)
+        if not body.bounds_valid:
+            body.update_cell_bounds(None)
+        # Capsule along the middle of the blade, covering its depth [-depth / 4, depth]
+        mid = (0.375 * self.depth) * dd
+        radius = 0.625 * self.depth + self.reach
+        idx = grid.query_capsule_displaced(a + mid, b + mid, radius, body.cell_bounds)
+        idx = idx[idx < len(self.corner_indptr) - 1]
+        starts = self.corner_indptr[idx]
+        lengths = self.corner_indptr[idx + 1] - starts
+        first = np.cumsum(lengths) - lengths
+        selected = np.zeros(len(T), dtype=bool) # Mask instead of np.unique: no sort of the gathered rows
+        selected[self.corner_rows[np.repeat(starts - first, lengths) + np.arange(lengths.sum())]] = True
+        if len(self.changed_rows):
+            near = np.zeros(len(body.rest), dtype=bool)
+            near[idx] = True
+            near[len(self.corner_indptr) - 1:] = True # Vertices added by cuts
+            selected[self.changed_rows[near[T[self.changed_rows]].any(axis=1)]] = True
+        return np.flatnonzero(selected)
+
+    def has_keys(self, keys):
+        """ Mask of the edge keys that are current mesh edges. """
+        slot = np.minimum(np.searchsorted(self.edge_keys, keys), len(self.edge_keys) - 1)
+        found = (self.edge_keys[slot] == keys) & self.edge_alive[slot] if len(self.edge_keys) else False
+        return found | np.isin(keys, self.extra_keys)
+
+    def remove_keys(self, keys):
+        slot = np.minimum(np.searchsorted(self.edge_keys, keys), len(self.edge_keys) - 1)
+        found = self.edge_keys[slot] == keys
+        self.edge_alive[slot[found]] = False
+        self.extra_keys = self.extra_keys[~np.isin(self.extra_keys, keys)]
+
+    # --- Render side (main thread) ---
+    def apply(self, patch, vdata):
+        """ Writes one CutPatch into the reserved rows of the vertex data and triangle list. """
+        vdata.setNumRows(patch.first_vertex + len(patch.sources))
+        # Whole rows of every array (position, color, uv, ...) copied at once, like copyRowFrom per row
+        for i in range(vdata.getNumArrays()):
+            stride = vdata.getFormat().getArray(i).getStride()
+            rows = np.frombuffer(memoryview(vdata.modifyArray(i)).cast('B'), dtype=np.uint8).reshape(-1, stride)
+            rows[patch.first_vertex:] = rows[patch.sources]
+        normals = column_view(vdata, 'normal', modify=True)
+        if normals is not None:
+            normals[patch.first_vertex:] = patch.normals
+
+        prim = self.geom_node.modifyGeom(0).modifyPrimitive(0)
+        handle = prim.modifyVertices()
+        old_rows = handle.getNumRows()
+        handle.setNumRows(old_rows + 3 * len(patch.appended))
+        indices = np.frombuffer(memoryview(handle).cast('B'), dtype=np.uint32).reshape(-1, 3)
+        indices[patch.rows] = patch.triangles
+        indices[old_rows // 3:] = patch.appended
+        prim.clearMinmax()
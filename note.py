@@ -1,6 +1,16 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, font
 import os
+import time
+from note_journal import NoteJournal, AutosaveWorker, JOURNAL_SUFFIX
+from record_format import FORMATTING_TAGS, RECORD_EXTENSION, capture_tags, apply_tags, write_record, is_formatted
+from record_pager import PagedTextView, PAGED_THRESHOLD_BYTES
+from record_store import RecordStore
+
+# Autosave debounce: save 1.5 s after typing stops, but at least every 10 s while typing
+AUTOSAVE_DELAY_MS = 1500
+AUTOSAVE_MAX_DELAY_MS = 10000
+UNTITLED_PREFIX = "Untitled_" # Temporary autosave records of notes that were never saved
 
 class SmartMedicalNotes:
     def __init__(self, parent_window=None):
@@ -64,6 +74,8 @@ class SmartMedicalNotes:
         )
         self.text_area.pack(expand=True, fill=tk.BOTH)
         scrollbar.config(command=self.text_area.yview)
+        self.scrollbar = scrollbar
+        self.pager = None # Set while a very large record is open in paged (read-only) mode
 
         # 7. Configure Highlighting Tags
         self.text_area.tag_configure("highlight_yellow", background=self.colors['highlight_y'])
@@ -72,6 +84,19 @@ class SmartMedicalNotes:
         self.text_area.tag_configure("bold", font=("Calibri", 14, "bold"))
         self.text_area.tag_configure("header", font=("Segoe UI", 24, "bold"), foreground=self.colors['accent'])
 
+        # 8. Background Autosave (journal next to the record)
+        self.current_file = None
+        self.autosave_job = None
+        self.autosave_first_edit = None
+        self.autosaver = AutosaveWorker(self.untitled_journal())
+        self.text_area.bind("<<Modified>>", self.on_text_modified)
+        self.window.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.window.after_idle(self.recover_autosave)
+
+        # 9. Versioned Patient Database (opened on first use)
+        self.store = None
+        self.store_key = None # (patient, created) of the DB record this note belongs to
+
     def create_formatting_tools(self):
         # Header Label
         tk.Label(self.toolbar, text="Tools:", bg=self.colors['toolbar'], 
@@ -97,6 +122,16 @@ class SmartMedicalNotes:
                              bg=self.colors['accent'], fg="white", font=("Segoe UI", 9, "bold"), relief=tk.FLAT)
         save_btn.pack(side=tk.RIGHT, padx=10, pady=5)
 
+        # Open Button
+        open_btn = tk.Button(self.toolbar, text="📂 Open Record", command=self.open_file, 
+                             bg="white", fg=self.colors['accent'], font=("Segoe UI", 9, "bold"), relief=tk.FLAT)
+        open_btn.pack(side=tk.RIGHT, padx=5, pady=5)
+
+        # Patient Database Button
+        db_btn = tk.Button(self.toolbar, text="🗄 Patient DB", command=self.open_store_browser, 
+                           bg="white", fg=self.colors['accent'], font=("Segoe UI", 9, "bold"), relief=tk.FLAT)
+        db_btn.pack(side=tk.RIGHT, padx=5, pady=5)
+
     def create_sticker_tools(self):
         tk.Frame(self.toolbar, width=2, height=30, bg="#B0BEC5").pack(side=tk.LEFT, padx=10)
         tk.Label(self.toolbar, text="Stickers:", bg=self.colors['toolbar'], 
@@ -123,9 +158,11 @@ class SmartMedicalNotes:
     def add_sticker(self, sticker):
         self.text_area.insert(tk.INSERT, f" {sticker} ")
 
+    # Tag changes do not raise <<Modified>>, so formatting actions schedule the autosave themselves
     def apply_highlight(self, tag_name):
         try: self.text_area.tag_add(tag_name, "sel.first", "sel.last")
         except tk.TclError: pass
+        self.schedule_autosave()
 
     def toggle_bold(self):
         try:
@@ -133,18 +170,25 @@ class SmartMedicalNotes:
             if "bold" in current_tags: self.text_area.tag_remove("bold", "sel.first", "sel.last")
             else: self.text_area.tag_add("bold", "sel.first", "sel.last")
         except tk.TclError: pass
+        self.schedule_autosave()
 
     def make_header(self):
         try: self.text_area.tag_add("header", "sel.first", "sel.last")
         except tk.TclError: pass
+        self.schedule_autosave()
 
     def clear_format(self):
         try:
-            for tag in ["highlight_yellow", "highlight_green", "highlight_blue", "bold", "header"]:
+            for tag in FORMATTING_TAGS:
                 self.text_area.tag_remove(tag, "sel.first", "sel.last")
         except tk.TclError: pass
+        self.schedule_autosave()
 
     def save_file(self):
+        if self.pager is not None:
+            messagebox.showinfo("Read-Only", "Large records are opened in paged read-only mode and cannot be saved from here.")
+            return
+
         # Ensure directory exists before saving
         if not os.path.exists(self.save_folder):
             try:
@@ -153,20 +197,225 @@ class SmartMedicalNotes:
                 messagebox.showerror("Error", "Cannot create 'Patient_Records' folder.")
                 return
 
+        # .smr keeps bold/header/highlights; .txt is a plain text export
         file_path = filedialog.asksaveasfilename(
             initialdir=self.save_folder,
             initialfile="Patient_Log",
-            defaultextension=".txt", 
-            filetypes=[("Text Files", "*.txt"), ("All Files", "*.*")]
+            defaultextension=RECORD_EXTENSION, 
+            filetypes=[("Formatted Record", f"*{RECORD_EXTENSION}"), ("Text Files", "*.txt"), ("All Files", "*.*")]
         )
         if file_path:
             try:
-                with open(file_path, "w", encoding="utf-8") as f:
-                    f.write(self.text_area.get("1.0", tk.END))
+                text, spans = self.snapshot()
+                write_record(file_path, text, spans)
+                if not is_formatted(file_path):
+                    # One-off plain text export: autosave keeps journaling the formatted record
+                    messagebox.showinfo("Success", "Note exported as plain text.")
+                    return
+                # Autosave now journals against the file that was just written
+                self.cancel_autosave()
+                self.autosaver.retarget(NoteJournal(file_path), saved=(text, spans))
+                self.current_file = file_path
                 messagebox.showinfo("Success", "Note saved to Patient Records!")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save file: {e}")
 
+    def open_file(self):
+        file_path = filedialog.askopenfilename(
+            initialdir=self.save_folder,
+            filetypes=[("Patient Records", f"*{RECORD_EXTENSION} *.txt"), ("All Files", "*.*")]
+        )
+        if file_path:
+            self.load_file(file_path)
+
+    def load_file(self, file_path):
+        """ Opens a record, replaying its autosave journal if the last session crashed. """
+        try:
+            # Persist the current note before switching records
+            self.cancel_autosave()
+            if self.pager is None:
+                self.autosaver.submit(self.snapshot())
+            self.autosaver.flush(compact=True)
+
+            # Very large records (without pending edits) stream in page by page instead
+            paged = (os.path.exists(file_path) and os.path.getsize(file_path) > PAGED_THRESHOLD_BYTES
+                     and not os.path.exists(file_path + JOURNAL_SUFFIX))
+            if not paged:
+                # A recovered untitled autosave stays temporary until it is saved properly
+                journal = NoteJournal(file_path, temporary=os.path.basename(file_path).startswith(UNTITLED_PREFIX))
+                text, spans = journal.replay()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to open file: {e}")
+            return
+
+        self.detach_pager()
+        self.current_file = file_path
+        if paged:
+            self.pager = PagedTextView(self.text_area, self.scrollbar, file_path)
+            self.window.title(f"Surgeon's Digital Whiteboard - {os.path.basename(file_path)} (read-only, paged)")
+            self.autosaver.retarget(self.untitled_journal()) # Read-only: nothing to journal
+            return
+
+        self.show_text(text, spans, os.path.basename(file_path))
+        self.autosaver.retarget(journal)
+
+    def show_text(self, text, spans, title):
+        # The widget always keeps one implicit trailing newline (saved by get("1.0", END))
+        self.text_area.delete("1.0", tk.END)
+        self.text_area.insert("1.0", text[:-1] if text.endswith("\n") else text)
+        apply_tags(self.text_area, spans)
+        self.text_area.edit_reset()
+        self.text_area.edit_modified(False)
+        self.window.title(f"Surgeon's Digital Whiteboard - {title}")
+
+    def untitled_journal(self):
+        untitled = os.path.join(self.save_folder, f"{UNTITLED_PREFIX}{time.strftime('%Y%m%d_%H%M%S')}{RECORD_EXTENSION}")
+        return NoteJournal(untitled, temporary=True)
+
+    # --- Patient Database ---
+    def get_store(self):
+        if self.store is None:
+            self.store = RecordStore()
+        return self.store
+
+    def open_store_browser(self):
+        """ Small window: save the note as a new version, or open a stored record. """
+        try:
+            store = self.get_store()
+        except Exception as e:
+            messagebox.showerror("Error", f"Cannot open patient database: {e}")
+            return
+
+        popup = tk.Toplevel(self.window)
+        popup.title("Patient Database")
+        popup.geometry("520x420")
+        popup.configure(bg=self.colors['bg'])
+
+        row = tk.Frame(popup, bg=self.colors['bg'])
+        row.pack(fill=tk.X, padx=15, pady=10)
+        tk.Label(row, text="Patient:", bg=self.colors['bg'], font=("Segoe UI", 10, "bold")).pack(side=tk.LEFT)
+        patient_var = tk.StringVar(value=self.store_key[0] if self.store_key else "")
+        tk.Entry(row, textvariable=patient_var, font=("Segoe UI", 11)).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=8)
+        tk.Button(row, text="Save New Version", bg=self.colors['accent'], fg="white", relief=tk.FLAT,
+                  command=lambda: self.save_to_store(patient_var.get().strip(), popup)).pack(side=tk.LEFT)
+
+        records = store.list_by_date(limit=200)
+        listbox = tk.Listbox(popup, font=("Segoe UI", 10), activestyle="none")
+        listbox.pack(expand=True, fill=tk.BOTH, padx=15, pady=(0, 15))
+        for patient, created, version, saved_at in records:
+            listbox.insert(tk.END, f"{patient}  |  {time.strftime('%Y-%m-%d %H:%M', time.localtime(created))}  |  "
+                                   f"v{version}  (saved {time.strftime('%Y-%m-%d %H:%M', time.localtime(saved_at))})")
+
+        def on_open(event):
+            selection = listbox.curselection()
+            if selection:
+                patient, created = records[selection[0]][:2]
+                self.load_from_store(patient, created)
+                popup.destroy()
+        listbox.bind("<Double-Button-1>", on_open)
+
+    def save_to_store(self, patient, popup=None):
+        if self.pager is not None:
+            messagebox.showinfo("Read-Only", "Large records are opened in paged read-only mode and cannot be saved from here.")
+            return
+        if not patient:
+            messagebox.showerror("Error", "Please enter a patient name or ID.")
+            return
+        # A new patient name starts a new record; the same patient adds a version to it
+        if self.store_key is None or self.store_key[0] != patient:
+            self.store_key = (patient, time.time())
+        text, spans = self.snapshot()
+        try:
+            store = self.get_store()
+            store.save(*self.store_key, text, spans)
+            store.flush()
+            version = store.load(*self.store_key)[2]
+            messagebox.showinfo("Success", f"Saved version {version} for {patient}.", parent=popup or self.window)
+            if popup is not None:
+                popup.destroy()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to save to database: {e}")
+
+    def load_from_store(self, patient, created, version=None):
+        record = self.get_store().load(patient, created, version)
+        if record is None:
+            return
+        # Persist the current note, then journal edits of this record in a fresh autosave file
+        self.cancel_autosave()
+        if self.pager is None:
+            self.autosaver.submit(self.snapshot())
+        self.autosaver.flush(compact=True)
+        self.detach_pager()
+
+        text, spans, version = record
+        self.show_text(text, spans, f"{patient} (v{version})")
+        self.store_key = (patient, created)
+        self.current_file = None
+        self.autosaver.retarget(self.untitled_journal())
+
+    def detach_pager(self):
+        if self.pager is not None:
+            self.pager.detach(self.scrollbar.set, self.text_area.yview)
+            self.pager = None
+
+    # --- Autosave Logic ---
+    def snapshot(self):
+        """ (text, formatting spans) of the note, taken on the UI thread. """
+        return self.text_area.get("1.0", tk.END), capture_tags(self.text_area)
+
+    def on_text_modified(self, event=None):
+        if not self.text_area.edit_modified():
+            return
+        self.text_area.edit_modified(False)
+        self.schedule_autosave()
+
+    def schedule_autosave(self):
+        if self.pager is not None:
+            return # Paged view is read-only and only holds part of the record
+        # Debounce: restart the timer on every edit, unless edits have been pending too long
+        now = time.monotonic()
+        if self.autosave_first_edit is None:
+            self.autosave_first_edit = now
+        if self.autosave_job is not None:
+            if (now - self.autosave_first_edit) * 1000 >= AUTOSAVE_MAX_DELAY_MS:
+                return
+            self.window.after_cancel(self.autosave_job)
+        self.autosave_job = self.window.after(AUTOSAVE_DELAY_MS, self.autosave)
+
+    def autosave(self):
+        self.autosave_job = None
+        self.autosave_first_edit = None
+        # Only the snapshot happens on the UI thread; diffing and disk I/O run in the worker
+        self.autosaver.submit(self.snapshot())
+
+    def cancel_autosave(self):
+        if self.autosave_job is not None:
+            self.window.after_cancel(self.autosave_job)
+        self.autosave_job = None
+        self.autosave_first_edit = None
+
+    def recover_autosave(self):
+        """ Offers to restore the newest record that still has an uncompacted journal (crash). """
+        try:
+            journals = [e for e in os.scandir(self.save_folder) if e.name.endswith(JOURNAL_SUFFIX)]
+        except OSError:
+            return
+        if not journals:
+            return
+        newest = max(journals, key=lambda e: e.stat().st_mtime)
+        record = newest.path[:-len(JOURNAL_SUFFIX)]
+        if messagebox.askyesno("Recover Note", f"Unsaved changes were found for:\n{os.path.basename(record)}\n\nRestore them?"):
+            self.load_file(record)
+
+    def on_close(self):
+        self.cancel_autosave()
+        if self.pager is None:
+            self.autosaver.submit(self.snapshot())
+        self.autosaver.stop()
+        if self.store is not None:
+            self.store.close()
+        self.window.destroy()
+
 if __name__ == "__main__":
     app = SmartMedicalNotes()
     app.window.mainloop()
\ No newline at end of file
@@ -0,0 +1,261 @@
+import os
+import json
+import threading
+from record_format import read_record, write_record
+
+# NOTE: Crash-safe autosave for SmartMedicalNotes.
+# Each record 'Patient_Log.txt' gets an append-only 'Patient_Log.txt.journal' next to it.
+# Every autosave appends one small edit record (offset, deleted length, inserted text),
+# so the cost of a save depends on the size of the edit, not the size of the note.
+# Formatting spans (see record_format.py) are journaled only when they change, as one replace
+# edit per changed tag on its delta-encoded list: typing shifts the spans of one line, so the
+# entry stays as small as the edit instead of carrying the whole spans dict.
+# The journal is folded back into the record ("compaction") once it grows too large.
+
+JOURNAL_SUFFIX = ".journal"
+COMPACT_MIN_BYTES = 64 * 1024   # Never compact tiny journals
+COMPACT_RATIO = 0.5             # Compact once the journal is half the size of the record
+COMPACT_MAX_EDITS = 500
+BLOCK = 4096
+
+
+def _common_prefix_len(a, b):
+    """ Length of the common prefix, compared block by block so most work happens in C. """
+    limit = min(len(a), len(b))
+    i = 0
+    while i + BLOCK <= limit and a[i:i + BLOCK] == b[i:i + BLOCK]:
+        i += BLOCK
+    while i < limit and a[i] == b[i]:
+        i += 1
+    return i
+
+
+def _common_suffix_len(a, b, limit):
+    """ Length of the common suffix, never reaching into the first 'limit' characters. """
+    limit = min(len(a), len(b)) - limit
+    i = 0
+    while i + BLOCK <= limit and a[len(a) - i - BLOCK:len(a) - i] == b[len(b) - i - BLOCK:len(b) - i]:
+        i += BLOCK
+    while i < limit and a[len(a) - i - 1] == b[len(b) - i - 1]:
+        i += 1
+    return i
+
+
+def diff_edit(old, new):
+    """ Single replace edit turning old into new: (offset, delete_len, insert_text) or None. """
+    if old == new:
+        return None
+    start = _common_prefix_len(old, new)
+    tail = _common_suffix_len(old, new, start)
+    return start, len(old) - start - tail, new[start:len(new) - tail]
+
+
+def apply_edit(text, edit):
+    offset, delete_len, insert = edit
+    return text[:offset] + insert + text[offset + delete_len:]
+
+
+def diff_spans(old, new):
+    """ {tag: [offset, delete_len, inserted ints]} turning the old spans dict into the new one. """
+    edits = {}
+    for tag in {**old, **new}:
+        edit = diff_edit(old.get(tag, []), new.get(tag, []))
+        if edit is not None:
+            edits[tag] = list(edit)
+    return edits
+
+
+def apply_span_edits(spans, edits):
+    spans = dict(spans)
+    for tag, edit in edits.items():
+        flat = apply_edit(spans.get(tag, []), edit)
+        if flat:
+            spans[tag] = flat
+        else:
+            spans.pop(tag, None)
+    return spans
+
+
+class NoteJournal:
+    """ Append-only edit journal for one record file. Not thread-safe: owned by AutosaveWorker. """
+    def __init__(self, record_path, temporary=False):
+        self.record_path = record_path
+        self.journal_path = record_path + JOURNAL_SUFFIX
+        self.temporary = temporary # Untitled autosave file, removed once the note is saved properly
+        self.base_size = os.path.getsize(record_path) if os.path.exists(record_path) else 0
+        self.journal_size = os.path.getsize(self.journal_path) if os.path.exists(self.journal_path) else 0
+        self.edit_count = 0
+        self.last_text = None
+        self.last_spans = {}
+
+    def replay(self):
+        """ Rebuilds the latest (text, spans): record contents + every complete journal entry. """
+        text, spans = read_record(self.record_path)
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break # Torn final line from a crash mid-write
+                    if "o" in entry:
+                        text = apply_edit(text, (entry["o"], entry["d"], entry["i"]))
+                    if "s" in entry:
+                        spans = apply_span_edits(spans, entry["s"])
+                    self.edit_count += 1
+        self.last_text = text
+        self.last_spans = spans
+        return text, spans
+
+    def append(self, text, spans=None):
+        """ Journals the difference between the last persisted state and the new one. """
+        if self.last_text is None:
+            self.replay()
+        entry = {}
+        edit = diff_edit(self.last_text, text)
+        if edit is not None:
+            entry.update(o=edit[0], d=edit[1], i=edit[2])
+        if spans is not None and spans != self.last_spans:
+            entry["s"] = diff_spans(self.last_spans, spans)
+        if not entry:
+            return False
+
+        data = (json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        with open(self.journal_path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.journal_size += len(data)
+        self.edit_count += 1
+        self.last_text = text
+        if spans is not None:
+            self.last_spans = spans
+
+        if self.needs_compaction():
+            self.compact(text, self.last_spans)
+        return True
+
+    def needs_compaction(self):
+        if self.edit_count >= COMPACT_MAX_EDITS:
+            return True
+        return self.journal_size > COMPACT_MIN_BYTES and self.journal_size > self.base_size * COMPACT_RATIO
+
+    def compact(self, text, spans=None):
+        """ Folds the journal into the record and starts an empty journal. """
+        write_record(self.record_path, text, spans)
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.base_size = os.path.getsize(self.record_path)
+        self.journal_size = 0
+        self.edit_count = 0
+        self.last_text = text
+        self.last_spans = spans or {}
+
+    def reset(self, text, spans=None):
+        """ The record was just written in full (explicit save): start from an empty journal. """
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self.base_size = os.path.getsize(self.record_path) if os.path.exists(self.record_path) else 0
+        self.journal_size = 0
+        self.edit_count = 0
+        self.last_text = text
+        self.last_spans = spans or {}
+
+    def is_empty(self):
+        """ True if the journaled note has no text (nothing worth keeping in an untitled autosave). """
+        if self.last_text is None: # Nothing journaled in this session
+            return not os.path.exists(self.record_path) and not os.path.exists(self.journal_path)
+        return not self.last_text.strip()
+
+    def discard(self):
+        """ Drops the journal (and the record itself if it was only a temporary autosave). """
+        paths = [self.journal_path, self.record_path] if self.temporary else [self.journal_path]
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+class AutosaveWorker:
+    """
+    Background thread that persists (text, spans) snapshots handed over by the UI thread.
+    Only the newest pending snapshot is kept, so a slow disk never builds a backlog.
+    """
+    def __init__(self, journal):
+        self.journal = journal
+        self.pending = None
+        self.pending_journal = None
+        self.pending_saved = None
+        self.compact_requested = False
+        self.running = True
+        self.idle = True
+        self.last_error = None
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="NotesAutosave", daemon=True)
+        self.thread.start()
+
+    def submit(self, snapshot):
+        with self.cond:
+            self.pending = snapshot
+            self.cond.notify()
+
+    def retarget(self, journal, saved=None):
+        """
+        Switches to another record, e.g. after 'Open' loaded it. A temporary (untitled) journal
+        switched away from is only discarded with its record if the note was empty.
+        saved is the (text, spans) snapshot after an explicit save: it is now the record's full contents.
+        """
+        with self.cond:
+            self.pending_journal = journal
+            self.pending_saved = saved
+            self.pending = None
+            self.cond.notify()
+
+    def flush(self, compact=False):
+        """ Blocks until everything submitted so far is on disk. """
+        with self.cond:
+            if compact:
+                self.compact_requested = True
+                self.cond.notify()
+            self.cond.wait_for(lambda: self.idle and self.pending is None and self.pending_journal is None
+                               and not self.compact_requested)
+
+    def stop(self):
+        self.flush(compact=True)
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        self.thread.join(timeout=5)
+
+    def _run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending is not None or self.pending_journal is not None
+                                   or self.compact_requested or not self.running)
+                if not self.running:
+                    return
+                snapshot, self.pending = self.pending, None
+                new_journal, self.pending_journal = self.pending_journal, None
+                saved, self.pending_saved = self.pending_saved, None
+                compact, self.compact_requested = self.compact_requested, False
+                self.idle = False
+            try:
+                if new_journal is not None:
+                    old_journal, self.journal = self.journal, new_journal
+                    # 'Save As' supersedes the previous journal (and any untitled autosave); leaving an
+                    # untitled autosave keeps it unless the note was empty (the caller flushed it first)
+                    if (saved is not None or (old_journal.temporary and old_journal.is_empty())) \
+                            and old_journal.journal_path != new_journal.journal_path:
+                        old_journal.discard()
+                    if saved is not None:
+                        new_journal.reset(*saved)
+                if snapshot is not None:
+                    self.journal.append(*snapshot)
+                if compact and self.journal.edit_count:
+                    self.journal.compact(self.journal.last_text, self.journal.last_spans)
+            except Exception as e:
+                self.last_error = e
+                print(f"Autosave Error: {e}")
+            finally:
+                with self.cond:
+                    self.idle = True
+                    self.cond.notify_all()
@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from panda3d.core import Loader, NodePath, Filename, LoaderOptions
+from soft_body import MeshData, GRID_MIN_VERTICES
+from spatial_hash import SpatialHash
+
+# NOTE: Offline preprocessing of organ scans into simulation-ready bundles.
+# Everything the simulators otherwise compute at import time (flattening, normalization to
+# MODEL_SIZE units, vertex extraction, seam-welded edge adjacency, spatial hash) is done once,
+# in a process pool, for a whole directory of scans. A bundle is two files:
+#   <name>.bam      normalized, flattened model (Panda3D's native format, loads without conversion)
+#   <name>.sim.npz  rest positions, normals, triangles, edges and spatial hash arrays of its first Geom
+# load_asset() in the simulators opens the .bam and takes the arrays instead of recomputing them.
+#
+#   python organ_bundle.py <scan folder> [output folder] [--workers N]
+
+MODEL_SIZE = 10.0 # Largest dimension of a normalized organ (same as load_asset)
+SCAN_EXTENSIONS = (".obj", ".stl", ".glb", ".gltf", ".egg", ".ply", ".fbx")
+ARRAYS_SUFFIX = ".sim.npz"
+BUNDLE_VERSION = 1
+
+
+def arrays_path(bam_path):
+    return os.path.splitext(bam_path)[0] + ARRAYS_SUFFIX
+
+
+def normalize_model(model, size=MODEL_SIZE):
+    """ Flattens the model and scales/centers it so its largest dimension is 'size' units. """
+    model.flattenStrong()
+    b = model.getTightBounds()
+    if b:
+        dims = b[1] - b[0]
+        max_dim = max(dims.x, dims.y, dims.z)
+        scale = size / max_dim
+        model.setScale(scale)
+        center = (b[0] + b[1]) / 2.0
+        model.setPos(-center * scale)
+        model.flattenLight()
+    return model
+
+
+def load_scan(path):
+    """ Scan file -> (NodePath, has vertex colors), without a ShowBase (worker processes). """
+    lower = path.lower()
+    if lower.endswith(".ply"):
+        from ply_loader import load_ply_model
+        return load_ply_model(path)
+    if lower.endswith(".stl"):
+        import trimesh # Optional, as in the simulators
+        from ply_loader import build_geom_node
+        mesh = trimesh.load(path, force="mesh")
+        arrays = {'points': np.asarray(mesh.vertices, dtype=np.float32),
+                  'normals': np.asarray(mesh.vertex_normals, dtype=np.float32),
+                  'colors': None, 'triangles': np.asarray(mesh.faces, dtype=np.uint32)}
+        model = NodePath("stl_root")
+        model.attachNewNode(build_geom_node(arrays, "stl_mesh"))
+        return model, False
+    node = Loader.getGlobalPtr().loadSync(Filename.fromOsSpecific(os.path.abspath(path)),
+                                          LoaderOptions(LoaderOptions.LF_no_cache))
+    if node is None:
+        raise ValueError("Panda3D could not load the file.")
+    return NodePath(node), False
+
+
+def build_bundle(path, out_dir):
+    """ Worker: one scan -> <name>.bam + <name>.sim.npz. Returns a summary dict. """
+    start = time.perf_counter()
+    model, has_colors = load_scan(path)
+    normalize_model(model)
+    gn = model.find('**/+GeomNode')
+    if gn.isEmpty():
+        raise ValueError("No geometry in the file.")
+    mesh = MeshData(gn.node())
+    grid = SpatialHash(mesh.rest_positions)
+
+    name = os.path.splitext(os.path.basename(path))[0]
+    bam_path = os.path.join(out_dir, name + ".bam")
+    if not model.writeBamFile(Filename.fromOsSpecific(bam_path)):
+        raise IOError(f"Could not write {bam_path}")
+    meta = {"version": BUNDLE_VERSION, "source": os.path.basename(path), "has_colors": bool(has_colors),
+            "vertices": mesh.num_vertices, "triangles": len(mesh.triangles), "created": time.time()}
+    np.savez(arrays_path(bam_path), meta=np.array(json.dumps(meta)),
+             rest_positions=mesh.rest_positions, rest_normals=mesh.rest_normals,
+             triangles=mesh.triangles, edges=mesh.edges, **{f"grid_{k}": v for k, v in grid.arrays().items()})
+    meta["seconds"] = time.perf_counter() - start
+    meta["bundle"] = bam_path
+    return meta
+
+
+def load_bundle_arrays(bam_path, geom_node):
+    """
+    (MeshData, SpatialHash) from the arrays next to a bundle's .bam, or None if there are none
+    or they do not match the loaded geometry (then the caller extracts them as usual).
+    """
+    path = arrays_path(bam_path)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        meta = json.loads(str(data["meta"]))
+        rows = geom_node.getGeom(0).getVertexData().getNumRows()
+        if meta.get("version") != BUNDLE_VERSION or meta["vertices"] != rows:
+            print(f"WARNING: {path} does not match its model, recomputing.")
+            return None
+        mesh = MeshData.from_arrays(data["rest_positions"], data["rest_normals"], data["triangles"], data["edges"])
+        grid = None
+        if mesh.num_vertices >= GRID_MIN_VERTICES: # Small meshes are scanned directly, as in SoftBody
+            grid = SpatialHash.from_arrays(mesh.rest_positions, {k[5:]: data[k] for k in data.files if k.startswith("grid_")})
+    return mesh, grid
+
+
+def bundle_has_colors(bam_path):
+    path = arrays_path(bam_path)
+    if not os.path.exists(path):
+        return False
+    with np.load(path) as data:
+        return json.loads(str(data["meta"])).get("has_colors", False)
+
+
+def preprocess_folder(src, out_dir=None, workers=None):
+    out_dir = out_dir or os.path.join(src, "bundles")
+    os.makedirs(out_dir, exist_ok=True)
+    scans = sorted(os.path.join(src, f) for f in os.listdir(src) if f.lower().endswith(SCAN_EXTENSIONS))
+    if not scans:
+        print(f"No scans ({', '.join(SCAN_EXTENSIONS)}) in {src}")
+        return 0
+    start = time.perf_counter()
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = {pool.submit(build_bundle, path, out_dir): path for path in scans}
+        for job in as_completed(jobs):
+            name = os.path.basename(jobs[job])
+            try:
+                r = job.result()
+                done += 1
+                print(f"SUCCESS: {name} -> {r['bundle']} ({r['vertices']} verts, {r['triangles']} tris, "
+                      f"{r['seconds']:.2f} s)")
+            except Exception as e:
+                print(f"WARNING: {name} failed: {e}")
+    print(f"{done}/{len(scans)} bundles in {time.perf_counter() - start:.2f} s -> {out_dir}")
+    return done
+
+
+if __name__ == "__main__":
+    args, workers = [], None
+    argv = iter(sys.argv[1:])
+    for arg in argv:
+        if arg == "--workers":
+            workers = int(next(argv))
+        elif arg.startswith("--workers="):
+            workers = int(arg.split("=", 1)[1])
+        else:
+            args.append(arg)
+    if not args:
+        print("Usage: python organ_bundle.py <scan folder> [output folder] [--workers N]")
+        sys.exit(1)
+    preprocess_folder(args[0], args[1] if len(args) > 1 else None, workers)
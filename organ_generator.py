@@ -0,0 +1,210 @@
+import sys
+import time
+import numpy as np
+from panda3d.core import NodePath, CollisionTraverser, CollisionHandlerQueue, CollisionNode, CollisionRay, GeomNode
+from ply_loader import build_geom_node
+from organ_bundle import MODEL_SIZE
+
+# NOTE: Procedural organ-like meshes for scaling benchmarks, in the spirit of
+# generate_cylinder_mesh() in cutting.py but closed and built straight into a GeomNode:
+#   ellipsoid -> stretched sphere with smooth noise on the radius
+#   lobed     -> liver-like: flattened ellipsoid with angular lobes and noise
+#   torus     -> ring (bowel / vessel loop) with a noisy tube radius
+# Sizes from MIN_VERTICES to MAX_VERTICES; the actual count is the nearest grid that closes
+# the surface. Every step is vectorized (no Python loop over vertices or faces), so a 2M
+# vertex organ takes a couple of seconds. The meshes are watertight and welded (no seam or pole
+# duplicates), so MeshData, PBDConstraints and the cutter treat them like a clean scan.
+#
+#   python organ_generator.py [shape] [sizes ...]  -> generate / build / physics / pick / upload times
+
+ORGAN_SHAPES = ("ellipsoid", "lobed", "torus")
+MIN_VERTICES = 1000
+MAX_VERTICES = 2000000
+NOISE_WAVES = 12          # Random plane waves summed into the smooth noise
+NOISE_FREQUENCY = 2.5     # Mean wave number of the lowest noise octave (per unit radius)
+BENCH_SIZES = [1000, 10000, 100000, 1000000, 2000000]
+
+
+def smooth_noise(points, rng, frequency=NOISE_FREQUENCY, octaves=3):
+    """ Band-limited noise in [-1, 1] at each point: random plane waves over a few octaves. """
+    noise = np.zeros(len(points), dtype=np.float32)
+    total = 0.0
+    for octave in range(octaves):
+        amplitude = 0.5 ** octave
+        directions = rng.standard_normal((NOISE_WAVES, 3)).astype(np.float32)
+        directions *= (frequency * 2 ** octave) / np.linalg.norm(directions, axis=1, keepdims=True)
+        phases = rng.uniform(0, 2 * np.pi, NOISE_WAVES).astype(np.float32)
+        noise += amplitude * np.sin(points @ directions.T + phases).sum(axis=1) / np.sqrt(NOISE_WAVES)
+        total += amplitude
+    return np.clip(noise / total, -1.0, 1.0)
+
+
+def grid_quads(rows, cols, wrap_rows):
+    """ (rows' * cols, 4) vertex indices of the quads of a rows x cols grid, wrapped around the columns. """
+    r = np.arange(rows if wrap_rows else rows - 1, dtype=np.int64)[:, None]
+    c = np.arange(cols, dtype=np.int64)[None, :]
+    r1 = (r + 1) % rows
+    c1 = (c + 1) % cols
+    return np.stack([r * cols + c, r * cols + c1, r1 * cols + c1, r1 * cols + c], axis=-1).reshape(-1, 4)
+
+
+def sphere_grid(vertices):
+    """ Unit directions of a welded UV sphere (poles first and last) and its triangles. """
+    rows = max(3, int(round(np.sqrt(max(vertices - 2, 18) / 2.0))))
+    cols = 2 * rows
+    theta = np.pi * np.arange(1, rows + 1, dtype=np.float64) / (rows + 1) # Latitude rings, poles excluded
+    phi = 2 * np.pi * np.arange(cols, dtype=np.float64) / cols
+    sin_t = np.sin(theta)[:, None]
+    ring = np.stack([sin_t * np.cos(phi), sin_t * np.sin(phi), np.repeat(np.cos(theta)[:, None], cols, 1)], -1)
+    directions = np.concatenate([[[0, 0, 1]], ring.reshape(-1, 3), [[0, 0, -1]]]).astype(np.float32)
+
+    quads = grid_quads(rows, cols, wrap_rows=False) + 1
+    c = np.arange(cols, dtype=np.int64)
+    c1 = (c + 1) % cols
+    south = len(directions) - 1
+    last = 1 + (rows - 1) * cols
+    triangles = np.concatenate([
+        np.column_stack([np.zeros(cols, np.int64), 1 + c, 1 + c1]),        # North cap
+        quads[:, [0, 3, 2]], quads[:, [0, 2, 1]],
+        np.column_stack([np.full(cols, south), last + c1, last + c]),      # South cap
+    ])
+    return directions, triangles
+
+
+def vertex_normals(points, triangles):
+    """ Area-weighted vertex normals (unit length), accumulated with one bincount per axis. """
+    p0, p1, p2 = points[triangles[:, 0]], points[triangles[:, 1]], points[triangles[:, 2]]
+    face = np.cross(p1 - p0, p2 - p0)
+    ends = triangles.ravel()
+    normals = np.empty_like(points)
+    for axis in range(3):
+        normals[:, axis] = np.bincount(ends, np.repeat(face[:, axis], 3), minlength=len(points))
+    lengths = np.linalg.norm(normals, axis=1, keepdims=True)
+    lengths[lengths == 0] = 1
+    return (normals / lengths).astype(np.float32)
+
+
+def generate_organ(shape="lobed", vertices=10000, seed=0, noise=0.12):
+    """
+    Closed organ-like mesh as the arrays build_geom_node() takes: 'points' and 'normals' (N, 3)
+    float32, 'colors' None and 'triangles' (T, 3) uint32, scaled to MODEL_SIZE and centered.
+    """
+    if shape not in ORGAN_SHAPES:
+        raise ValueError(f"Unknown organ shape '{shape}' (one of {', '.join(ORGAN_SHAPES)})")
+    vertices = min(max(int(vertices), MIN_VERTICES), MAX_VERTICES)
+    rng = np.random.default_rng(seed)
+
+    if shape == "torus":
+        rows = max(3, int(round(np.sqrt(vertices / 3.0)))) # Around the tube
+        cols = 3 * rows                                    # Around the ring
+        v = 2 * np.pi * np.arange(rows, dtype=np.float32) / rows
+        u = 2 * np.pi * np.arange(cols, dtype=np.float32) / cols
+        v, u = np.meshgrid(v, u, indexing="ij")
+        tube = np.stack([np.cos(v) * np.cos(u), np.cos(v) * np.sin(u), np.sin(v)], -1).reshape(-1, 3)
+        axis = np.stack([np.cos(u), np.sin(u), np.zeros_like(u)], -1).reshape(-1, 3)
+        radius = 0.4 * (1.0 + noise * 2.0 * smooth_noise(axis + 0.4 * tube, rng))
+        points = axis + radius[:, None] * tube
+        quads = grid_quads(rows, cols, wrap_rows=True)
+        triangles = np.concatenate([quads[:, [0, 1, 2]], quads[:, [0, 2, 3]]])
+    else:
+        directions, triangles = sphere_grid(vertices)
+        radius = 1.0 + noise * smooth_noise(directions, rng)
+        if shape == "lobed":
+            # Three rounded lobes around Z, strongest at the equator, on a flattened body
+            phi = np.arctan2(directions[:, 1], directions[:, 0])
+            equator = 1.0 - directions[:, 2] ** 2
+            radius *= 1.0 + 0.25 * np.cos(3 * phi + rng.uniform(0, 2 * np.pi)) * equator
+            scale = np.float32([1.5, 1.0, 0.6])
+        else:
+            scale = np.float32([1.3, 1.0, 0.8])
+        points = directions * radius[:, None] * scale
+
+    lo, hi = points.min(axis=0), points.max(axis=0)
+    points = ((points - (lo + hi) / 2) * (MODEL_SIZE / (hi - lo).max())).astype(np.float32)
+    triangles = triangles.astype(np.uint32)
+    return {'points': points, 'normals': vertex_normals(points, triangles), 'colors': None,
+            'triangles': triangles}
+
+
+def make_organ_model(shape="lobed", vertices=10000, seed=0, noise=0.12):
+    """ Generated organ as a NodePath like load_ply_model() returns (GeomNode under a plain root). """
+    start = time.perf_counter()
+    mesh = generate_organ(shape, vertices, seed, noise)
+    generated = time.perf_counter()
+    model = NodePath(f"{shape}_root")
+    model.attachNewNode(build_geom_node(mesh, name=f"{shape}_{len(mesh['points'])}"))
+    done = time.perf_counter()
+    print(f"GENERATED: {shape} {len(mesh['points'])} verts, {len(mesh['triangles'])} tris | "
+          f"generate {(generated - start) * 1000:.1f} ms + build {(done - generated) * 1000:.1f} ms")
+    return model
+
+
+def parse_organ_spec(spec):
+    """ 'shape:vertices' (e.g. lobed:200000) -> (shape, vertices), or None if spec is not one. """
+    shape, _, count = spec.partition(":")
+    if shape not in ORGAN_SHAPES:
+        return None
+    try:
+        return shape, int(count) if count else 10000
+    except ValueError:
+        return None
+
+
+# --- BENCHMARK ---
+def _ms(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def benchmark(shape="lobed", sizes=BENCH_SIZES):
+    """ Build, physics, picking and upload cost of one generated organ per size. """
+    from organ_library import RestPose
+    from soft_body import Contact, column_view, PHYSICS_HZ
+
+    print(f"{'vertices':>9} | {'generate':>9} | {'rest pose':>9} | {'pbd step':>9} | {'pick':>8} | {'upload':>8}")
+    for n in sizes:
+        start = time.perf_counter()
+        mesh = generate_organ(shape, n)
+        model = NodePath(f"{shape}_root")
+        model.attachNewNode(build_geom_node(mesh))
+        generate_ms = _ms(start)
+
+        start = time.perf_counter()
+        rest_pose = RestPose(shape, model) # MeshData, PBD constraints and spatial hash
+        body = rest_pose.new_body()
+        rest_ms = _ms(start)
+
+        # One press on the top of the organ, PBD with the simulators' default iterations
+        body.solver = "pbd"
+        top = mesh['points'][mesh['points'][:, 2].argmax()]
+        contact = Contact(top, 2.0, 60.0, mode="press", normal=(0, 0, 1))
+        body.step(1.0 / PHYSICS_HZ, [contact])
+        start = time.perf_counter()
+        for _ in range(3):
+            body.step(1.0 / PHYSICS_HZ, [contact])
+        step_ms = _ms(start) / 3
+
+        # Mouse pick: one ray straight down onto the mesh (Panda3D tests every triangle)
+        geom_np = model.find('**/+GeomNode')
+        geom_np.node().setIntoCollideMask(GeomNode.getDefaultCollideMask())
+        ray = CollisionNode("ray")
+        ray.addSolid(CollisionRay((0.1, 0.1, MODEL_SIZE), (0, 0, -1)))
+        ray.setFromCollideMask(GeomNode.getDefaultCollideMask())
+        traverser, queue = CollisionTraverser(), CollisionHandlerQueue()
+        traverser.addCollider(model.attachNewNode(ray), queue)
+        start = time.perf_counter()
+        traverser.traverse(model)
+        pick_ms = _ms(start)
+
+        vdata = geom_np.node().modifyGeom(0).modifyVertexData()
+        start = time.perf_counter()
+        column_view(vdata, 'vertex', modify=True)[:] = body.positions
+        upload_ms = _ms(start)
+
+        print(f"{len(mesh['points']):>9} | {generate_ms:>6.1f} ms | {rest_ms:>6.1f} ms | {step_ms:>6.2f} ms | "
+              f"{pick_ms:>5.2f} ms | {upload_ms:>5.2f} ms" + ("" if queue.getNumEntries() else "  (pick missed)"))
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    shape = args.pop(0) if args and args[0] in ORGAN_SHAPES else "lobed"
+    benchmark(shape, [int(a) for a in args] or BENCH_SIZES)
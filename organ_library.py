@@ -0,0 +1,191 @@
+import os
+import sys
+import weakref
+import numpy as np
+from panda3d.core import NodePath, Loader, Filename
+from soft_body import MeshData, SoftBody, column_view, GRID_MIN_VERTICES
+from spatial_hash import SpatialHash
+from pbd_solver import PBDConstraints
+from mesh_cutting import MeshCutter
+from organ_bundle import load_bundle_arrays, load_scan, normalize_model, bundle_has_colors
+
+# NOTE: Rest-pose data shared between instances of the same organ.
+# The first load of a file builds a RestPose: the normalized model (kept off-scene as a
+# prototype) plus its read-only rest positions, normals, triangles, edge adjacency, spatial
+# hash and PBD constraints. Every further instance of that file copies the prototype's node
+# graph, whose Geoms share their vertex and index arrays copy-on-write, and gets a SoftBody
+# that only owns its dynamic state (positions, velocities, scratch). The deformed vertex
+# array is copied by Panda3D when the instance first writes to it. The index buffer stays
+# shared unless the instance gets a MeshCutter (liver.py): the cutter swaps in a private uint32
+# index buffer with room for CUT_RESERVE_TRIANGLES and reserves CUT_RESERVE_VERTICES rows, and
+# keeps its own edge keys and vertex -> triangle table; report() counts all of it per instance.
+# A cut gives its body private copies of the grid and constraints (SoftBody.fork_topology).
+# Each new instance prints what it added and what it shares.
+#
+#   python organ_library.py <mesh> [instances] [--cut]  -> memory per instance, shared vs. unshared
+#                                                          (--cut: with a MeshCutter each, like liver.py)
+
+MB = 1024.0 * 1024.0
+
+
+def source_key(path):
+    """ Identity of a model file: a changed file is loaded again rather than shared. """
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_mtime, st.st_size)
+
+
+def array_bytes(*objects):
+    """
+    Bytes held in NumPy arrays referenced by the objects' attributes, directly or in a tuple
+    (each array counted once).
+    """
+    seen = {}
+    for obj in objects:
+        if obj is None:
+            continue
+        for value in vars(obj).values():
+            for item in (value if isinstance(value, tuple) else (value,)):
+                if isinstance(item, np.ndarray):
+                    seen[id(item)] = item.nbytes
+    return sum(seen.values())
+
+
+def _freeze(array):
+    array.flags.writeable = False
+    return array
+
+
+class RestPose:
+    """ One organ file: prototype model + immutable simulation data shared by all its instances. """
+    def __init__(self, path, model, has_colors=False, bundle_path=None):
+        self.name = os.path.basename(path)
+        self.prototype = model
+        self.has_colors = has_colors
+        self.mesh = self.grid = self.constraints = None
+        self.error = None
+        self.instances = weakref.WeakSet() # Live SoftBodies made from this rest pose
+
+        gn = model.find('**/+GeomNode')
+        if gn.isEmpty():
+            self.error = "No geometry in the file."
+            return
+        try:
+            bundle = load_bundle_arrays(bundle_path, gn.node()) if bundle_path else None
+            self.mesh, self.grid = bundle if bundle else (MeshData(gn.node()), None)
+        except ValueError as e:
+            self.error = str(e)
+            return
+        for name in ("rest_positions", "rest_normals", "triangles", "edges"):
+            _freeze(getattr(self.mesh, name))
+        self.constraints = PBDConstraints(self.mesh)
+        if self.grid is None and self.mesh.num_vertices >= GRID_MIN_VERTICES: # Same rule as SoftBody
+            self.grid = SpatialHash(self.mesh.rest_positions)
+
+    def instantiate(self):
+        """ New NodePath sharing the prototype's Geom arrays. """
+        return NodePath(self.prototype.node().copySubgraph())
+
+    def new_body(self):
+        """ SoftBody over the shared rest pose; None if the mesh cannot be deformed. """
+        if self.mesh is None:
+            return None
+        body = SoftBody(self.mesh.instance(), self.constraints, self.grid)
+        body.shared_topology = True
+        self.instances.add(body)
+        return body
+
+    def shared_bytes(self):
+        return array_bytes(self.mesh, self.grid, self.constraints)
+
+    def report(self, body, vdata=None, worker=None, cutter=None):
+        """ Prints what this instance allocated and what it shares with the others. """
+        own = array_bytes(body)
+        if worker is not None:
+            own += worker.front.nbytes + worker.back.nbytes
+        gpu = 0
+        if vdata is not None:
+            array_index = vdata.getFormat().getArrayWith('vertex')
+            gpu = vdata.getArray(array_index).getDataSizeBytes()
+        cut = 0
+        if cutter is not None: # Private index buffer + reserves, edge keys and triangle table
+            cut = cutter.buffer_bytes() + array_bytes(cutter)
+        print(f"MEMORY: {self.name} instance {len(self.instances)}: +{own / MB:.2f} MB dynamic state, "
+              f"+{gpu / MB:.2f} MB vertex array" + (f", +{cut / MB:.2f} MB cutter" if cutter is not None else "") +
+              f", {self.shared_bytes() / MB:.2f} MB rest pose shared")
+        return own + gpu + cut
+
+
+class OrganLibrary:
+    """ RestPose per model file, created on first use. """
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, path, load):
+        """
+        RestPose of 'path'. load(path) -> (normalized NodePath, has vertex colors, bundle path or None)
+        is only called the first time (or after the file changed); it may return None on failure.
+        """
+        key = source_key(path)
+        entry = self.entries.get(key)
+        if entry is None:
+            loaded = load(path)
+            if loaded is None:
+                return None
+            model, has_colors, bundle_path = loaded
+            entry = self.entries[key] = RestPose(path, model, has_colors, bundle_path)
+            if entry.error:
+                print(f"WARNING: Mesh cannot be deformed. {entry.error}")
+        return entry
+
+    def clear(self):
+        self.entries = {}
+
+
+def load_model_file(path):
+    """ Loader for OrganLibrary.get() without a ShowBase (organ_scene.py, reports). """
+    if path.lower().endswith(".bam"):
+        node = Loader.getGlobalPtr().loadSync(Filename.fromOsSpecific(os.path.abspath(path)))
+        if node is None:
+            raise ValueError("Panda3D could not load the file.")
+        return NodePath(node), bundle_has_colors(path), path
+    model, has_colors = load_scan(path)
+    normalize_model(model)
+    return model, has_colors, None
+
+
+# --- MEMORY REPORT ---
+
+def measure(path, instances=4, cuttable=False):
+    """
+    Per-instance memory of N instances sharing one RestPose vs. N independent loads.
+    cuttable gives every instance a MeshCutter like liver.py does.
+    """
+    library = OrganLibrary()
+    rest_pose = library.get(path, load_model_file)
+    if rest_pose is None or rest_pose.mesh is None:
+        print(f"Cannot measure {path}")
+        return
+    print(f"{rest_pose.name}: {rest_pose.mesh.num_vertices} vertices, {len(rest_pose.mesh.triangles)} triangles")
+    keep = []
+    for _ in range(instances):
+        model = rest_pose.instantiate()
+        body = rest_pose.new_body()
+        geom_node = model.find('**/+GeomNode').node()
+        cutter = MeshCutter(geom_node, body) if cuttable else None
+        vdata = geom_node.modifyGeom(0).modifyVertexData()
+        column_view(vdata, 'vertex', modify=True) # First write: the instance's own vertex array
+        own = rest_pose.report(body, vdata, cutter=cutter)
+        keep.append((model, body, cutter))
+
+    shared = rest_pose.shared_bytes()
+    print(f"Shared:   {shared / MB:.2f} MB once + {own / MB:.2f} MB per instance "
+          f"-> {(shared + instances * own) / MB:.2f} MB for {instances}")
+    print(f"Unshared: {(shared + own) / MB:.2f} MB per instance -> {instances * (shared + own) / MB:.2f} MB for {instances}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python organ_library.py <mesh> [instances] [--cut]")
+        sys.exit(1)
+    args = [a for a in sys.argv[1:] if a != "--cut"]
+    measure(args[0], int(args[1]) if len(args) > 1 else 4, cuttable="--cut" in sys.argv)
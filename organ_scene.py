@@ -0,0 +1,281 @@
+import sys
+import os
+import numpy as np
+from direct.showbase.ShowBase import ShowBase
+from panda3d.core import (
+    AmbientLight, DirectionalLight, Spotlight, PerspectiveLens, Material, Vec3, TextNode,
+    GeomNode, CollisionRay, CollisionNode, CollisionTraverser, CollisionHandlerQueue,
+    WindowProperties
+)
+from direct.gui.OnscreenText import OnscreenText
+from direct.task import Task
+from soft_body import Contact, SphereContact, PHYSICS_HZ
+from physics_scheduler import PhysicsScheduler
+from quality_governor import QualityGovernor, simulator_knobs
+from render_profiles import PROFILES, select_profile, configure_window, apply_profile
+from organ_library import OrganLibrary, RestPose, load_model_file
+from organ_generator import make_organ_model, parse_organ_spec
+from liver import VRHandEmulator, hex_to_rgba
+
+# NOTE: Several deformable organs in one scene, stepped by one PhysicsScheduler.
+# The organs share one physics thread and one frame budget: the organ the tool touches (or is
+# close to) runs at the full rate, organs that are still settling run slower and organs at
+# rest are frozen until the tool comes near again. The HUD lists the measured rate and tier
+# of every organ. Files given twice are two instances of one shared rest pose (organ_library.py).
+# Instead of a file, shape:vertices (e.g. lobed:200000) adds a generated organ (organ_generator.py).
+#
+#   python organ_scene.py [model files or shape:vertices ...] [--quality low|medium|high]
+#   WASD+QE moves the tool, left click presses the organ under the cursor, G toggles the governor.
+
+BG_COLOR = (0.05, 0.05, 0.07, 1)
+ORGAN_COLORS = [hex_to_rgba("8A3324"), hex_to_rgba("E0AC69"), hex_to_rgba("7B3F61"), hex_to_rgba("B5651D")]
+UI_ACCENT = hex_to_rgba("00E5FF", 1.0)
+ORGAN_SPACING = 13.0 # World units between organ centers
+HUD_INTERVAL = 0.5
+WINDOW_WIDTH = 1600
+WINDOW_HEIGHT = 900
+
+# Placeholder organs (stretched spheres) when no files are given: name, (sx, sy, sz), instances
+PLACEHOLDERS = [("liver", (1.5, 1.0, 0.6), 2), ("kidney", (0.6, 0.6, 1.1), 2)]
+
+
+class SceneOrgan:
+    """ One organ instance: its model, vertex data and scheduler slot. """
+    def __init__(self, name, model, rest_pose, slot):
+        self.name = name
+        self.model = model
+        self.rest_pose = rest_pose
+        self.slot = slot
+        self.vdata = model.find('**/+GeomNode').node().modifyGeom(0).modifyVertexData()
+        rest = rest_pose.mesh.rest_positions
+        lo, hi = rest.min(axis=0), rest.max(axis=0)
+        self.center = Vec3(*((lo + hi) / 2))
+        self.radius = float(np.linalg.norm(rest - (lo + hi) / 2, axis=1).max()) # Bounding sphere in mesh space
+        self.last_steps = 0
+        self.rate = 0.0 # Measured steps per second
+
+
+class OrganSceneSim(ShowBase):
+    def __init__(self, paths=()):
+        self.render_profile = select_profile()
+        configure_window(self.render_profile)
+        ShowBase.__init__(self)
+
+        props = WindowProperties()
+        props.setTitle("BioSim: Multi-Organ Scene")
+        props.setSize(WINDOW_WIDTH, WINDOW_HEIGHT)
+        if hasattr(self.win, 'requestProperties'):
+            self.win.requestProperties(props)
+        self.setBackgroundColor(BG_COLOR)
+        apply_profile(self.render, self.render_profile)
+
+        self.disableMouse()
+        self.camera.setPos(0, -60, 12)
+        self.camera.lookAt(0, 0, 0)
+        self.setup_lighting()
+
+        # Physics: one scheduler for every organ
+        self.physics_rate = PHYSICS_HZ
+        self.physics = PhysicsScheduler(rate=self.physics_rate)
+        self.pbd_iterations_cap = 32
+        self.contact_radius_cap = None
+        self.governor = QualityGovernor(simulator_knobs(self))
+        self.user_force = 60.0
+        self.organ_library = OrganLibrary()
+        self.generated = {} # shape:vertices -> RestPose, shared like the library's files
+        self.organs = []
+
+        # Tool (always active) and mouse press
+        self.keys_pressed = set()
+        self.tool = VRHandEmulator(self.render, self.loader, start=(0, -10, 0))
+        self.tool.toggle()
+        for key in self.tool.keys:
+            self.accept(key, self.register_key, [key, True])
+            self.accept(f'{key}-up', self.register_key, [key, False])
+        self.is_squeezing = False
+        self.accept('mouse1', self.set_squeeze, [True])
+        self.accept('mouse1-up', self.set_squeeze, [False])
+        self.accept('g', self.toggle_governor)
+        self.accept('escape', sys.exit)
+
+        self.picker_ray = CollisionRay()
+        self.picker_node = CollisionNode('mouseRay')
+        self.picker_node.setFromCollideMask(GeomNode.getDefaultCollideMask())
+        self.picker_node.addSolid(self.picker_ray)
+        self.picker_np = self.camera.attachNewNode(self.picker_node)
+        self.trav = CollisionTraverser()
+        self.queue = CollisionHandlerQueue()
+        self.trav.addCollider(self.picker_np, self.queue)
+
+        self.lbl_hud = OnscreenText(text="", pos=(-1.7, 0.9), scale=0.04, fg=UI_ACCENT,
+                                    align=TextNode.ALeft, mayChange=True, parent=self.aspect2d)
+        self.hud_timer = 0.0
+
+        if paths:
+            for path in paths:
+                self.add_organ_file(path)
+        else:
+            self.create_placeholder_organs()
+        self.arrange_organs()
+        self.taskMgr.add(self.update_loop, "SceneLoop")
+
+    # --- INPUT HELPERS ---
+    def register_key(self, key, status):
+        if status:
+            self.keys_pressed.add(key)
+        else:
+            self.keys_pressed.discard(key)
+
+    def is_pressed(self, key):
+        return key in self.keys_pressed
+
+    def set_squeeze(self, status):
+        self.is_squeezing = status
+
+    def toggle_governor(self):
+        self.governor.enabled = not self.governor.enabled
+        if not self.governor.enabled:
+            self.governor.reset()
+        print(f"Quality governor {'on' if self.governor.enabled else 'off'}")
+
+    def setup_lighting(self):
+        self.spotlight = Spotlight('main_light')
+        self.spotlight.setColor((1, 0.95, 0.9, 1))
+        lens = PerspectiveLens()
+        lens.setFov(70)
+        shadow_size = PROFILES[self.render_profile]["shadow_map"]
+        if shadow_size:
+            self.spotlight.setShadowCaster(True, shadow_size, shadow_size)
+        self.spotlight.setLens(lens)
+        slnp = self.render.attachNewNode(self.spotlight)
+        slnp.setPos(0, -50, 45)
+        slnp.lookAt(0, 0, 0)
+        self.render.setLight(slnp)
+
+        dlight = DirectionalLight('fill')
+        dlight.setColor((0.3, 0.3, 0.4, 1))
+        dlnp = self.render.attachNewNode(dlight)
+        dlnp.setHpr(-60, 0, 0)
+        self.render.setLight(dlnp)
+
+        alight = AmbientLight('amb')
+        alight.setColor((0.4, 0.4, 0.4, 1))
+        self.render.setLight(self.render.attachNewNode(alight))
+
+    # --- ORGANS ---
+    def add_organ_file(self, path):
+        spec = parse_organ_spec(path)
+        if spec and not os.path.exists(path):
+            if path not in self.generated:
+                self.generated[path] = RestPose(path, make_organ_model(*spec))
+            self.add_organ(self.generated[path], False)
+            return
+        try:
+            rest_pose = self.organ_library.get(path, load_model_file)
+        except Exception as e:
+            print(f"WARNING: Could not load {path}: {e}")
+            return
+        if rest_pose is not None:
+            self.add_organ(rest_pose, rest_pose.has_colors)
+
+    def create_placeholder_organs(self):
+        for name, scale, count in PLACEHOLDERS:
+            m = self.loader.loadModel("models/misc/sphere")
+            m.setScale(scale[0] * 5.0, scale[1] * 5.0, scale[2] * 5.0)
+            m.flattenStrong()
+            rest_pose = RestPose(name, m)
+            for _ in range(count):
+                self.add_organ(rest_pose, False)
+
+    def add_organ(self, rest_pose, has_colors):
+        body = rest_pose.new_body()
+        if body is None:
+            return
+        model = rest_pose.instantiate()
+        model.reparentTo(self.render)
+        model.find('**/+GeomNode').node().setIntoCollideMask(GeomNode.getDefaultCollideMask())
+        m = Material()
+        if not has_colors: m.setBaseColor(ORGAN_COLORS[len(self.organs) % len(ORGAN_COLORS)])
+        m.setSpecular((0.9, 0.9, 0.9, 1))
+        m.setShininess(90.0)
+        model.setMaterial(m, 1)
+
+        name = f"{os.path.splitext(rest_pose.name)[0]} #{len(self.organs) + 1}"
+        organ = SceneOrgan(name, model, rest_pose, self.physics.add(name, body))
+        rest_pose.report(body, organ.vdata, organ.slot)
+        self.organs.append(organ)
+
+    def arrange_organs(self):
+        """ Organs side by side along X, centered on the origin. """
+        for i, organ in enumerate(self.organs):
+            x = (i - (len(self.organs) - 1) / 2.0) * ORGAN_SPACING
+            organ.model.setPos(Vec3(x, 0, 0) - organ.center)
+
+    # --- LOOP ---
+    def update_loop(self, task):
+        self.governor.update(globalClock.getDt())
+        dt = min(globalClock.getDt(), 0.05)
+        self.tool.update(dt, self)
+
+        # Organ under the cursor while the mouse button is held
+        pressed = None
+        if self.is_squeezing and self.mouseWatcherNode and self.mouseWatcherNode.hasMouse():
+            mpos = self.mouseWatcherNode.getMouse()
+            self.picker_ray.setFromLens(self.camNode, mpos.x, mpos.y)
+            self.trav.traverse(self.render)
+            if self.queue.getNumEntries() > 0:
+                self.queue.sortEntries()
+                entry = self.queue.getEntry(0)
+                hit = entry.getIntoNodePath()
+                for organ in self.organs:
+                    if organ.model.isAncestorOf(hit) and entry.hasSurfacePoint():
+                        pressed = (organ, entry.getSurfacePoint(organ.model), entry.getSurfaceNormal(organ.model))
+                        break
+
+        radius = 4.0 if self.contact_radius_cap is None else min(4.0, self.contact_radius_cap)
+        tool_pos = self.tool.get_pos()
+        for organ in self.organs:
+            organ.slot.upload(organ.vdata)
+
+            # Distance from the tool sphere to the organ's bounding sphere (world units)
+            center = self.render.getRelativePoint(organ.model, organ.center)
+            distance = max((tool_pos - center).length() - organ.radius - self.tool.radius, 0.0)
+            contacts = []
+            if distance <= 0.0:
+                local = organ.model.getRelativePoint(self.render, tool_pos)
+                contacts.append(SphereContact(local, self.tool.radius, key=0))
+            if pressed and pressed[0] is organ:
+                contacts.append(Contact(pressed[1], radius, self.user_force * 1.2, mode="press", normal=pressed[2]))
+                distance = 0.0
+            organ.slot.publish(contacts, distance, pbd_iterations=min(4, self.pbd_iterations_cap))
+
+        self.update_hud(dt)
+        return Task.cont
+
+    def update_hud(self, dt):
+        self.hud_timer += dt
+        if self.hud_timer < HUD_INTERVAL:
+            return
+        lines = [f"Physics scheduler: {1.0 / self.physics.period:.0f} Hz base | "
+                 f"last tick {self.physics.tick_time * 1000:.2f} ms"]
+        for organ in self.organs:
+            s = organ.slot
+            organ.rate = (s.steps - organ.last_steps) / self.hud_timer
+            organ.last_steps = s.steps
+            lines.append(f"{organ.name:<14} {s.tier:<9} {organ.rate:5.0f} Hz | {s.step_time * 1000:.2f} ms/step | "
+                         f"deferred {s.deferred}")
+        if self.governor.enabled:
+            lines.append(f"Governor: {self.governor.summary()}")
+        self.lbl_hud.setText("\n".join(lines))
+        self.hud_timer = 0.0
+
+
+if __name__ == "__main__":
+    paths, argv = [], iter(sys.argv[1:])
+    for arg in argv:
+        if arg == "--quality":
+            next(argv, None) # Read by select_profile()
+        elif not arg.startswith("--quality="):
+            paths.append(arg)
+    app = OrganSceneSim(paths)
+    app.run()
@@ -0,0 +1,185 @@
+import copy
+import numpy as np
+
+# NOTE: Position-based dynamics (PBD) constraints for the soft body.
+# Edge-length constraints keep neighbouring vertices together, so a push spreads into
+# a smooth dent instead of isolated dimples; an optional volume constraint keeps a
+# closed organ from deflating. Constraints are stored once as flat CSR arrays
+# (vertex -> its edges / triangle corners) and projected with vectorized Jacobi
+# iterations: every constraint is solved in parallel and the corrections are averaged
+# per vertex with one segmented sum. More iterations = stiffer, better converged surface.
+# Topology edits (cuts) disable edges in place and add new ones to a small overflow list;
+# the CSR arrays are only rebuilt once the overflow grows past a fraction of the mesh.
+# Edges are found by their int64 key in a sorted array (edge_keys + searchsorted), built
+# once per edge list (MeshCutter builds it up front), so an edit never loops over the mesh.
+
+JACOBI_RELAXATION = 1.5 # Over-relaxation of the averaged Jacobi corrections
+REBUILD_FRACTION = 0.25 # Rebuild the CSR arrays once overflow edges exceed this share of all edges
+
+
+def build_csr(owners, num_vertices):
+    """ Groups entries by owning vertex: (order, indptr) so owners[order][indptr[i]:indptr[i+1]] == i. """
+    order = np.argsort(owners, kind="stable").astype(np.intp)
+    counts = np.bincount(owners, minlength=num_vertices)
+    indptr = np.zeros(num_vertices + 1, dtype=np.int64)
+    np.cumsum(counts, out=indptr[1:])
+    return order, indptr
+
+
+def segment_sum(values, indptr):
+    """ Per-vertex sums of CSR-ordered rows (vertices without entries get zero). """
+    filled = indptr[1:] > indptr[:-1]
+    if len(values) and filled.all():
+        return np.add.reduceat(values, indptr[:-1], axis=0)
+    out = np.zeros((len(indptr) - 1,) + values.shape[1:], dtype=values.dtype)
+    if len(values):
+        out[filled] = np.add.reduceat(values, indptr[:-1][filled], axis=0)
+    return out
+
+
+def edge_keys(pairs):
+    """ One int64 key per undirected edge (u, v): (min << 32) | max. """
+    pairs = np.asarray(pairs).reshape(-1, 2).astype(np.int64)
+    return (pairs.min(axis=1) << 32) | pairs.max(axis=1)
+
+
+def mesh_volume(positions, triangles):
+    x0, x1, x2 = positions[triangles[:, 0]], positions[triangles[:, 1]], positions[triangles[:, 2]]
+    return float(np.einsum('ij,ij->', x0, np.cross(x1, x2))) / 6.0
+
+
+class PBDConstraints:
+    """ Edge-length (and optional volume) constraints of one mesh, in CSR form. """
+    def __init__(self, mesh):
+        rest = mesh.rest_positions
+        n = mesh.num_vertices
+        self.build_edges(mesh.edges, rest, n)
+
+        # Vertex -> triangle corner CSR for the volume gradient
+        self.triangles = mesh.triangles.astype(np.intp)
+        order, self.corner_indptr = build_csr(self.triangles.reshape(-1), n)
+        self.corner_ids = order # Flat corner index: triangle * 3 + corner
+        self.rest_volume = mesh_volume(rest, self.triangles) if len(self.triangles) else 0.0
+
+    def build_edges(self, edges, rest, num_vertices):
+        """ (Re)builds the edge CSR arrays; clears the overflow list. """
+        # Index arrays are kept as intp: np.take with native indices avoids a cast on every gather
+        self.edges = edges
+        self.e0 = edges[:, 0].astype(np.intp)
+        self.e1 = edges[:, 1].astype(np.intp)
+        self.rest_lengths = np.linalg.norm(rest[self.e1] - rest[self.e0], axis=1)
+        self.weights = np.ones(len(edges), dtype=np.float32) # 0 = edge removed by a cut
+        self.lookup = None # (sorted edge keys, edge ids) of self.edges, see build_lookup()
+
+        # Vertex -> edge-end CSR over [+corrections of first ends, -corrections of second ends]
+        order, self.edge_indptr = build_csr(np.concatenate([self.e0, self.e1]), len(rest))
+        self.edge_ends = order
+        self.num_csr_vertices = len(rest)
+
+        # Edges added after the build
+        self.extra = np.empty((0, 2), dtype=np.intp)
+        self.extra_lengths = np.empty(0, dtype=np.float32)
+
+        self.counts = np.diff(self.edge_indptr).astype(np.float32)
+        self.counts = np.append(self.counts, np.zeros(num_vertices - len(self.counts), dtype=np.float32))
+        self.degree = np.maximum(self.counts, 1)
+
+    # --- Topology edits ---
+    def fork(self):
+        """ Copy for another body: shares the arrays edits rebind, copies the ones they write into. """
+        other = copy.copy(self)
+        other.weights = self.weights.copy()
+        other.counts = self.counts.copy()
+        return other # The lookup only depends on the shared edge list
+
+    def add_vertices(self, count):
+        self.counts = np.append(self.counts, np.zeros(count, dtype=np.float32))
+        self.degree = np.maximum(self.counts, 1)
+
+    def build_lookup(self):
+        """ Sorted keys of self.edges for vectorized edge lookups (topology edits). """
+        if self.lookup is None:
+            keys = edge_keys(self.edges)
+            order = np.argsort(keys, kind="stable")
+            self.lookup = (keys[order], order)
+
+    def remove_edges(self, pairs):
+        """ Disables edges (u < v) in place; edges from the overflow list are dropped. """
+        pairs = np.asarray(pairs, dtype=np.intp).reshape(-1, 2)
+        if len(pairs) == 0:
+            return
+        self.build_lookup()
+        sorted_keys, ids = self.lookup
+        keys = edge_keys(pairs)
+        slot = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+        found = (sorted_keys[slot] == keys) if len(sorted_keys) else np.zeros(len(keys), dtype=bool)
+        found[found] = self.weights[ids[slot[found]]] > 0
+        self.weights[ids[slot[found]]] = 0.0
+        removed = [pairs[found]]
+
+        rest = keys[~found]
+        if len(self.extra) and len(rest):
+            drop = np.isin(edge_keys(self.extra), rest)
+            removed.append(self.extra[drop])
+            self.extra, self.extra_lengths = self.extra[~drop], self.extra_lengths[~drop]
+        np.subtract.at(self.counts, np.concatenate(removed).ravel(), 1)
+        self.degree = np.maximum(self.counts, 1)
+
+    def add_edges(self, pairs, rest):
+        pairs = np.asarray(pairs, dtype=np.intp).reshape(-1, 2)
+        self.extra = np.concatenate([self.extra, pairs])
+        self.extra_lengths = np.concatenate([self.extra_lengths,
+                                             np.linalg.norm(rest[pairs[:, 1]] - rest[pairs[:, 0]], axis=1)])
+        np.add.at(self.counts, pairs.ravel(), 1)
+        self.degree = np.maximum(self.counts, 1)
+
+        if len(self.extra) > REBUILD_FRACTION * max(len(self.edges), 1):
+            active = self.edges[self.weights > 0]
+            self.build_edges(np.concatenate([active, self.extra]).astype(np.int32), rest, len(rest))
+
+    def active_edges(self):
+        alive = np.take(self.edges, np.flatnonzero(self.weights > 0), axis=0) # take: 5x a 2D boolean mask
+        return np.concatenate([alive, self.extra.astype(np.int32)])
+
+    # --- Projection ---
+    def project_edges(self, p, stiffness):
+        d = np.take(p, self.e1, axis=0) - np.take(p, self.e0, axis=0)
+        length = np.sqrt(np.einsum('ij,ij->i', d, d))
+        scale = stiffness * 0.5 * (length - self.rest_lengths) / np.where(length > 1e-9, length, 1.0)
+        scale *= self.weights
+        # The first end moves along +C n, the second along -C n
+        correction = d * scale[:, None]
+        ends = np.concatenate([correction, -correction])
+        per_vertex = segment_sum(np.take(ends, self.edge_ends, axis=0), self.edge_indptr)
+        if len(self.extra):
+            per_vertex = np.concatenate([per_vertex, np.zeros((len(p) - len(per_vertex), 3), dtype=per_vertex.dtype)])
+            d = p[self.extra[:, 1]] - p[self.extra[:, 0]]
+            length = np.sqrt(np.einsum('ij,ij->i', d, d))
+            scale = stiffness * 0.5 * (length - self.extra_lengths) / np.where(length > 1e-9, length, 1.0)
+            correction = d * scale[:, None]
+            np.add.at(per_vertex, self.extra[:, 0], correction)
+            np.add.at(per_vertex, self.extra[:, 1], -correction)
+            p += per_vertex * (JACOBI_RELAXATION / self.degree)[:, None]
+        else:
+            n = len(per_vertex)
+            p[:n] += per_vertex * (JACOBI_RELAXATION / self.degree[:n])[:, None]
+
+    def project_volume(self, p, stiffness):
+        if abs(self.rest_volume) < 1e-9:
+            return
+        x0, x1, x2 = (np.take(p, self.triangles[:, i], axis=0) for i in range(3))
+        # dV/dx of each corner: (x1 x x2, x2 x x0, x0 x x1) / 6
+        corner_grads = np.stack([np.cross(x1, x2), np.cross(x2, x0), np.cross(x0, x1)], axis=1).reshape(-1, 3) / 6.0
+        grad = segment_sum(np.take(corner_grads, self.corner_ids, axis=0), self.corner_indptr)
+        volume = float(np.einsum('ij,ij->', x0, np.cross(x1, x2))) / 6.0
+        denom = float(np.einsum('ij,ij->', grad, grad))
+        if denom > 1e-12:
+            p -= grad * (stiffness * (volume - self.rest_volume) / denom)
+
+    def project(self, p, iterations, stiffness=1.0, preserve_volume=False):
+        """ Moves predicted positions p (in place) towards satisfying every constraint. """
+        for _ in range(iterations):
+            self.project_edges(p, stiffness)
+        # One global constraint: a single exact projection per step is enough
+        if preserve_volume:
+            self.project_volume(p, stiffness)
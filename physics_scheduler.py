@@ -0,0 +1,167 @@
+import time
+import atexit
+import weakref
+import threading
+import numpy as np
+from soft_body import column_view, PHYSICS_HZ
+
+# NOTE: One physics thread for several soft bodies sharing one frame budget (organ_scene.py).
+# Every organ gets a rate from its tier, re-evaluated before each tick:
+#   contact  -> a tool touches it (or touched it on its last step)      PHYSICS_HZ
+#   near     -> the tool is within NEAR_DISTANCE of its bounds          PHYSICS_HZ
+#   settling -> far from the tool but still moving                      SETTLING_HZ
+#   frozen   -> far and at rest: not stepped until the tool comes back  0
+# A tick steps the organs that are due, highest tier first. Once the tick has used its
+# budget (BUDGET_FRACTION of one period) the remaining due organs wait for the next tick,
+# so a crowded scene slows the idle organs down instead of the one being operated on.
+# Organs stepped less often take a longer timestep (capped at MAX_STEP_DT) to keep real time.
+# Each organ is double-buffered like PhysicsWorker, so the render thread never waits.
+
+SETTLING_HZ = 30.0
+TIERS = ("contact", "near", "settling", "frozen") # Highest priority first
+TIER_RATES = {"contact": PHYSICS_HZ, "near": PHYSICS_HZ, "settling": SETTLING_HZ, "frozen": 0.0}
+NEAR_DISTANCE = 4.0     # World units between the tool and an organ's bounding sphere
+SETTLE_SPEED = 0.05     # Max vertex speed (units/s) below which a free organ counts as at rest
+MAX_STEP_DT = 1.0 / 30.0 # Longest timestep a slowed organ takes
+BUDGET_FRACTION = 0.8   # Share of one period a tick may spend stepping
+
+
+class OrganSlot:
+    """ One body in the scheduler. The render thread calls publish() and upload(), as with PhysicsWorker. """
+    def __init__(self, name, body, lock):
+        self.name = name
+        self.body = body
+        self.lock = lock # The scheduler's
+        self.contacts = []
+        self.params = {}
+        self.tool_distance = float("inf")
+        self.tier = "contact" # Until the first step has measured its speed
+        self.speed = float("inf")
+        self.touched = False
+        self.last_step = None
+        self.front = body.positions.copy()
+        self.back = body.positions.copy()
+        self.frame_id = 0
+        self.uploaded_id = -1
+        # Stats
+        self.steps = 0
+        self.deferred = 0 # Due steps pushed to the next tick by the budget
+        self.step_time = 0.0
+
+    def publish(self, contacts, tool_distance=float("inf"), **params):
+        """ Latest contacts (mesh space), distance from the tool to the organ and material parameters. """
+        with self.lock:
+            self.contacts = contacts
+            self.tool_distance = tool_distance
+            self.params.update(params)
+
+    def upload(self, vdata):
+        """ Copies the newest finished buffer into the vertex column. Returns True if it changed. """
+        with self.lock:
+            if self.frame_id == self.uploaded_id:
+                return False
+            view = column_view(vdata, 'vertex', modify=True)
+            view[:] = self.front
+            self.uploaded_id = self.frame_id
+        return True
+
+    def classify(self):
+        if self.contacts or self.touched:
+            return "contact"
+        if self.tool_distance < NEAR_DISTANCE:
+            return "near"
+        return "settling" if self.speed > SETTLE_SPEED else "frozen"
+
+
+_live_schedulers = weakref.WeakSet()
+
+
+@atexit.register
+def _stop_schedulers():
+    for scheduler in list(_live_schedulers):
+        scheduler.stop()
+
+
+class PhysicsScheduler:
+    def __init__(self, rate=PHYSICS_HZ):
+        self.period = 1.0 / rate
+        self.slots = []
+        self.lock = threading.Lock()
+        self.tick_time = 0.0 # Step time of the last tick (all organs)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="OrganScheduler", daemon=True)
+        self.thread.start()
+        _live_schedulers.add(self)
+
+    def add(self, name, body):
+        slot = OrganSlot(name, body, self.lock)
+        with self.lock:
+            self.slots.append(slot)
+        return slot
+
+    def remove(self, slot):
+        with self.lock:
+            self.slots.remove(slot)
+
+    def set_rate(self, rate):
+        """ Base tick rate (full-rate organs); lowered by the quality governor. """
+        self.period = 1.0 / rate
+
+    def stop(self):
+        self.running = False
+        self.thread.join(timeout=1.0)
+
+    def _run(self):
+        next_time = time.perf_counter()
+        while self.running:
+            now = time.perf_counter()
+            if now < next_time:
+                time.sleep(next_time - now)
+                continue
+            if now - next_time > 4 * self.period: # Stalled: do not try to catch up
+                next_time = now
+
+            # Due organs in tier order, with a snapshot of what the render thread published
+            with self.lock:
+                due = []
+                for slot in self.slots:
+                    slot.tier = slot.classify()
+                    rate = min(TIER_RATES[slot.tier], 1.0 / self.period)
+                    if rate <= 0.0:
+                        slot.last_step = None # Wakes up with a normal timestep
+                        continue
+                    if slot.last_step is None or now - slot.last_step >= 1.0 / rate - 0.5 * self.period:
+                        for name, value in slot.params.items():
+                            setattr(slot.body, name, value)
+                        due.append((TIERS.index(slot.tier), slot, slot.contacts))
+                due.sort(key=lambda d: d[0])
+
+            tick_start = time.perf_counter()
+            budget = self.period * BUDGET_FRACTION
+            done = []
+            for i, (_, slot, contacts) in enumerate(due):
+                if i and time.perf_counter() - tick_start > budget:
+                    for _, late, _ in due[i:]:
+                        late.deferred += 1
+                    break
+                start = time.perf_counter()
+                dt = self.period if slot.last_step is None else min(start - slot.last_step, MAX_STEP_DT)
+                touched = slot.body.step(max(dt, self.period), contacts)
+                slot.last_step = start
+                v = slot.body.velocities
+                speed = float(np.sqrt(np.einsum('ij,ij->i', v, v).max())) if len(v) else 0.0
+                if len(slot.back) != len(slot.body.positions):
+                    slot.back = np.empty_like(slot.body.positions)
+                np.copyto(slot.back, slot.body.positions)
+                slot.step_time = time.perf_counter() - start
+                slot.steps += 1
+                done.append((slot, touched, speed))
+            self.tick_time = time.perf_counter() - tick_start
+
+            with self.lock:
+                for slot, touched, speed in done:
+                    slot.front, slot.back = slot.back, slot.front
+                    slot.frame_id += 1
+                    slot.touched = touched
+                    slot.speed = speed
+            next_time += self.period
@@ -0,0 +1,297 @@
+import sys
+import time
+import numpy as np
+from panda3d.core import (
+    Geom, GeomNode, GeomTriangles, GeomVertexArrayFormat, GeomVertexData,
+    GeomVertexFormat, InternalName, NodePath
+)
+
+# NOTE: This module reads .PLY meshes (like the 'cut_simulation.ply' written by cutting.py)
+# straight into NumPy arrays and copies them into Panda3D vertex buffers in one pass.
+# It does not need trimesh and never writes a temporary .glb file.
+
+# PLY scalar type names -> NumPy dtype codes
+PLY_TYPES = {
+    'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+    'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+    'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+    'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8'
+}
+
+PLY_FORMATS = {
+    'ascii': None,
+    'binary_little_endian': '<',
+    'binary_big_endian': '>'
+}
+
+# Interleaved layout shared by the Panda3D buffer and the NumPy view on top of it
+VERTEX_DTYPE = np.dtype([
+    ('vertex', '<f4', (3,)),
+    ('normal', '<f4', (3,)),
+    ('color', 'u1', (4,))
+])
+
+
+def read_ply_header(f):
+    """
+    Parses the header of an open (binary mode) PLY file.
+    Returns (format, elements) where elements is a list of (name, count, properties).
+    A property is (name, dtype) or (name, count_dtype, item_dtype) for lists.
+    """
+    if f.readline().strip() != b"ply":
+        raise ValueError("Not a PLY file (missing 'ply' magic).")
+
+    fmt = None
+    elements = []
+    while True:
+        line = f.readline()
+        if not line:
+            raise ValueError("Unexpected end of file inside PLY header.")
+        parts = line.decode('ascii', 'replace').split()
+        if not parts or parts[0] in ("comment", "obj_info"):
+            continue
+        if parts[0] == "end_header":
+            break
+        if parts[0] == "format":
+            if parts[1] not in PLY_FORMATS:
+                raise ValueError(f"Unsupported PLY format: {parts[1]}")
+            fmt = parts[1]
+        elif parts[0] == "element":
+            elements.append((parts[1], int(parts[2]), []))
+        elif parts[0] == "property":
+            if parts[1] == "list":
+                elements[-1][2].append((parts[4], PLY_TYPES[parts[2]], PLY_TYPES[parts[3]]))
+            else:
+                elements[-1][2].append((parts[2], PLY_TYPES[parts[1]]))
+
+    if fmt is None:
+        raise ValueError("PLY header has no 'format' line.")
+    return fmt, elements
+
+
+def _read_binary_element(buf, offset, count, props, endian):
+    """ Reads one binary element block starting at offset. Returns (fields, new_offset). """
+    if count == 0:
+        return {}, offset
+
+    if all(len(p) == 2 for p in props):
+        # Fixed-size records: a single zero-copy view over the file buffer
+        dtype = np.dtype([(name, endian + code) for name, code in props])
+        block = np.frombuffer(buf, dtype=dtype, count=count, offset=offset)
+        return {name: block[name] for name, _ in props}, offset + count * dtype.itemsize
+
+    if len(props) == 1:
+        # Typical face element: one list property. Fast path when every list has the same length.
+        name, count_code, item_code = props[0]
+        count_dtype = np.dtype(endian + count_code)
+        item_dtype = np.dtype(endian + item_code)
+        k = int(np.frombuffer(buf, dtype=count_dtype, count=1, offset=offset)[0])
+        dtype = np.dtype([('n', count_dtype), ('idx', item_dtype, (k,))])
+        if offset + count * dtype.itemsize <= len(buf):
+            block = np.frombuffer(buf, dtype=dtype, count=count, offset=offset)
+            if np.all(block['n'] == k):
+                return {name: block['idx']}, offset + count * dtype.itemsize
+
+    # Generic (mixed list lengths) fallback
+    fields = {p[0]: [] for p in props}
+    for _ in range(count):
+        for p in props:
+            if len(p) == 2:
+                dt = np.dtype(endian + p[1])
+                fields[p[0]].append(np.frombuffer(buf, dtype=dt, count=1, offset=offset)[0])
+                offset += dt.itemsize
+            else:
+                count_dtype = np.dtype(endian + p[1])
+                item_dtype = np.dtype(endian + p[2])
+                n = int(np.frombuffer(buf, dtype=count_dtype, count=1, offset=offset)[0])
+                offset += count_dtype.itemsize
+                fields[p[0]].append(np.frombuffer(buf, dtype=item_dtype, count=n, offset=offset))
+                offset += n * item_dtype.itemsize
+    return {p[0]: (np.array(fields[p[0]]) if len(p) == 2 else fields[p[0]]) for p in props}, offset
+
+
+def _read_ascii_elements(f, elements):
+    """ Reads all element blocks of an ASCII PLY file. """
+    lines = f.read().splitlines()
+    result = {}
+    cursor = 0
+    for name, count, props in elements:
+        block = lines[cursor:cursor + count]
+        cursor += count
+        if count == 0:
+            result[name] = {}
+            continue
+
+        if all(len(p) == 2 for p in props):
+            values = np.array(b" ".join(block).split(), dtype=np.float64).reshape(count, len(props))
+            result[name] = {p[0]: values[:, i].astype(p[1]) for i, p in enumerate(props)}
+            continue
+
+        if len(props) == 1:
+            tokens = b" ".join(block).split()
+            k = int(tokens[0])
+            if len(tokens) == count * (k + 1):
+                table = np.array(tokens, dtype=np.int64).reshape(count, k + 1)
+                if np.all(table[:, 0] == k):
+                    result[name] = {props[0][0]: table[:, 1:]}
+                    continue
+
+        # Generic fallback: walk each line
+        fields = {p[0]: [] for p in props}
+        for line in block:
+            tokens = line.split()
+            pos = 0
+            for p in props:
+                if len(p) == 2:
+                    fields[p[0]].append(float(tokens[pos]))
+                    pos += 1
+                else:
+                    n = int(tokens[pos])
+                    fields[p[0]].append(np.array(tokens[pos + 1:pos + 1 + n], dtype=np.int64))
+                    pos += n + 1
+        result[name] = {p[0]: (np.array(fields[p[0]]) if len(p) == 2 else fields[p[0]]) for p in props}
+    return result
+
+
+def triangulate(faces):
+    """
+    Converts PLY faces (an (F, k) array or a list of index arrays) into an (T, 3) triangle array.
+    Quads and other polygons are split into fans.
+    """
+    if isinstance(faces, np.ndarray) and faces.ndim == 2:
+        k = faces.shape[1]
+        if k == 3:
+            return faces.astype(np.uint32)
+        fans = [faces[:, [0, i, i + 1]] for i in range(1, k - 1)]
+        return np.stack(fans, axis=1).reshape(-1, 3).astype(np.uint32)
+
+    tris = []
+    for face in faces:
+        for i in range(1, len(face) - 1):
+            tris.append((face[0], face[i], face[i + 1]))
+    return np.array(tris, dtype=np.uint32).reshape(-1, 3)
+
+
+def compute_vertex_normals(points, triangles):
+    """ Area-weighted vertex normals, fully vectorized. """
+    p0 = points[triangles[:, 0]]
+    p1 = points[triangles[:, 1]]
+    p2 = points[triangles[:, 2]]
+    face_normals = np.cross(p1 - p0, p2 - p0)
+
+    normals = np.zeros_like(points)
+    for c in range(3):
+        np.add.at(normals, triangles[:, c], face_normals)
+    norms = np.linalg.norm(normals, axis=1, keepdims=True)
+    # Avoid division by zero
+    norms[norms == 0] = 1
+    return normals / norms
+
+
+def read_ply(filename):
+    """
+    Reads a binary or ASCII PLY file into NumPy arrays.
+    Returns a dict with 'points' (N,3) float32, 'normals' (N,3) float32,
+    'colors' (N,4) uint8 or None, and 'triangles' (T,3) uint32.
+    """
+    with open(filename, 'rb') as f:
+        fmt, elements = read_ply_header(f)
+        if fmt == 'ascii':
+            data = _read_ascii_elements(f, elements)
+        else:
+            buf = f.read()
+            data = {}
+            offset = 0
+            for name, count, props in elements:
+                data[name], offset = _read_binary_element(buf, offset, count, props, PLY_FORMATS[fmt])
+
+    vertex = data.get('vertex')
+    if not vertex:
+        raise ValueError("PLY file has no vertices.")
+
+    points = np.column_stack((vertex['x'], vertex['y'], vertex['z'])).astype(np.float32)
+
+    face = data.get('face', {})
+    face_list = face.get('vertex_indices', face.get('vertex_index'))
+    triangles = triangulate(face_list) if face_list is not None and len(face_list) else np.zeros((0, 3), np.uint32)
+
+    if all(k in vertex for k in ('nx', 'ny', 'nz')):
+        normals = np.column_stack((vertex['nx'], vertex['ny'], vertex['nz'])).astype(np.float32)
+    else:
+        normals = compute_vertex_normals(points, triangles).astype(np.float32)
+
+    colors = None
+    if all(k in vertex for k in ('red', 'green', 'blue')):
+        alpha = vertex['alpha'] if 'alpha' in vertex else np.full(len(points), 255)
+        colors = np.column_stack((vertex['red'], vertex['green'], vertex['blue'], alpha)).astype(np.uint8)
+
+    return {'points': points, 'normals': normals, 'colors': colors, 'triangles': triangles}
+
+
+def get_vertex_format():
+    """ Registered Panda3D format matching VERTEX_DTYPE (position, normal, RGBA8 color). """
+    array_format = GeomVertexArrayFormat()
+    array_format.addColumn(InternalName.getVertex(), 3, Geom.NT_float32, Geom.C_point)
+    array_format.addColumn(InternalName.getNormal(), 3, Geom.NT_float32, Geom.C_normal)
+    array_format.addColumn(InternalName.getColor(), 4, Geom.NT_uint8, Geom.C_color)
+    return GeomVertexFormat.registerFormat(GeomVertexFormat(array_format))
+
+
+def vertex_array_view(vdata, dtype=VERTEX_DTYPE):
+    """ Writable NumPy view directly over the first array of a GeomVertexData (no copy). """
+    handle = vdata.modifyArray(0)
+    return np.frombuffer(memoryview(handle).cast('B'), dtype=dtype)
+
+
+def build_geom_node(mesh, name="ply_mesh"):
+    """
+    Fills a GeomVertexData / GeomTriangles from the arrays returned by read_ply.
+    The vertex columns are written straight into Panda3D's buffer through a NumPy view.
+    """
+    n = len(mesh['points'])
+    vdata = GeomVertexData(name, get_vertex_format(), Geom.UHDynamic)
+    vdata.uncleanSetNumRows(n)
+
+    view = vertex_array_view(vdata)
+    view['vertex'] = mesh['points']
+    view['normal'] = mesh['normals']
+    view['color'] = mesh['colors'] if mesh['colors'] is not None else 255
+
+    prim = GeomTriangles(Geom.UHStatic)
+    prim.setIndexType(Geom.NT_uint32)
+    triangles = np.ascontiguousarray(mesh['triangles'], dtype=np.uint32)
+    index_handle = prim.modifyVertices()
+    index_handle.uncleanSetNumRows(triangles.size)
+    np.frombuffer(memoryview(index_handle).cast('B'), dtype=np.uint32)[:] = triangles.ravel()
+
+    geom = Geom(vdata)
+    geom.addPrimitive(prim)
+    node = GeomNode(name)
+    node.addGeom(geom)
+    return node
+
+
+def load_ply_model(filename):
+    """
+    Loads a PLY file as a NodePath ready for the simulators.
+    Returns (model, has_colors) and prints the load time.
+    """
+    start = time.perf_counter()
+    mesh = read_ply(filename)
+    parsed = time.perf_counter()
+    # GeomNode goes under a plain root, like models from the loader (extract_vertex_data searches below it)
+    model = NodePath("ply_root")
+    model.attachNewNode(build_geom_node(mesh))
+    done = time.perf_counter()
+
+    print(f"PLY: {len(mesh['points'])} verts, {len(mesh['triangles'])} tris | "
+          f"parse {(parsed - start) * 1000:.1f} ms + upload {(done - parsed) * 1000:.1f} ms "
+          f"= {(done - start) * 1000:.1f} ms")
+    return model, mesh['colors'] is not None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python ply_loader.py <mesh.ply>")
+        sys.exit(1)
+    load_ply_model(sys.argv[1])
@@ -0,0 +1,136 @@
+import time
+from collections import deque
+from panda3d.core import AntialiasAttrib
+from render_profiles import PROFILES
+
+# NOTE: Adaptive quality governor for the simulators.
+# Watches recent frame times and trades quality for speed to hold a target frame rate
+# (90 FPS for VR). Knobs are ordered from the cheapest to give up to the most visible:
+# when frames are too slow the next knob goes one level down, when there is headroom the
+# last lowered knob goes back up. A knob that is raised and has to be lowered again right
+# away waits twice as long before the next raise, so the governor settles instead of oscillating.
+# Every change is printed and kept in 'history' with the frame time that caused it.
+
+TARGET_FPS = 90.0
+WINDOW_FRAMES = 45       # Frames averaged per decision
+COOLDOWN = 0.75          # Seconds between two changes (lets the new setting show up in the frame times)
+SLOW_MARGIN = 1.05       # Lower quality above target frame time * this
+FAST_MARGIN = 0.75       # Raise quality below target frame time * this
+RAISE_HOLD = 2.0         # Seconds a knob stays down before it may be raised again (doubles on oscillation)
+
+
+class Knob:
+    """ One quality setting: levels from best to cheapest, applied through a callback. """
+    def __init__(self, name, levels, apply, label=None):
+        self.name = name
+        self.levels = levels
+        self.apply = apply
+        self.label = label or str
+        self.level = 0
+        self.hold = RAISE_HOLD
+        self.lowered_at = 0.0
+        self.raised_at = -1e9
+
+    @property
+    def value(self):
+        return self.levels[self.level]
+
+    def set_level(self, level):
+        self.level = level
+        self.apply(self.value)
+
+
+class QualityGovernor:
+    def __init__(self, knobs, target_fps=TARGET_FPS):
+        self.knobs = knobs
+        self.target_fps = target_fps
+        self.enabled = True
+        self.frame_times = deque(maxlen=WINDOW_FRAMES)
+        self.last_change = time.perf_counter()
+        self.lowered = [] # Knobs in the order they were lowered (raised back in reverse)
+        self.history = [] # (time, knob, old value, new value, frame ms)
+
+    def frame_ms(self):
+        return 1000.0 * sum(self.frame_times) / len(self.frame_times) if self.frame_times else 0.0
+
+    def update(self, frame_dt):
+        """ Call once per rendered frame with the unclamped frame time. """
+        self.frame_times.append(frame_dt)
+        now = time.perf_counter()
+        if not self.enabled or len(self.frame_times) < WINDOW_FRAMES or now - self.last_change < COOLDOWN:
+            return
+        average = sum(self.frame_times) / len(self.frame_times)
+        budget = 1.0 / self.target_fps
+
+        if average > budget * SLOW_MARGIN:
+            knob = next((k for k in self.knobs if k.level < len(k.levels) - 1), None)
+            if knob is None:
+                return
+            if now - knob.raised_at < knob.hold:
+                knob.hold *= 2 # Raising it again was too much: stay down longer next time
+            self._change(knob, knob.level + 1, average, now)
+            knob.lowered_at = now
+            self.lowered.append(knob)
+        elif average < budget * FAST_MARGIN and self.lowered:
+            knob = self.lowered[-1]
+            if now - knob.lowered_at < knob.hold:
+                return
+            self._change(knob, knob.level - 1, average, now)
+            knob.raised_at = now
+            self.lowered.pop()
+
+    def _change(self, knob, level, average, now):
+        old = knob.label(knob.value)
+        knob.set_level(level)
+        self.history.append((now, knob.name, old, knob.label(knob.value), average * 1000))
+        self.frame_times.clear()
+        self.last_change = now
+        print(f"QUALITY: {knob.name} {old} -> {knob.label(knob.value)} "
+              f"(frame {average * 1000:.1f} ms, target {1000 / self.target_fps:.1f} ms)")
+
+    def reset(self):
+        """ Back to full quality (e.g. when the governor is switched off). """
+        for knob in self.knobs:
+            if knob.level:
+                knob.set_level(0)
+        self.lowered = []
+        self.frame_times.clear()
+
+    def summary(self):
+        return " | ".join(f"{k.name} {k.label(k.value)}" for k in self.knobs)
+
+
+def simulator_knobs(app):
+    """
+    Standard knobs of the organ simulators (BioSimFinal / NoseSimFinal), cheapest first.
+    Expects app.render, app.render_profile, app.spotlight, app.physics and the caps read by its update loop
+    (physics_rate, pbd_iterations_cap, contact_radius_cap).
+    """
+    def set_antialias(on):
+        app.render.setAntialias(AntialiasAttrib.MAuto if on else AntialiasAttrib.MNone)
+
+    def set_shadow_map(size):
+        app.spotlight.setShadowCaster(size > 0, max(size, 1), max(size, 1))
+
+    def set_physics_rate(rate):
+        app.physics_rate = rate
+        if app.physics:
+            app.physics.set_rate(rate)
+
+    def set_pbd_cap(cap):
+        app.pbd_iterations_cap = cap
+
+    def set_radius_cap(cap):
+        app.contact_radius_cap = cap
+
+    # Never raise shadows or AA above the render profile the app started with
+    profile = PROFILES[app.render_profile]
+    antialias = (True, False) if profile["antialias"] else (False,)
+    shadow_maps = tuple(size for size in (2048, 1024, 512) if size <= profile["shadow_map"]) or (0,)
+    return [
+        Knob("antialias", antialias, set_antialias, lambda on: "on" if on else "off"),
+        Knob("shadow_map", shadow_maps, set_shadow_map, lambda size: str(size) if size else "off"),
+        Knob("physics_hz", (120.0, 90.0, 60.0), set_physics_rate, lambda hz: f"{hz:.0f} Hz"),
+        Knob("pbd_iterations", (32, 4, 2), set_pbd_cap, lambda cap: f"<= {cap}"),
+        Knob("contact_radius", (None, 3.0, 2.0), set_radius_cap, lambda cap: "full" if cap is None else f"<= {cap}"),
+    ]
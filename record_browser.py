@@ -0,0 +1,196 @@
+import os
+import sys
+import time
+import sqlite3
+import subprocess
+import tkinter as tk
+from record_format import read_header
+from record_index import INDEX_FILE, RECORD_EXTENSIONS
+
+# NOTE: In-app browser for Patient_Records.
+# RecordCatalog keeps (size, mtime, first line) of every record in the same SQLite file
+# as the search index, so the list can be shown instantly from cache and refreshed with
+# a cheap os.scandir pass that only opens new or changed files.
+# VirtualRecordList draws only the rows that are visible (a fixed pool of canvas items),
+# so tens of thousands of records cost the same to display as a handful.
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog (name TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, first_line TEXT);
+CREATE INDEX IF NOT EXISTS catalog_by_mtime ON catalog (mtime);
+"""
+PREVIEW_BYTES = 200
+
+
+def open_path(path):
+    """ Opens a file or folder with the system handler (os.startfile only exists on Windows). """
+    if hasattr(os, "startfile"):
+        os.startfile(path)
+    elif sys.platform == "darwin":
+        subprocess.Popen(["open", path])
+    else:
+        subprocess.Popen(["xdg-open", path])
+
+
+def read_first_line(path):
+    """ First line of the note text (skips the .smr header), read without loading the file. """
+    with open(path, "rb") as f:
+        _, offset = read_header(f)
+        f.seek(offset)
+        line = f.readline(PREVIEW_BYTES)
+    return line.decode("utf-8", errors="replace").strip()
+
+
+class RecordCatalog:
+    """ Cached metadata for every record in the folder. """
+    def __init__(self, folder="Patient_Records"):
+        self.folder = folder
+        self.db_path = os.path.join(folder, INDEX_FILE)
+        os.makedirs(folder, exist_ok=True)
+        with self._connect() as db:
+            db.executescript(CATALOG_SCHEMA)
+
+    def _connect(self):
+        # Short-lived connections: the catalog is used from the UI thread and the scanner thread
+        db = sqlite3.connect(self.db_path)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def cached(self):
+        """ Rows (name, mtime_ns, size, first_line), newest first, straight from the cache. """
+        db = self._connect()
+        try:
+            return db.execute("SELECT name, mtime, size, first_line FROM catalog ORDER BY mtime DESC").fetchall()
+        finally:
+            db.close()
+
+    def refresh(self):
+        """ Brings the cache in line with the folder. Returns the number of rows that changed. """
+        seen = {}
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.lower().endswith(RECORD_EXTENSIONS):
+                    st = entry.stat()
+                    seen[entry.name] = (st.st_mtime_ns, st.st_size)
+
+        db = self._connect()
+        try:
+            known = {name: (mtime, size) for name, mtime, size in db.execute("SELECT name, mtime, size FROM catalog")}
+            removed = [(name,) for name in known if name not in seen]
+            updated = []
+            for name, stat in seen.items():
+                if known.get(name) == stat:
+                    continue
+                try:
+                    first_line = read_first_line(os.path.join(self.folder, name))
+                except OSError:
+                    continue
+                updated.append((name, stat[0], stat[1], first_line))
+            with db:
+                db.executemany("DELETE FROM catalog WHERE name = ?", removed)
+                db.executemany("INSERT OR REPLACE INTO catalog VALUES (?, ?, ?, ?)", updated)
+        finally:
+            db.close()
+        return len(removed) + len(updated)
+
+
+class VirtualRecordList(tk.Frame):
+    """ Scrollable record list that only draws the visible rows. """
+    ROW_HEIGHT = 30
+
+    def __init__(self, parent, on_open, bg="white", **kwargs):
+        super().__init__(parent, bg=bg, **kwargs)
+        self.on_open = on_open
+        self.bg = bg
+        self.rows = []      # (name, mtime_ns, size, first_line, note)
+        self.pool = []      # canvas item ids per visible slot: (background, name, date, preview)
+        self.offset = 0     # Scroll position in pixels
+        self.selected = None
+
+        self.scrollbar = tk.Scrollbar(self, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas = tk.Canvas(self, bg=bg, highlightthickness=0)
+        self.canvas.pack(side=tk.LEFT, expand=True, fill=tk.BOTH)
+
+        self.canvas.bind("<Configure>", self.on_resize)
+        self.canvas.bind("<Button-1>", self.on_click)
+        self.canvas.bind("<Double-Button-1>", self.on_double_click)
+        self.canvas.bind("<MouseWheel>", lambda e: self.scroll_pixels(-e.delta))
+        self.canvas.bind("<Button-4>", lambda e: self.scroll_pixels(-3 * self.ROW_HEIGHT))
+        self.canvas.bind("<Button-5>", lambda e: self.scroll_pixels(3 * self.ROW_HEIGHT))
+
+    def set_rows(self, rows):
+        self.rows = rows
+        self.offset = 0
+        self.selected = None
+        self.redraw()
+
+    # --- Row Pool ---
+    def on_resize(self, event):
+        needed = event.height // self.ROW_HEIGHT + 2
+        while len(self.pool) < needed:
+            self.pool.append((
+                self.canvas.create_rectangle(0, 0, 0, 0, outline=""),
+                self.canvas.create_text(12, 0, anchor=tk.W, font=("Segoe UI", 11, "bold"), fill="#1A237E"),
+                self.canvas.create_text(0, 0, anchor=tk.W, font=("Segoe UI", 10), fill="#546E7A"),
+                self.canvas.create_text(0, 0, anchor=tk.W, font=("Segoe UI", 10), fill="#90A4AE")
+            ))
+        self.redraw()
+
+    def redraw(self):
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        max_offset = max(0, len(self.rows) * self.ROW_HEIGHT - height)
+        self.offset = max(0, min(self.offset, max_offset))
+
+        first = self.offset // self.ROW_HEIGHT
+        shift = self.offset % self.ROW_HEIGHT
+        for slot, (bg_id, name_id, date_id, preview_id) in enumerate(self.pool):
+            row = first + slot
+            if row >= len(self.rows):
+                for item in (bg_id, name_id, date_id, preview_id):
+                    self.canvas.itemconfigure(item, state=tk.HIDDEN)
+                continue
+
+            name, mtime, size, first_line, note = self.rows[row]
+            y = slot * self.ROW_HEIGHT - shift
+            fill = "#BBDEFB" if row == self.selected else ("#FFFFFF" if row % 2 else "#F5F9FC")
+            self.canvas.coords(bg_id, 0, y, width, y + self.ROW_HEIGHT)
+            self.canvas.itemconfigure(bg_id, fill=fill, state=tk.NORMAL)
+
+            mid = y + self.ROW_HEIGHT / 2
+            self.canvas.coords(name_id, 12, mid)
+            self.canvas.itemconfigure(name_id, text=name, state=tk.NORMAL)
+            self.canvas.coords(date_id, width * 0.38, mid)
+            date = time.strftime("%Y-%m-%d %H:%M", time.localtime(mtime / 1e9))
+            self.canvas.itemconfigure(date_id, text=f"{date}   {size / 1024:.1f} KB", state=tk.NORMAL)
+            self.canvas.coords(preview_id, width * 0.62, mid)
+            self.canvas.itemconfigure(preview_id, text=note or first_line[:60], state=tk.NORMAL)
+
+        total = max(len(self.rows) * self.ROW_HEIGHT, 1)
+        self.scrollbar.set(self.offset / total, min((self.offset + height) / total, 1.0))
+
+    # --- Scrolling & Selection ---
+    def yview(self, *args):
+        if args[0] == "moveto":
+            self.offset = int(float(args[1]) * len(self.rows) * self.ROW_HEIGHT)
+        elif args[0] == "scroll":
+            step = self.canvas.winfo_height() if args[2] == "pages" else self.ROW_HEIGHT
+            self.offset += int(args[1]) * step
+        self.redraw()
+
+    def scroll_pixels(self, amount):
+        self.offset += int(amount)
+        self.redraw()
+
+    def row_at(self, y):
+        row = int((self.offset + y) // self.ROW_HEIGHT)
+        return row if 0 <= row < len(self.rows) else None
+
+    def on_click(self, event):
+        self.selected = self.row_at(event.y)
+        self.redraw()
+
+    def on_double_click(self, event):
+        row = self.row_at(event.y)
+        if row is not None:
+            self.on_open(self.rows[row][0])
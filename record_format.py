@@ -0,0 +1,119 @@
+import os
+import sys
+import json
+import time
+
+# NOTE: Compact formatted record format (.smr) for SmartMedicalNotes.
+#
+#   SMR1\n
+#   {"tags": {"bold": [...], "highlight_yellow": [...]}}\n
+#   <plain text of the note>
+#
+# Tag ranges are stored per tag as a flat, delta-encoded list of Tk "line.col" spans:
+# [start line - previous end line, start col, end line - start line, end col, ...]
+# Loading is one insert for the text plus one tag_add call per tag for all of its spans.
+# The text section is byte-for-byte the plain note, so .txt export stays trivial.
+
+RECORD_MAGIC = "SMR1"
+RECORD_EXTENSION = ".smr"
+FORMATTING_TAGS = ("bold", "header", "highlight_yellow", "highlight_green", "highlight_blue")
+TAG_ARGS_PER_CALL = 2000 # Index pairs per tag_add call (keeps Tcl command lines reasonable)
+
+
+def is_formatted(path):
+    return path.lower().endswith(RECORD_EXTENSION)
+
+
+def _parse_index(index):
+    line, col = str(index).split(".")
+    return int(line), int(col)
+
+
+def encode_spans(ranges):
+    """ [start, end, start, end, ...] Tk indices -> flat delta-encoded int list. """
+    flat = []
+    prev_line = 1
+    for i in range(0, len(ranges), 2):
+        s_line, s_col = _parse_index(ranges[i])
+        e_line, e_col = _parse_index(ranges[i + 1])
+        flat.extend((s_line - prev_line, s_col, e_line - s_line, e_col))
+        prev_line = e_line
+    return flat
+
+
+def decode_spans(flat, line_offset=0):
+    """ Flat delta-encoded list -> [start, end, start, end, ...] "line.col" strings. """
+    indices = []
+    prev_line = 1
+    for i in range(0, len(flat), 4):
+        s_line = prev_line + flat[i]
+        e_line = s_line + flat[i + 2]
+        indices.append(f"{s_line + line_offset}.{flat[i + 1]}")
+        indices.append(f"{e_line + line_offset}.{flat[i + 3]}")
+        prev_line = e_line
+    return indices
+
+
+def capture_tags(text_widget, tags=FORMATTING_TAGS):
+    """ One tag_ranges call per tag. """
+    spans = {}
+    for tag in tags:
+        ranges = text_widget.tag_ranges(tag)
+        if ranges:
+            spans[tag] = encode_spans(ranges)
+    return spans
+
+
+def apply_tags(text_widget, spans, line_offset=0):
+    """ Re-applies saved spans in bulk: a single tag_add carries many spans at once. """
+    for tag, flat in spans.items():
+        indices = decode_spans(flat, line_offset)
+        step = TAG_ARGS_PER_CALL * 2
+        for i in range(0, len(indices), step):
+            text_widget.tag_add(tag, *indices[i:i + step])
+
+
+def write_record(path, text, spans=None):
+    """ Atomic write. .smr keeps formatting, anything else is a plain text export. """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+        if is_formatted(path):
+            f.write(RECORD_MAGIC + "\n")
+            f.write(json.dumps({"tags": spans or {}}, separators=(",", ":")) + "\n")
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def read_header(f):
+    """
+    Reads the header of an open record (binary mode).
+    Returns (spans, text_offset); plain text files have no spans and start at 0.
+    """
+    first = f.readline()
+    if first.rstrip(b"\r\n") != RECORD_MAGIC.encode("ascii"):
+        return {}, 0
+    header = json.loads(f.readline())
+    return header.get("tags", {}), f.tell()
+
+
+def read_record(path):
+    """ Returns (text, spans). Plain .txt files load with no spans. """
+    if not os.path.exists(path):
+        return "", {}
+    with open(path, "rb") as f:
+        spans, offset = read_header(f)
+        f.seek(offset)
+        return f.read().decode("utf-8", errors="replace").replace("\r\n", "\n"), spans
+
+
+if __name__ == "__main__":
+    # Quick throughput check: python record_format.py <record.smr>
+    if len(sys.argv) < 2:
+        print("Usage: python record_format.py <record.smr>")
+        sys.exit(1)
+    start = time.perf_counter()
+    text, spans = read_record(sys.argv[1])
+    count = sum(len(flat) // 4 for flat in spans.values())
+    print(f"{len(text)} chars, {count} spans read in {(time.perf_counter() - start) * 1000:.1f} ms")
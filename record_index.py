@@ -0,0 +1,176 @@
+import os
+import re
+import sys
+import time
+import sqlite3
+import threading
+from array import array
+from record_format import RECORD_EXTENSION, read_record
+
+# NOTE: Inverted full-text index over the Patient_Records folder.
+# The index lives in the folder itself ('.records_index.db', a small SQLite file) and
+# remembers the mtime/size of every record, so an update only re-reads files that
+# changed and only rewrites their postings. Queries are indexed lookups per token:
+# keywords, "quoted phrases" and emoji stickers.
+
+INDEX_FILE = ".records_index.db"
+RECORD_EXTENSIONS = (".txt", RECORD_EXTENSION)
+BATCH_SIZE = 200 # Records written per transaction during an update
+
+# Words, plus any single non-ASCII symbol (emoji stickers like 🩺 or ⚠️)
+TOKEN_RE = re.compile(r"\w+|[^\w\s\x00-\x7f]")
+# Emoji presentation selector / joiner carry no meaning for search
+TOKEN_STRIP = str.maketrans("", "", "\ufe0f\u200d")
+PHRASE_RE = re.compile(r'"([^"]*)"')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (name TEXT PRIMARY KEY, mtime INTEGER, size INTEGER);
+CREATE TABLE IF NOT EXISTS postings (token TEXT, name TEXT, positions BLOB, PRIMARY KEY (token, name)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_by_name ON postings (name);
+"""
+
+
+def tokenize(text):
+    return [t.lower() for t in TOKEN_RE.findall(text.translate(TOKEN_STRIP))]
+
+
+class RecordIndex:
+    """ Positional inverted index: token -> {record name -> [positions]}, stored on disk. """
+    def __init__(self, folder="Patient_Records"):
+        self.folder = folder
+        self.index_path = os.path.join(folder, INDEX_FILE)
+        self.lock = threading.Lock()
+        os.makedirs(folder, exist_ok=True)
+        # Shared between the UI and the background indexer, always used under self.lock
+        self.db = sqlite3.connect(self.index_path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def count(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    # --- Incremental Update ---
+    def update(self):
+        """ Re-indexes new/changed records and drops deleted ones. Returns (changed, removed). """
+        if not os.path.isdir(self.folder):
+            return 0, 0
+
+        seen = {}
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.lower().endswith(RECORD_EXTENSIONS):
+                    st = entry.stat()
+                    seen[entry.name] = (st.st_mtime_ns, st.st_size)
+
+        with self.lock:
+            known = {name: (mtime, size) for name, mtime, size in self.db.execute("SELECT name, mtime, size FROM files")}
+        removed = [name for name in known if name not in seen]
+        stale = [name for name, stat in seen.items() if known.get(name) != stat]
+
+        # Tokenizing happens outside the lock so searches stay responsive during a rebuild;
+        # results are written in batches, one transaction each
+        with self.lock, self.db:
+            for name in removed:
+                self._remove(name)
+        changed = 0
+        for i in range(0, len(stale), BATCH_SIZE):
+            batch = []
+            for name in stale[i:i + BATCH_SIZE]:
+                try:
+                    batch.append((name, self._postings(name, self.read_record(os.path.join(self.folder, name)))))
+                except OSError:
+                    continue
+            with self.lock, self.db:
+                for name, rows in batch:
+                    self._remove(name)
+                    self.db.executemany("INSERT INTO postings VALUES (?, ?, ?)", rows)
+                    self.db.execute("INSERT INTO files VALUES (?, ?, ?)", (name, *seen[name]))
+            changed += len(batch)
+        return changed, len(removed)
+
+    def read_record(self, path):
+        return read_record(path)[0]
+
+    def _postings(self, name, text):
+        positions = {}
+        for pos, token in enumerate(tokenize(text)):
+            positions.setdefault(token, array("I")).append(pos)
+        return [(token, name, plist.tobytes()) for token, plist in positions.items()]
+
+    def _remove(self, name):
+        self.db.execute("DELETE FROM postings WHERE name = ?", (name,))
+        self.db.execute("DELETE FROM files WHERE name = ?", (name,))
+
+    def _docs(self, token):
+        """ {record name: positions} for one token. """
+        rows = self.db.execute("SELECT name, positions FROM postings WHERE token = ?", (token,))
+        return {name: array("I", blob) for name, blob in rows}
+
+    # --- Queries ---
+    def search(self, query):
+        """
+        All terms must match. Quoted parts are phrases: "blood loss" 🩺
+        Returns a list of (record name, hit count), best first.
+        """
+        phrases = [tokenize(p) for p in PHRASE_RE.findall(query)]
+        terms = tokenize(PHRASE_RE.sub(" ", query))
+        phrases = [p for p in phrases if p]
+        if not terms and not phrases:
+            return []
+
+        with self.lock:
+            scores = None
+            for term in terms:
+                hits = {name: len(plist) for name, plist in self._docs(term).items()}
+                scores = self._intersect(scores, hits)
+                if not scores:
+                    return []
+            for phrase in phrases:
+                scores = self._intersect(scores, self._phrase_hits(phrase))
+                if not scores:
+                    return []
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+    def _intersect(self, scores, hits):
+        if scores is None:
+            return hits
+        return {name: scores[name] + count for name, count in hits.items() if name in scores}
+
+    def _phrase_hits(self, phrase):
+        doc_lists = [self._docs(token) for token in phrase]
+        if not all(doc_lists):
+            return {}
+        # Start from the rarest token to keep the candidate set small
+        candidates = set(min(doc_lists, key=len))
+        for docs in doc_lists:
+            candidates &= docs.keys()
+
+        hits = {}
+        for name in candidates:
+            # Phrase starts = positions of the first token that line up with every later token
+            starts = set(doc_lists[0][name])
+            for i, docs in enumerate(doc_lists[1:]):
+                starts.intersection_update(map((i + 1).__rsub__, docs[name]))
+                if not starts:
+                    break
+            if starts:
+                hits[name] = len(starts)
+        return hits
+
+if __name__ == "__main__":
+    index = RecordIndex(sys.argv[2] if len(sys.argv) > 2 else "Patient_Records")
+    start = time.perf_counter()
+    changed, removed = index.update()
+    print(f"Index: {index.count()} records ({changed} re-indexed, {removed} removed) "
+          f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+    if len(sys.argv) > 1:
+        start = time.perf_counter()
+        results = index.search(sys.argv[1])
+        print(f"{len(results)} results in {(time.perf_counter() - start) * 1000:.2f} ms")
+        for name, hits in results[:20]:
+            print(f"  {hits:4d}  {name}")
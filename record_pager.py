@@ -0,0 +1,250 @@
+import os
+import threading
+import tkinter as tk
+from bisect import bisect_left
+from array import array
+from itertools import accumulate
+from record_format import read_header
+
+# NOTE: Paged (windowed) viewing of very large records in the whiteboard.
+# Only a window of lines around the visible region lives in the tk.Text widget.
+# More lines are streamed in from disk as the user scrolls, and lines far away
+# are dropped again, so memory and Tk layout cost do not grow with the file size.
+# The line offsets of the file are indexed on a background thread (one locked extend per
+# block); the first page is shown as soon as the first block has been scanned.
+# Formatting stays in its compact encoded form (record_format.py) as int arrays, plus the
+# absolute end line of every span for a bisect; only the spans of a loaded chunk are decoded.
+
+PAGED_THRESHOLD_BYTES = 2 * 1024 * 1024 # Records above this size open in paged mode
+WINDOW_LINES = 1500                      # Lines kept in the widget at once
+CHUNK_LINES = 300                        # Lines streamed in/out per step
+MARGIN_LINES = 150                       # Load the next chunk when this close to the window edge
+SCAN_BLOCK = 1024 * 1024
+
+
+def compact_spans(spans):
+    """
+    tag -> (flat encoded spans, absolute 0-based end line of every span), both array('q').
+    The end lines are a running sum of the line deltas (start delta + length of every span).
+    """
+    result = {}
+    for tag, flat in spans.items():
+        flat = array("q", flat)
+        ends = array("q", accumulate(map(int.__add__, flat[0::4], flat[2::4])))
+        result[tag] = (flat, ends)
+    return result
+
+
+class LineIndex:
+    """ Byte offset of every line start in the text section of a record file. """
+    def __init__(self, path):
+        self.path = path
+        self.size = os.path.getsize(path)
+        with open(path, "rb") as f:
+            spans, self.text_offset = read_header(f)
+        self.spans = compact_spans(spans)
+        self.lock = threading.Lock() # Guards offsets / scanned (extended by the scan thread)
+        self.offsets = array("q", [self.text_offset])
+        self.scanned = self.text_offset
+        self.complete = False
+        self.first_block = threading.Event()
+        self.thread = threading.Thread(target=self._scan, name="RecordLineIndex", daemon=True)
+        self.thread.start()
+        self.first_block.wait()
+
+    def _scan(self):
+        with open(self.path, "rb") as f:
+            f.seek(self.text_offset)
+            pos = self.text_offset
+            while True:
+                block = f.read(SCAN_BLOCK)
+                if not block:
+                    break
+                starts = array("q")
+                found = block.find(b"\n")
+                while found != -1:
+                    starts.append(pos + found + 1)
+                    found = block.find(b"\n", found + 1)
+                pos += len(block)
+                with self.lock:
+                    self.offsets.extend(starts)
+                    self.scanned = pos
+                self.first_block.set()
+        with self.lock:
+            # A last line without a trailing newline still counts
+            if self.offsets[-1] != self.size:
+                self.offsets.append(self.size)
+            self.complete = True
+        self.first_block.set()
+
+    def known_lines(self):
+        """ Lines whose end offset is already known. """
+        with self.lock:
+            return len(self.offsets) - 1
+
+    def estimated_lines(self):
+        """ Total line count, extrapolated while the scan is still running. """
+        with self.lock:
+            known, scanned, complete = len(self.offsets) - 1, self.scanned, self.complete
+        if complete or scanned <= self.text_offset:
+            return max(known, 1)
+        ratio = (self.size - self.text_offset) / (scanned - self.text_offset)
+        return max(int(known * ratio), known, 1)
+
+    def read_lines(self, first, last):
+        """ Text of lines [first, last) straight from disk. """
+        with self.lock:
+            last = min(last, len(self.offsets) - 1)
+            if last <= first:
+                return ""
+            start, end = self.offsets[first], self.offsets[last]
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        return data.decode("utf-8", errors="replace").replace("\r\n", "\n")
+
+
+class PagedTextView:
+    """ Drives a (read-only) tk.Text and its scrollbar over a LineIndex. """
+    def __init__(self, text_widget, scrollbar, path):
+        self.text = text_widget
+        self.scrollbar = scrollbar
+        self.index = LineIndex(path)
+        self.first = 0 # File line shown as widget line 1
+        self.last = 0  # One past the last file line in the widget
+        self.busy = False
+
+        self.text.config(yscrollcommand=self.on_text_scroll, undo=False)
+        self.scrollbar.config(command=self.on_scrollbar)
+        self.load_window(0)
+        self.text.after(250, self.poll_scan)
+
+    def detach(self, yscrollcommand, scroll_command):
+        """ Hands the widget back to normal (editable) mode. """
+        self.text.config(state=tk.NORMAL, yscrollcommand=yscrollcommand, undo=True)
+        self.scrollbar.config(command=scroll_command)
+        self.text = None
+
+    # --- Formatting ---
+    def apply_tags(self, first, last):
+        """
+        Re-applies the spans that overlap file lines [first, last), clipped to that range.
+        Only those spans are decoded from the compact arrays (0-based file lines).
+        """
+        for tag, (flat, end_lines) in self.index.spans.items():
+            args = []
+            for i in range(bisect_left(end_lines, first), len(end_lines)):
+                e_line = end_lines[i]
+                s_line = e_line - flat[4 * i + 2]
+                if s_line >= last:
+                    break
+                s_col, e_col = flat[4 * i + 1], flat[4 * i + 3]
+                start = f"{s_line - self.first + 1}.{s_col}" if s_line >= first else f"{first - self.first + 1}.0"
+                end = f"{e_line - self.first + 1}.{e_col}" if e_line < last else f"{last - self.first + 1}.0"
+                args.extend((start, end))
+            if args:
+                self.text.tag_add(tag, *args)
+
+    # --- Window Management ---
+    def load_window(self, target_line):
+        """ Replaces the widget contents with a window centred on target_line. """
+        total = self.index.known_lines()
+        self.first = max(0, min(target_line - WINDOW_LINES // 2, total - WINDOW_LINES))
+        self.last = min(self.first + WINDOW_LINES, total)
+        self.busy = True
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", self.index.read_lines(self.first, self.last))
+        self.apply_tags(self.first, self.last)
+        self.text.config(state=tk.DISABLED)
+        self.text.yview(f"{target_line - self.first + 1}.0")
+        self.busy = False
+        self.update_scrollbar()
+
+    def top_line(self):
+        """ Widget line (1-based) currently at the top of the view. """
+        return int(self.text.index("@0,0").split(".")[0])
+
+    def bottom_line(self):
+        return int(self.text.index(f"@0,{self.text.winfo_height()}").split(".")[0])
+
+    def append_chunk(self):
+        start, end = self.last, min(self.last + CHUNK_LINES, self.index.known_lines())
+        if end <= start:
+            return
+        top = self.top_line()
+        self.text.config(state=tk.NORMAL)
+        self.text.insert("end-1c", self.index.read_lines(start, end))
+        self.last = end
+        self.apply_tags(start, end)
+
+        # Drop lines from the top to keep the window bounded
+        excess = (self.last - self.first) - WINDOW_LINES
+        if excess > 0:
+            self.text.delete("1.0", f"{excess + 1}.0")
+            self.first += excess
+            top -= excess
+        self.text.config(state=tk.DISABLED)
+        self.text.yview(f"{max(top, 1)}.0")
+
+    def prepend_chunk(self):
+        start, end = max(self.first - CHUNK_LINES, 0), self.first
+        if end <= start:
+            return
+        top = self.top_line()
+        self.text.config(state=tk.NORMAL)
+        self.text.insert("1.0", self.index.read_lines(start, end))
+        self.first = start
+        self.apply_tags(start, end)
+        top += end - start
+
+        excess = (self.last - self.first) - WINDOW_LINES
+        if excess > 0:
+            self.text.delete(f"{WINDOW_LINES + 1}.0", "end-1c")
+            self.last -= excess
+        self.text.config(state=tk.DISABLED)
+        self.text.yview(f"{top}.0")
+
+    # --- Scrolling ---
+    def on_text_scroll(self, lo, hi):
+        if self.busy or self.text is None:
+            return
+        self.busy = True
+        try:
+            if (self.last - self.first) - self.bottom_line() < MARGIN_LINES and self.last < self.index.known_lines():
+                self.append_chunk()
+            elif self.top_line() < MARGIN_LINES and self.first > 0:
+                self.prepend_chunk()
+        finally:
+            self.busy = False
+        self.update_scrollbar()
+
+    def on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            target = int(float(args[1]) * self.index.estimated_lines())
+            visible = self.bottom_line() - self.top_line() + 1
+            target = max(0, min(target, self.index.known_lines() - visible))
+            if self.first <= target and target + visible <= self.last:
+                self.text.yview(f"{target - self.first + 1}.0")
+            else:
+                self.load_window(target)
+        else:
+            # ("scroll", n, "units" | "pages"): let Tk scroll, on_text_scroll streams chunks
+            self.text.yview(*args)
+
+    def update_scrollbar(self):
+        """ The scrollbar reflects the position in the whole file, not in the window. """
+        total = self.index.estimated_lines()
+        top = self.first + self.top_line() - 1
+        visible = self.bottom_line() - self.top_line() + 1
+        self.scrollbar.set(top / total, min((top + visible) / total, 1.0))
+
+    def poll_scan(self):
+        """ Keeps the scrollbar honest while the background scan is still counting lines. """
+        if self.text is None:
+            return
+        if self.last - self.first < WINDOW_LINES and self.last < self.index.known_lines():
+            self.append_chunk()
+        self.update_scrollbar()
+        if not self.index.complete:
+            self.text.after(250, self.poll_scan)
@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import tempfile
+import threading
+from record_format import read_record
+from record_index import RECORD_EXTENSIONS
+
+# NOTE: SQLite storage backend for SmartMedicalNotes.
+# Every record is keyed by (patient, created) and every save adds a new version,
+# so nothing is ever overwritten the way the default 'Patient_Log.txt' was.
+# The database runs in WAL mode; writes are buffered and committed in batches.
+#
+#   python record_store.py import [Patient_Records]   -> import existing .txt/.smr files
+#   python record_store.py bench [count]              -> insert / list throughput
+
+STORE_FILE = os.path.join("Patient_Records", "records.db")
+BATCH_SIZE = 500 # Buffered saves are committed once this many are pending
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    patient  TEXT    NOT NULL,
+    created  REAL    NOT NULL,
+    version  INTEGER NOT NULL,
+    saved_at REAL    NOT NULL,
+    body     TEXT    NOT NULL,
+    spans    TEXT    NOT NULL DEFAULT '{}',
+    PRIMARY KEY (patient, created, version)
+);
+-- One row per record pointing at its newest version, so listings never scan old versions
+CREATE TABLE IF NOT EXISTS latest (
+    patient  TEXT    NOT NULL,
+    created  REAL    NOT NULL,
+    version  INTEGER NOT NULL,
+    saved_at REAL    NOT NULL,
+    PRIMARY KEY (patient, created)
+);
+CREATE INDEX IF NOT EXISTS latest_by_saved ON latest (saved_at);
+"""
+
+
+class RecordStore:
+    """ Versioned patient records in a local SQLite database. """
+    def __init__(self, path=STORE_FILE):
+        self.path = path
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL") # Safe with WAL; commits do not fsync the main file
+        self.db.executescript(SCHEMA)
+        self.pending = []
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.db.close()
+
+    # --- Writes ---
+    def save(self, patient, created, text, spans=None, saved_at=None):
+        """ Buffers a new version of the record; committed by flush() or once a batch is full. """
+        with self.lock:
+            self.pending.append((patient, created, saved_at or time.time(), text, json.dumps(spans or {})))
+            full = len(self.pending) >= BATCH_SIZE
+        if full:
+            self.flush()
+
+    def flush(self):
+        """ Writes every buffered save in one transaction. Returns the number written. """
+        with self.lock:
+            batch, self.pending = self.pending, []
+            if not batch:
+                return 0
+            with self.db:
+                # Next version per record is computed inside the same transaction
+                self.db.executemany("""
+                    INSERT INTO records (patient, created, version, saved_at, body, spans)
+                    VALUES (?1, ?2, (SELECT COALESCE(MAX(version), 0) + 1 FROM records
+                                     WHERE patient = ?1 AND created = ?2), ?3, ?4, ?5)
+                """, batch)
+                self.db.executemany("""
+                    INSERT INTO latest (patient, created, version, saved_at) VALUES (?1, ?2, 1, ?3)
+                    ON CONFLICT (patient, created) DO UPDATE SET version = version + 1, saved_at = excluded.saved_at
+                """, [row[:3] for row in batch])
+        return len(batch)
+
+    # --- Reads ---
+    def load(self, patient, created, version=None):
+        """ (text, spans, version) of the given or latest version, or None. """
+        with self.lock:
+            if version is None:
+                row = self.db.execute("""SELECT body, spans, version FROM records WHERE patient = ? AND created = ?
+                                         ORDER BY version DESC LIMIT 1""", (patient, created)).fetchone()
+            else:
+                row = self.db.execute("""SELECT body, spans, version FROM records
+                                         WHERE patient = ? AND created = ? AND version = ?""",
+                                      (patient, created, version)).fetchone()
+        return (row[0], json.loads(row[1]), row[2]) if row else None
+
+    def versions(self, patient, created):
+        """ [(version, saved_at)] of one record, oldest first. """
+        with self.lock:
+            return self.db.execute("SELECT version, saved_at FROM records WHERE patient = ? AND created = ? ORDER BY version",
+                                   (patient, created)).fetchall()
+
+    def list_by_date(self, limit=100, offset=0):
+        """ Latest version of each record, most recently saved first: (patient, created, version, saved_at). """
+        with self.lock:
+            return self.db.execute("""
+                SELECT patient, created, version, saved_at FROM latest ORDER BY saved_at DESC LIMIT ? OFFSET ?
+            """, (limit, offset)).fetchall()
+
+    def list_by_patient(self, patient):
+        """ Records of one patient, newest first: (patient, created, version, saved_at). """
+        with self.lock:
+            return self.db.execute("""
+                SELECT patient, created, version, saved_at FROM latest WHERE patient = ? ORDER BY created DESC
+            """, (patient,)).fetchall()
+
+    def patients(self):
+        with self.lock:
+            return [row[0] for row in self.db.execute("SELECT DISTINCT patient FROM latest ORDER BY patient")]
+
+
+def import_folder(store, folder="Patient_Records"):
+    """ Imports loose .txt/.smr records: patient = file name, created = file mtime. """
+    count = 0
+    with os.scandir(folder) as it:
+        for entry in it:
+            if not (entry.is_file() and entry.name.lower().endswith(RECORD_EXTENSIONS)):
+                continue
+            text, spans = read_record(entry.path)
+            mtime = entry.stat().st_mtime
+            patient = os.path.splitext(entry.name)[0]
+            if store.load(patient, mtime) is None:
+                store.save(patient, mtime, text, spans, saved_at=mtime)
+                count += 1
+    store.flush()
+    return count
+
+
+def benchmark(count=20000):
+    """ Prints batched insert throughput and listing latency on a scratch database. """
+    with tempfile.TemporaryDirectory() as tmp:
+        store = RecordStore(os.path.join(tmp, "bench.db"))
+        text = "Incision site stable 🩺 vitals normal.\n" * 40
+        base = time.time()
+
+        start = time.perf_counter()
+        for i in range(count):
+            store.save(f"patient_{i % 500:03d}", base + i // 500, text, {"bold": [0, 0, 0, 8]})
+        store.flush()
+        elapsed = time.perf_counter() - start
+        print(f"Insert: {count} versions in {elapsed:.2f} s ({count / elapsed:,.0f} /s, batch {BATCH_SIZE})")
+
+        start = time.perf_counter()
+        for i in range(50):
+            store.list_by_date(limit=100, offset=i * 100)
+        print(f"List by date: {(time.perf_counter() - start) / 50 * 1000:.2f} ms per page of 100")
+
+        start = time.perf_counter()
+        for i in range(50):
+            store.list_by_patient(f"patient_{i:03d}")
+        print(f"List by patient: {(time.perf_counter() - start) / 50 * 1000:.2f} ms per patient")
+        store.close()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "import":
+        store = RecordStore()
+        imported = import_folder(store, sys.argv[2] if len(sys.argv) > 2 else "Patient_Records")
+        print(f"Imported {imported} records into {store.path}")
+        store.close()
+    elif command == "bench":
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 20000)
+    else:
+        print("Usage: python record_store.py import [folder] | bench [count]")
@@ -0,0 +1,116 @@
+import os
+import sys
+import json
+import subprocess
+from panda3d.core import loadPrcFileData, AntialiasAttrib
+
+# NOTE: Render quality profiles for the Panda3D simulators.
+# A profile sets the shadow map size of the main spotlight (0 = no shadows), whether the
+# shader generator is used (needed for shadows and per-pixel lighting) and multisample AA.
+# The profile is chosen with '--quality low|medium|high' on the command line, otherwise by
+# 'profile' in render_quality.json (working directory), otherwise DEFAULT_PROFILE.
+#
+#   python render_profiles.py bench [frames] [mesh.ply]  -> offscreen frame time per profile
+
+PROFILES = {
+    # CPU-rendered / integrated GPU stations: fixed-function lighting, no shadows
+    "low":    {"shadow_map": 0,    "shader_auto": False, "antialias": False},
+    "medium": {"shadow_map": 1024, "shader_auto": True,  "antialias": False},
+    "high":   {"shadow_map": 2048, "shader_auto": True,  "antialias": True},
+}
+DEFAULT_PROFILE = "high"
+RENDER_CONFIG_FILE = "render_quality.json"
+MULTISAMPLES = 4
+BENCH_FRAMES = 300
+BENCH_WARMUP = 30
+
+
+def select_profile(argv=None, config_file=RENDER_CONFIG_FILE):
+    """ Name of the profile requested by '--quality', the config file or the default. """
+    argv = sys.argv[1:] if argv is None else argv
+    name = None
+    for i, arg in enumerate(argv):
+        if arg.startswith("--quality="):
+            name = arg.split("=", 1)[1]
+        elif arg == "--quality" and i + 1 < len(argv):
+            name = argv[i + 1]
+    if name is None and os.path.exists(config_file):
+        try:
+            with open(config_file, 'r') as f:
+                name = json.load(f).get("profile")
+        except Exception as e:
+            print(f"WARNING: Could not read {config_file}: {e}")
+    if name is None:
+        return DEFAULT_PROFILE
+    if name not in PROFILES:
+        print(f"WARNING: Unknown quality profile '{name}', using '{DEFAULT_PROFILE}'.")
+        return DEFAULT_PROFILE
+    return name
+
+
+def configure_window(name):
+    """ Framebuffer settings; must run before ShowBase opens the window. """
+    if PROFILES[name]["antialias"]:
+        loadPrcFileData("render_profiles", f"framebuffer-multisample 1\nmultisamples {MULTISAMPLES}")
+
+
+def apply_profile(render, name):
+    """ Shader generator and AA on the scene root. Shadows are set by setup_lighting. """
+    profile = PROFILES[name]
+    if profile["shader_auto"]:
+        render.setShaderAuto()
+    else:
+        render.clearShader()
+    render.setAntialias(AntialiasAttrib.MAuto if profile["antialias"] else AntialiasAttrib.MNone)
+    print(f"Render quality: {name} (shadows {profile['shadow_map'] or 'off'}, "
+          f"shaders {'on' if profile['shader_auto'] else 'off'}, AA {'on' if profile['antialias'] else 'off'})")
+
+
+# --- BENCHMARK ---
+def _bench_one(name, frames, mesh_path=None):
+    """ Runs the liver simulator offscreen with one profile and prints its frame times as JSON. """
+    import time
+    loadPrcFileData("bench", "window-type offscreen\naudio-library-name null\n"
+                             "win-size 1600 900\nsync-video 0")
+    sys.argv = [sys.argv[0], "--quality", name]
+    from liver import BioSimFinal
+    app = BioSimFinal()
+    app.governor.enabled = False # Measure the profile, not the governor
+    if mesh_path:
+        app.load_asset(mesh_path, "liver")
+    for _ in range(BENCH_WARMUP):
+        app.taskMgr.step()
+    times = []
+    for _ in range(frames):
+        start = time.perf_counter()
+        app.taskMgr.step()
+        times.append(time.perf_counter() - start)
+    times.sort()
+    print(json.dumps({"profile": name, "pipe": app.pipe.getType().getName(),
+                      "mean_ms": 1000 * sum(times) / len(times), "p95_ms": 1000 * times[int(0.95 * len(times))]}))
+    app.stop_physics()
+
+
+def benchmark(frames=BENCH_FRAMES, mesh_path=None):
+    """ One subprocess per profile (window settings cannot change inside a running ShowBase). """
+    print(f"Offscreen benchmark: {frames} frames per profile" + (f", mesh {mesh_path}" if mesh_path else ""))
+    for name in PROFILES:
+        cmd = [sys.executable, os.path.abspath(__file__), "bench-one", name, str(frames)] + ([os.path.abspath(mesh_path)] if mesh_path else [])
+        result = subprocess.run(cmd, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        lines = [l for l in result.stdout.splitlines() if l.startswith("{")]
+        if not lines:
+            print(f"{name:>7}: failed\n{result.stderr.strip()[-500:]}")
+            continue
+        r = json.loads(lines[-1])
+        print(f"{name:>7}: {r['mean_ms']:.2f} ms/frame mean, {r['p95_ms']:.2f} ms p95 "
+              f"({1000 / r['mean_ms']:.0f} FPS, {r['pipe']})")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "bench":
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else BENCH_FRAMES, sys.argv[3] if len(sys.argv) > 3 else None)
+    elif command == "bench-one":
+        _bench_one(sys.argv[2], int(sys.argv[3]), sys.argv[4] if len(sys.argv) > 4 else None)
+    else:
+        print("Usage: python render_profiles.py bench [frames] [mesh.ply]")
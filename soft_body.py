@@ -0,0 +1,690 @@
+import copy
+import time
+import atexit
+import weakref
+import threading
+import numpy as np
+from panda3d.core import Geom, GeomPrimitive
+from spatial_hash import SpatialHash
+from implicit_solver import ImplicitSolver, SCIPY_SUPPORT
+from pbd_solver import PBDConstraints
+from visibility import HIDDEN_INTERVAL
+
+# NOTE: Shared soft-body physics for the organ simulators (liver.py / nose.py).
+# All per-vertex state lives in flat NumPy arrays and every step is a handful of
+# vectorized operations, which release the GIL while they run. PhysicsWorker steps
+# the body on its own thread at a fixed rate and double-buffers the result, so the
+# render task only publishes the latest tool contacts and copies in the newest
+# finished vertex buffer; it never waits for a physics step.
+
+PHYSICS_HZ = 120.0      # Fixed physics rate of the worker thread
+MAX_CATCHUP_STEPS = 4   # After a stall, at most this many steps are run to catch up; the rest are dropped
+GRID_MIN_VERTICES = 2000 # Meshes below this size skip the spatial hash for contacts
+
+
+def steps_subsets(solver):
+    """ True if the solver steps part of the body under visibility culling (PBD only, see stepped_subset). """
+    return solver == "pbd"
+
+
+COLUMN_DTYPES = {Geom.NT_float32: np.float32, Geom.NT_uint8: np.uint8}
+
+
+def column_views(vdata, names, modify=False):
+    """
+    NumPy (rows, components) views straight over columns of a GeomVertexData, one per name.
+    Columns in the same array share one handle, so modify=True marks each array for re-upload
+    to the GPU once however many of its columns are written.
+    A view is None if its column is missing or not stored as float32 / uint8.
+    """
+    fmt = vdata.getFormat()
+    handles = {}
+    views = []
+    for name in names:
+        column = fmt.getColumn(name)
+        if column is None or column.getNumericType() not in COLUMN_DTYPES:
+            views.append(None)
+            continue
+        array_index = fmt.getArrayWith(name)
+        if array_index not in handles:
+            handle = vdata.modifyArray(array_index) if modify else vdata.getArray(array_index)
+            handles[array_index] = memoryview(handle).cast('B')
+        dtype = np.dtype(COLUMN_DTYPES[column.getNumericType()])
+        views.append(np.ndarray((vdata.getNumRows(), column.getNumComponents()), dtype=dtype,
+                                buffer=handles[array_index], offset=column.getStart(),
+                                strides=(fmt.getArray(array_index).getStride(), dtype.itemsize)))
+    return views
+
+
+def column_view(vdata, name, modify=False):
+    """
+    NumPy (rows, components) float32 view straight over one column of a GeomVertexData.
+    modify=True goes through modifyArray(), which marks the data for re-upload to the GPU.
+    Returns None if the column is missing or not stored as float32.
+    """
+    view = column_views(vdata, [name], modify)[0]
+    return view if view is not None and view.dtype == np.float32 else None
+
+
+INDEX_DTYPES = {Geom.NT_uint8: np.uint8, Geom.NT_uint16: np.uint16, Geom.NT_uint32: np.uint32}
+WELD_DECIMALS = 5 # Vertices closer than this (in model units) count as one point
+
+
+def read_triangles(geom):
+    """ (M, 3) int32 vertex indices of every triangle in the Geom (strips/fans are decomposed). """
+    parts = []
+    for i in range(geom.getNumPrimitives()):
+        prim = geom.getPrimitive(i)
+        if prim.getPrimitiveType() != GeomPrimitive.PT_polygons:
+            continue
+        prim = prim.decompose()
+        if not prim.isIndexed():
+            prim = prim.makeCopy()
+            prim.makeIndexed()
+        raw = memoryview(prim.getVertices()).cast('B')
+        parts.append(np.frombuffer(raw, dtype=INDEX_DTYPES[prim.getIndexType()]).astype(np.int32))
+    if not parts:
+        return np.empty((0, 3), dtype=np.int32)
+    return np.concatenate(parts).reshape(-1, 3)
+
+
+def mesh_edges(triangles, positions):
+    """
+    Unique undirected edges (E, 2) of the triangles, plus links between vertices that share a
+    position (UV/normal seams), so springs and constraints hold the surface together across seams.
+    """
+    pairs = np.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]])
+    _, first, weld = np.unique(np.round(positions, WELD_DECIMALS), axis=0, return_index=True, return_inverse=True)
+    canonical = first[weld.reshape(-1)]
+    seams = np.flatnonzero(canonical != np.arange(len(positions)))
+    pairs = np.concatenate([pairs, np.stack([seams, canonical[seams]], axis=1)]).astype(np.int32)
+    pairs.sort(axis=1)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    return np.unique(pairs, axis=0)
+
+
+class MeshData:
+    """ Rest pose of a mesh read from its first Geom: positions, normals, triangles and edges. """
+    def __init__(self, geom_node):
+        geom = geom_node.getGeom(0)
+        vdata = geom.getVertexData()
+        positions = column_view(vdata, 'vertex')
+        if positions is None:
+            raise ValueError("Vertex column must be 3 x float32.")
+        self.rest_positions = np.array(positions, dtype=np.float32)
+
+        normals = column_view(vdata, 'normal')
+        if normals is not None:
+            self.rest_normals = np.array(normals, dtype=np.float32)
+        else:
+            # No normals in the file: default to Z-up
+            self.rest_normals = np.tile(np.float32([0, 0, 1]), (len(self.rest_positions), 1))
+
+        self.triangles = read_triangles(geom)
+        self.edges = mesh_edges(self.triangles, self.rest_positions)
+
+    @classmethod
+    def from_arrays(cls, rest_positions, rest_normals, triangles, edges):
+        """ Rest pose precomputed offline (see organ_bundle.py). """
+        mesh = cls.__new__(cls)
+        mesh.rest_positions = np.asarray(rest_positions, dtype=np.float32)
+        mesh.rest_normals = np.asarray(rest_normals, dtype=np.float32)
+        mesh.triangles = np.asarray(triangles, dtype=np.int32)
+        mesh.edges = np.asarray(edges, dtype=np.int32)
+        return mesh
+
+    def instance(self):
+        """ New MeshData over the same arrays; topology edits rebind its arrays instead of writing into them. """
+        return MeshData.from_arrays(self.rest_positions, self.rest_normals, self.triangles, self.edges)
+
+    @property
+    def num_vertices(self):
+        return len(self.rest_positions)
+
+
+KERNELS = {"cubic": 0, "gaussian": 1}
+MODES = {"repel": 0, "press": 1, "inward": 2}
+
+
+class Contact:
+    """
+    One tool touching the mesh, in the mesh's local space.
+    kernel: "cubic"    -> (1 - d/r)^3 falloff
+            "gaussian" -> exp(-d^2 / 2 sigma^2), sigma = r/3
+    mode:   "repel"    -> push away from the contact point (volumetric squeeze)
+            "press"    -> push along -normal of the contact surface (mouse pick)
+            "inward"   -> push along each vertex's own -rest normal
+    """
+    def __init__(self, point, radius, force, kernel="cubic", mode="repel", normal=None):
+        self.point = np.asarray(point, dtype=np.float32)
+        self.radius = float(radius)
+        self.force = float(force)
+        self.kernel = kernel
+        self.mode = mode
+        self.normal = None if normal is None else np.asarray(normal, dtype=np.float32)
+
+
+class SphereContact:
+    """
+    A solid sphere (the VR hand) in the mesh's local space. Instead of applying a force,
+    vertices inside it are pushed out to its surface. The body remembers where the sphere
+    with the same key was at its last step, so vertices it passed through in between are
+    caught as well.
+    """
+    def __init__(self, center, radius, key=0):
+        self.center = np.asarray(center, dtype=np.float32)
+        self.radius = float(radius)
+        self.key = key
+
+
+def resolve_sphere_contacts(positions, velocities, rest, spheres, history, grid=None, bounds=None):
+    """
+    Pushes penetrating vertices out of every sphere (in place). Candidates come from the rest-pose
+    grid around the swept capsule, each grid cell widened by its own displacement bound (bounds,
+    see SpatialHash.displacement_bounds), so the work per step is bounded by the swept volume.
+    The bounds of the vertices pushed here are raised. history maps sphere key -> center at the
+    previous step. Returns True if any vertex was hit.
+    """
+    touched = False
+    for sphere in spheres:
+        b, r = sphere.center, sphere.radius
+        a = history.get(sphere.key, b)
+        history[sphere.key] = b
+        if grid is not None:
+            idx = grid.query_capsule_displaced(a, b, r, bounds)
+        else:
+            idx = np.arange(len(positions))
+        if len(idx) == 0:
+            continue
+        p = positions[idx]
+
+        # Closest point of every candidate on the sweep a -> b
+        ab = b - a
+        length2 = float(ab @ ab)
+        t = np.clip((p - a) @ ab / length2, 0.0, 1.0) if length2 > 1e-12 else np.zeros(len(p), dtype=np.float32)
+        lateral = p - (a + t[:, None] * ab)
+        swept = np.einsum('ij,ij->i', lateral, lateral) < r * r
+
+        # 1. Inside the sphere at its new position: project radially onto the surface
+        off = p - b
+        dist = np.sqrt(np.einsum('ij,ij->i', off, off))
+        inside = dist < r
+        safe = np.where(dist > 1e-6, dist, 1.0)
+        resolved = np.where(inside[:, None], b + off * (r / safe)[:, None], p)
+
+        # 2. Passed through during the sweep (tunnelled): carry to the front of the sphere,
+        #    keeping the sideways offset from the sweep axis
+        tunnelled = swept & ~inside & (t > 0.0) & (t < 1.0)
+        if tunnelled.any() and length2 > 1e-12:
+            direction = ab / np.sqrt(length2)
+            lat = lateral[tunnelled]
+            ahead = np.sqrt(np.maximum(r * r - np.einsum('ij,ij->i', lat, lat), 0.0))
+            resolved[tunnelled] = b + lat + ahead[:, None] * direction
+
+        moved = inside | tunnelled
+        if moved.any():
+            touched = True
+            hit = idx[moved]
+            positions[hit] = resolved[moved]
+            velocities[hit] = 0.0 # Inelastic contact: the hand holds the tissue where it pushed it
+            if grid is not None:
+                grid.raise_bounds(bounds, hit, positions, rest)
+
+    # Forget spheres that were not published this step, so a hand that comes back does not sweep
+    for key in set(history) - {sphere.key for sphere in spheres}:
+        del history[key]
+    return touched
+
+
+def contact_forces(rest, rest_normals, contacts, out, grid=None):
+    """
+    Accumulates the external force of all contacts into out in one batched pass.
+    With a SpatialHash only the vertices near each contact are visited, so the cost
+    follows the total contact area rather than contacts x vertices.
+    Returns True if any vertex is touched.
+    """
+    out.fill(0.0)
+    if not contacts:
+        return False
+
+    centers = np.array([c.point for c in contacts], dtype=np.float32)
+    radii = np.array([c.radius for c in contacts], dtype=np.float32)
+    forces = np.array([c.force for c in contacts], dtype=np.float32)
+    kernels = np.array([KERNELS[c.kernel] for c in contacts])
+    modes = np.array([MODES[c.mode] for c in contacts])
+    normals = np.array([c.normal if c.normal is not None else (0, 0, 0) for c in contacts], dtype=np.float32)
+
+    # Candidate (vertex, contact) pairs
+    if grid is not None:
+        idx, owner = grid.query_spheres(centers, radii)
+    else:
+        idx = np.tile(np.arange(len(rest), dtype=np.int32), len(contacts))
+        owner = np.repeat(np.arange(len(contacts), dtype=np.int32), len(rest))
+
+    offset = rest[idx] - centers[owner]
+    dist = np.sqrt(np.einsum('ij,ij->i', offset, offset))
+    inside = dist < radii[owner]
+    if not inside.any():
+        return False
+    idx, owner, offset, dist = idx[inside], owner[inside], offset[inside], dist[inside]
+
+    # Falloff: cubic (1 - d/r)^3, gaussian with sigma = r/3 -> exp(-4.5 (d/r)^2)
+    t = dist / radii[owner]
+    influence = np.where(kernels[owner] == KERNELS["gaussian"], np.exp(-4.5 * t * t), (1.0 - t) ** 3)
+    influence *= forces[owner]
+
+    # Direction per pair, chosen by the mode of its contact
+    mode = modes[owner][:, None]
+    safe = np.where(dist > 1e-6, dist, 1.0)
+    direction = offset / safe[:, None]
+    direction = np.where(mode == MODES["press"], -normals[owner], direction)
+    direction = np.where(mode == MODES["inward"], -rest_normals[idx], direction)
+
+    # Pairs are grouped by contact and each vertex appears once per contact,
+    # so a plain indexed add per group is exact and only touches the hit vertices
+    contribution = direction * influence[:, None]
+    bounds = np.flatnonzero(np.diff(owner)) + 1
+    for part_idx, part in zip(np.split(idx, bounds), np.split(contribution, bounds)):
+        out[part_idx] += part
+    return True
+
+
+class SoftBody:
+    """
+    Mass-spring-damper per vertex, pulled back to its rest position.
+    solver "explicit": explicit Euler, vertices independent (edge_k unused).
+    solver "implicit": prefactored backward Euler with extra springs along the mesh edges.
+    solver "pbd":      explicit forces, then PBD projection of the edge (and volume) constraints.
+    """
+    def __init__(self, mesh, constraints=None, grid=None):
+        self.mesh = mesh
+        self.rest = mesh.rest_positions
+        self.rest_normals = mesh.rest_normals
+        self.positions = self.rest.copy()
+        self.velocities = np.zeros_like(self.rest)
+        self.mass = 1.0
+        self.spring_k = 40.0
+        self.damping = 10.0
+        self.edge_k = 0.0
+        self.solver = "explicit"
+        self.implicit = None # ImplicitSolver, built on first use
+        self.constraints = constraints # PBDConstraints
+        self.pbd_iterations = 4
+        self.pbd_stiffness = 1.0
+        self.preserve_volume = False
+        self.sphere_history = {} # SphereContact key -> center at the last step (swept tests)
+        # Contacts are evaluated at rest positions, so one grid over the rest pose serves every step.
+        # Small meshes are cheaper to scan directly.
+        if grid is None and len(self.rest) >= GRID_MIN_VERTICES:
+            grid = SpatialHash(self.rest)
+        self.grid = grid
+        # Largest displacement per grid cell (solid tool queries); only kept up to date while spheres touch
+        self.cell_bounds = np.zeros(len(grid.keys), dtype=np.float32) if grid is not None else None
+        self.bounds_valid = True
+        self.shared_topology = False # Grid and constraints belong to a RestPose (organ_library.py)
+        # Visibility (visibility.py): hidden clusters out of contact are stepped every HIDDEN_INTERVAL steps
+        self.clusters = None         # VertexClusters of the rest pose
+        self.visible_clusters = None # Mask published by the render thread (None = all visible)
+        self.step_count = 0
+        self.cluster_behind = None   # Seconds each cluster has not been stepped for
+        self.active_fraction = 1.0   # Share of vertices stepped every step
+        self._subsets = {}           # Stepped cluster mask -> (vertices, PBD sub-problem)
+        # Scratch buffers reused every step (no per-frame allocation)
+        self._force = np.zeros_like(self.rest)
+        self._tmp = np.zeros_like(self.rest)
+
+    def reset(self):
+        self.positions[:] = self.rest
+        self.velocities.fill(0.0)
+        self.sphere_history.clear()
+        if self.cell_bounds is not None:
+            self.cell_bounds.fill(0.0)
+            self.bounds_valid = True
+
+    def set_state(self, positions, velocities):
+        """ Replaces positions and velocities (e.g. undo to a checkpoint). """
+        self.positions[:] = positions
+        self.velocities[:] = velocities
+        self.sphere_history.clear()
+        self.bounds_valid = False
+
+    # --- Topology edits (cutting) ---
+    def fork_topology(self):
+        """ Private copies of a shared grid and constraints, before this body edits them. """
+        if self.shared_topology:
+            self.grid = copy.copy(self.grid) # insert() only rebinds its arrays
+            self.constraints = self.constraints.fork() if self.constraints is not None else None
+            self.shared_topology = False
+
+    def append_vertices(self, rest, normals, positions):
+        """ Adds vertices (e.g. created by a cut) to every per-vertex array. Returns the first new index. """
+        self.fork_topology()
+        first = len(self.rest)
+        self.rest = self.mesh.rest_positions = np.concatenate([self.rest, rest]).astype(np.float32)
+        self.rest_normals = self.mesh.rest_normals = np.concatenate([self.rest_normals, normals]).astype(np.float32)
+        self.positions = np.concatenate([self.positions, positions]).astype(np.float32)
+        self.velocities = np.concatenate([self.velocities, np.zeros_like(rest, dtype=np.float32)])
+        self._force = np.zeros_like(self.rest)
+        self._tmp = np.zeros_like(self.rest)
+        if self.grid is not None:
+            self.grid.insert(np.arange(first, len(self.rest)), rest)
+        if self.constraints is not None:
+            self.constraints.add_vertices(len(rest))
+        return first
+
+    def update_topology(self, triangles, removed_edges, added_edges):
+        """ New triangle list plus the edges a topology edit removed (u < v pairs) and added. """
+        self.fork_topology()
+        self.mesh.triangles = triangles
+        if self.constraints is not None:
+            self.constraints.remove_edges(removed_edges)
+            self.constraints.add_edges(added_edges, self.rest)
+            self.constraints.rest_volume = 0.0 # A cut opens the surface; its volume is no longer defined
+            self.mesh.edges = self.constraints.active_edges()
+        else:
+            self.mesh.edges = mesh_edges(triangles, self.rest)
+        self.implicit = None # Refactored on the next implicit step
+        self._subsets = {}
+
+    def step(self, dt, contacts):
+        """ Advances one timestep. Returns True if any contact touches the mesh. """
+        spheres = [c for c in contacts if isinstance(c, SphereContact)]
+        forces = [c for c in contacts if isinstance(c, Contact)]
+        touched = contact_forces(self.rest, self.rest_normals, forces, self._force, self.grid)
+        subset = self.stepped_subset(dt, forces, spheres)
+        if subset is None:
+            self.integrate(dt)
+        else:
+            self.integrate_subset(subset)
+        self.step_count += 1
+        # Solid tools are resolved on the integrated positions
+        if spheres and self.grid is not None:
+            self.update_cell_bounds(None if subset is None else subset[0])
+        else:
+            self.bounds_valid = False # Vertices moved untracked; recomputed when a sphere comes back
+        if resolve_sphere_contacts(self.positions, self.velocities, self.rest, spheres, self.sphere_history,
+                                   self.grid, self.cell_bounds):
+            touched = True
+        return touched
+
+    def update_cell_bounds(self, stepped):
+        """
+        Displacement bounds after a step: recomputed after a full step (which already touched
+        every vertex), only raised for the vertices a subset step moved.
+        """
+        if stepped is None or not self.bounds_valid:
+            self.grid.displacement_bounds(self.positions, self.rest, self.cell_bounds, self._tmp)
+            self.bounds_valid = True
+        else:
+            self.grid.raise_bounds(self.cell_bounds, stepped, self.positions, self.rest)
+
+    def stepped_subset(self, dt, forces, spheres):
+        """
+        (vertices, per-vertex dt, PBD sub-problem) to step now, or None to step the whole body.
+        Visible clusters and clusters a contact reaches are stepped every step; hidden ones take
+        turns, each stepped every HIDDEN_INTERVAL steps over the time it fell behind.
+        Only used with the PBD solver: explicit steps are cheaper over the whole arrays than gathered.
+        """
+        visible, clusters = self.visible_clusters, self.clusters
+        if (visible is None or clusters is None or clusters.num_vertices != len(self.positions)
+                or not steps_subsets(self.solver) or self.constraints is None):
+            self.active_fraction = 1.0
+            self.cluster_behind = None
+            return None
+        centers = [c.point for c in forces] + [c.center for c in spheres]
+        radii = [c.radius for c in forces] + [c.radius for c in spheres]
+        if spheres: # Spheres sweep: cover the previous center as well
+            centers += [self.sphere_history.get(c.key, c.center) for c in spheres]
+            radii += [c.radius for c in spheres]
+        active = visible | clusters.touched(centers, radii)
+        self.active_fraction = clusters.sizes[active].sum() / max(len(self.positions), 1)
+        if self.cluster_behind is None:
+            self.cluster_behind = np.zeros(clusters.count, dtype=np.float32)
+        self.cluster_behind += dt
+        if active.all() and not self.cluster_behind.max() > dt * 1.001:
+            self.cluster_behind[:] = 0.0
+            return None
+
+        turn = np.arange(clusters.count) % HIDDEN_INTERVAL == self.step_count % HIDDEN_INTERVAL
+        stepped = active | turn
+        key = stepped.tobytes()
+        subset = self._subsets.get(key)
+        if subset is None:
+            if len(self._subsets) >= 4 * HIDDEN_INTERVAL: # Camera moved on: drop old masks
+                self._subsets.clear()
+            subset = self._subsets[key] = self._build_subset(np.flatnonzero(stepped[clusters.vertex_cluster]))
+        behind = self.cluster_behind[stepped]
+        if behind.max() - behind.min() < 1e-6:
+            step_dt = float(behind[0])
+        else:
+            step_dt = self.cluster_behind[clusters.vertex_cluster[subset[0]]][:, None]
+        self.cluster_behind[stepped] = 0.0
+        return subset[0], step_dt, subset[1:]
+
+    def _build_subset(self, idx):
+        """
+        Edge constraints of the vertices idx only: every edge with a stepped end, over those
+        vertices and their pinned neighbours. Cached per set of stepped clusters.
+        """
+        edges = self.constraints.active_edges()
+        mask = np.zeros(len(self.positions), dtype=bool)
+        mask[idx] = True
+        edges = edges[mask[edges[:, 0]] | mask[edges[:, 1]]]
+        vertices = np.union1d(idx, edges.ravel())
+        local = np.searchsorted(vertices, edges).astype(np.int32)
+        sub = MeshData.from_arrays(self.rest[vertices], self.rest_normals[vertices], np.empty((0, 3), dtype=np.int32), local)
+        return idx, vertices, np.searchsorted(vertices, idx), PBDConstraints(sub)
+
+    def integrate_subset(self, subset):
+        """ PBD step of the vertices of a stepped_subset(); the others keep their state and act as pinned. """
+        idx, dt, (vertices, rows, constraints) = subset
+        p = self.positions[idx]
+        v = self.velocities[idx]
+        f = self._force[idx] - self.spring_k * (p - self.rest[idx]) - self.damping * v
+        v += f * (dt / self.mass)
+        q = self.positions[vertices]
+        q[rows] = p + v * dt
+        # Volume is a global constraint: left out while part of the body is not stepped
+        constraints.project(q, self.pbd_iterations, self.pbd_stiffness)
+        predicted = q[rows]
+        self.velocities[idx] = (predicted - p) / dt
+        self.positions[idx] = predicted
+
+    def integrate(self, dt):
+        """ One step of the selected solver with the external forces already in self._force. """
+        if self.solver == "implicit" and SCIPY_SUPPORT:
+            if self.implicit is None:
+                self.implicit = ImplicitSolver(self.mesh)
+            self.implicit.step(self, dt, self._force)
+            return
+
+        # accel = (ext - k * (x - rest) - c * v) / m
+        np.subtract(self.positions, self.rest, out=self._tmp)
+        self._tmp *= -self.spring_k
+        self._force += self._tmp
+        np.multiply(self.velocities, -self.damping, out=self._tmp)
+        self._force += self._tmp
+        self._force *= dt / self.mass
+
+        self.velocities += self._force
+        np.multiply(self.velocities, dt, out=self._tmp)
+
+        if self.solver == "pbd" and self.constraints is not None:
+            # Predict, project constraints, then derive velocities from the corrected positions
+            self._tmp += self.positions
+            self.constraints.project(self._tmp, self.pbd_iterations, self.pbd_stiffness, self.preserve_volume)
+            np.subtract(self._tmp, self.positions, out=self.velocities)
+            self.velocities /= dt
+            self.positions[:] = self._tmp
+            return
+
+        self.positions += self._tmp
+
+
+_live_workers = weakref.WeakSet()
+
+
+@atexit.register
+def _stop_workers():
+    # Stop stepping before the interpreter tears down NumPy/SciPy under a running thread
+    for worker in list(_live_workers):
+        worker.stop()
+
+
+class PhysicsWorker:
+    """
+    Steps a SoftBody on a background thread at PHYSICS_HZ.
+    The render thread calls publish() with the latest contacts and upload() to copy the
+    newest completed positions into the GeomVertexData; both return immediately.
+    """
+    def __init__(self, body, rate=PHYSICS_HZ, cutter=None):
+        self.body = body
+        self.period = 1.0 / rate
+        self.contacts = []
+        self.params = {}
+        # Topology edits: requests run on the worker before a step, the resulting
+        # patches are applied to the Geom by upload() together with that step's positions
+        self.cutter = cutter # MeshCutter
+        self.cut_requests = []
+        self.cut_patches = []
+        self.commands = [] # Callables run on the worker thread between two steps (checkpoints, undo)
+        self.heat_map = None # HeatMap coloring the vertices after every step (heat_map.py)
+        self.front_colors = None # May lag the positions by a few steps (computed once per uploaded frame)
+        self.back_colors = None
+        self.restore_colors = None # Base colors written back once the heat map is turned off
+
+        # Double buffer: the worker fills 'back', then swaps it with 'front' under the lock
+        self.front = body.positions.copy()
+        self.back = body.positions.copy()
+        self.frame_id = 0
+        self.uploaded_id = -1
+        self.touched = False
+        self.lock = threading.Lock()
+
+        # Stats
+        self.steps = 0
+        self.late_steps = 0     # Steps that took longer than one period
+        self.dropped_steps = 0  # Steps skipped after a stall
+        self.stale_frames = 0   # Render frames that found no new physics result
+        self.step_time = 0.0
+
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="SoftBodyPhysics", daemon=True)
+        self.thread.start()
+        _live_workers.add(self)
+
+    def publish(self, contacts, **params):
+        """ Latest tool contacts and material parameters (spring_k, damping, ...) for the next step. """
+        with self.lock:
+            self.contacts = contacts
+            self.params.update(params)
+
+    def set_rate(self, rate):
+        """ Changes the fixed step rate (e.g. lowered by the quality governor). """
+        self.period = 1.0 / rate
+
+    def call_between_steps(self, fn):
+        """ Runs fn(body) on the worker thread before the next step, when the body is not being stepped. """
+        with self.lock:
+            self.commands.append(fn)
+
+    def set_heat_map(self, heat_map):
+        """ Colors the vertices with heat_map from the next step on (None = back to the mesh's own colors). """
+        with self.lock:
+            if heat_map is None and self.heat_map is not None:
+                self.restore_colors = self.heat_map.base_colors
+            self.heat_map = heat_map
+            self.front_colors = None
+
+    def request_cut(self, request):
+        """ Queues a CutRequest for the next physics step. """
+        if self.cutter is None:
+            return
+        with self.lock:
+            self.cut_requests.append(request)
+
+    def upload(self, vdata):
+        """
+        Copies the newest finished buffer into the vertex column (and the heat map colors into
+        the color column, through the same array handle). Returns True if it changed.
+        """
+        with self.lock:
+            if self.frame_id == self.uploaded_id:
+                self.stale_frames += 1
+                return False
+            for patch in self.cut_patches:
+                self.cutter.apply(patch, vdata)
+                if self.heat_map:
+                    self.heat_map.extend(patch.sources)
+            self.cut_patches = []
+            view, colors = column_views(vdata, ['vertex', 'color'], modify=True)
+            view[:] = self.front
+            if colors is not None:
+                if self.front_colors is not None and len(self.front_colors) == len(colors):
+                    colors[:] = self.front_colors
+                elif self.restore_colors is not None:
+                    restore = self.restore_colors[:len(colors)]
+                    colors[:len(restore)] = restore
+                    self.restore_colors = None
+            self.uploaded_id = self.frame_id
+        return True
+
+    def reset(self):
+        """ Snaps the body back to its rest pose (on the worker thread, before the next step). """
+        self.call_between_steps(lambda body: body.reset())
+
+    def stop(self):
+        self.running = False
+        self.thread.join(timeout=1.0)
+
+    def stats(self):
+        return {"steps": self.steps, "late": self.late_steps, "dropped": self.dropped_steps,
+                "stale": self.stale_frames, "step_ms": self.step_time * 1000}
+
+    def _run(self):
+        next_time = time.perf_counter()
+        while self.running:
+            now = time.perf_counter()
+            if now < next_time:
+                time.sleep(next_time - now)
+                continue
+
+            behind = int((now - next_time) / self.period)
+            if behind > MAX_CATCHUP_STEPS:
+                self.dropped_steps += behind - MAX_CATCHUP_STEPS
+                next_time = now
+
+            with self.lock:
+                contacts = self.contacts
+                for name, value in self.params.items():
+                    setattr(self.body, name, value)
+                requests, self.cut_requests = self.cut_requests, []
+                commands, self.commands = self.commands, []
+                # Colors only for a frame the render thread will show: once it took the last one
+                heat_map = self.heat_map if self.uploaded_id == self.frame_id else None
+
+            for fn in commands:
+                fn(self.body)
+            start = time.perf_counter()
+            patches = [patch for patch in (self.cutter.cut(self.body, r) for r in requests) if patch]
+            touched = self.body.step(self.period, contacts)
+            if len(self.back) != len(self.body.positions):
+                self.back = np.empty_like(self.body.positions)
+            np.copyto(self.back, self.body.positions)
+            if heat_map:
+                if self.back_colors is None or len(self.back_colors) != len(self.back):
+                    self.back_colors = np.empty((len(self.back), 4), dtype=np.uint8)
+                heat_map.compute(self.body, self.back_colors)
+            self.step_time = time.perf_counter() - start
+            if self.step_time > self.period:
+                self.late_steps += 1
+
+            with self.lock:
+                self.front, self.back = self.back, self.front
+                if heat_map and heat_map is self.heat_map:
+                    self.front_colors, self.back_colors = self.back_colors, self.front_colors
+                self.frame_id += 1
+                self.touched = touched
+                self.cut_patches.extend(patches)
+            self.steps += 1
+            next_time += self.period
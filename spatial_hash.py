@@ -0,0 +1,193 @@
+import numpy as np
+
+# NOTE: Uniform grid over a fixed point set (the rest pose of a mesh).
+# Points are sorted by cell key once; a cell is then a contiguous slice of that order,
+# found with a binary search. Sphere and capsule queries only touch the cells they
+# overlap, so their cost follows the queried volume, not the vertex count.
+# Points that move away from where the grid put them (a deforming body) are found through
+# per-cell displacement bounds kept by their owner: every cell is widened by its own bound,
+# so a deep dent only widens the queries near it.
+
+CELLS_PER_AXIS = 16 # Default resolution across the largest mesh dimension
+DISPLACED_SLACK = 0.25 # Displacement (in cells) every capsule query is widened by
+
+
+def _cell_keys(cells):
+    """ Packs integer (x, y, z) cell coordinates into one int64 key (21 bits per axis). """
+    cells = cells.astype(np.int64) + (1 << 20)
+    return (cells[..., 0] << 42) | (cells[..., 1] << 21) | cells[..., 2]
+
+
+def _cell_coords(keys):
+    """ Inverse of _cell_keys: (K, 3) integer cell coordinates. """
+    mask = (1 << 21) - 1
+    return np.stack([(keys >> 42) & mask, (keys >> 21) & mask, keys & mask], axis=-1) - (1 << 20)
+
+
+def segment_distance(points, a, b):
+    """ Distance of every point to the segment a-b. """
+    ab = b - a
+    length2 = float(ab @ ab)
+    t = np.clip((points - a) @ ab / length2, 0.0, 1.0) if length2 > 1e-12 else np.zeros(len(points))
+    offset = points - (a + t[:, None] * ab)
+    return np.sqrt(np.einsum('ij,ij->i', offset, offset))
+
+
+class SpatialHash:
+    def __init__(self, points, cell_size=None):
+        self.points = points
+        if cell_size is None:
+            extent = float((points.max(axis=0) - points.min(axis=0)).max()) if len(points) else 1.0
+            cell_size = max(extent / CELLS_PER_AXIS, 1e-6)
+        self.cell_size = cell_size
+
+        cells = np.floor(points / cell_size)
+        # Occupied cell range; queries are clipped to it so a huge radius cannot enumerate empty space
+        self.min_cell = cells.min(axis=0).astype(np.int64) if len(points) else np.zeros(3, np.int64)
+        self.max_cell = cells.max(axis=0).astype(np.int64) if len(points) else np.zeros(3, np.int64)
+        keys = _cell_keys(cells)
+        self.order = np.argsort(keys, kind="stable").astype(np.int32)
+        sorted_keys = keys[self.order]
+        self.keys, self.starts = np.unique(sorted_keys, return_index=True)
+        self.ends = np.append(self.starts[1:], len(points)).astype(np.int64)
+        # Points inserted after the build (e.g. vertices created by a cut), checked by key
+        self.extra_indices = np.empty(0, dtype=np.int32)
+        self.extra_keys = np.empty(0, dtype=np.int64)
+        self.cell_of = None # Cell slot of every built point, made on first use (point_cells)
+
+    # Arrays that fully describe a built grid (stored by organ_bundle.py)
+    SAVED = ("order", "keys", "starts", "ends", "min_cell", "max_cell")
+
+    def arrays(self):
+        return dict({name: getattr(self, name) for name in self.SAVED}, cell_size=np.float64(self.cell_size))
+
+    @classmethod
+    def from_arrays(cls, points, arrays):
+        """ Grid over 'points' restored from arrays() without sorting again. """
+        grid = cls.__new__(cls)
+        grid.points = points
+        grid.cell_size = float(arrays["cell_size"])
+        for name in cls.SAVED:
+            setattr(grid, name, np.asarray(arrays[name]))
+        grid.extra_indices = np.empty(0, dtype=np.int32)
+        grid.extra_keys = np.empty(0, dtype=np.int64)
+        grid.cell_of = None
+        return grid
+
+    def insert(self, indices, points):
+        """ Adds points without rebuilding the sorted arrays. """
+        cells = np.floor(points / self.cell_size)
+        self.min_cell = np.minimum(self.min_cell, cells.min(axis=0).astype(np.int64))
+        self.max_cell = np.maximum(self.max_cell, cells.max(axis=0).astype(np.int64))
+        self.extra_indices = np.concatenate([self.extra_indices, np.asarray(indices, dtype=np.int32)])
+        self.extra_keys = np.concatenate([self.extra_keys, _cell_keys(cells)])
+
+    def _cells_of_box(self, lo, hi):
+        lo = np.maximum(np.floor(lo / self.cell_size).astype(np.int64), self.min_cell)
+        hi = np.minimum(np.floor(hi / self.cell_size).astype(np.int64), self.max_cell)
+        axes = [np.arange(lo[i], hi[i] + 1) for i in range(3)]
+        return np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3)
+
+    def query_sphere(self, center, radius):
+        """ Indices of the points in every cell the sphere overlaps (a superset of the hits). """
+        center = np.asarray(center, dtype=np.float64)
+        return self.query_box(center - radius, center + radius)
+
+    def query_capsule(self, a, b, radius):
+        """
+        Points near the segment a-b swept by a sphere of the given radius.
+        Long segments are covered by a chain of small boxes instead of one big bounding box,
+        so the visited cells stay proportional to the swept volume.
+        """
+        a = np.asarray(a, dtype=np.float64)
+        b = np.asarray(b, dtype=np.float64)
+        pieces = max(1, int(np.ceil(np.linalg.norm(b - a) / max(radius, self.cell_size))))
+        if pieces == 1:
+            return self.query_box(np.minimum(a, b) - radius, np.maximum(a, b) + radius)
+        ends = a + (b - a) * np.linspace(0.0, 1.0, pieces + 1)[:, None]
+        parts = [self.query_box(np.minimum(p, q) - radius, np.maximum(p, q) + radius)
+                 for p, q in zip(ends[:-1], ends[1:])]
+        return np.unique(np.concatenate(parts))
+
+    # --- Deformed points ---
+    def point_cells(self):
+        """ Cell slot (index into keys) of every point the grid was built over. """
+        if self.cell_of is None:
+            cell_of = np.empty(len(self.order), dtype=np.int32)
+            cell_of[self.order] = np.repeat(np.arange(len(self.keys), dtype=np.int32), self.ends - self.starts)
+            self.cell_of = cell_of
+        return self.cell_of
+
+    def displacement_bounds(self, positions, rest, out, scratch):
+        """ Fills out (one per cell) with the largest distance of its points from their rest position. """
+        n = len(self.order)
+        if n == 0:
+            return
+        offset = np.subtract(positions[:n], rest[:n], out=scratch[:n])
+        distance2 = np.einsum('ij,ij->i', offset, offset)
+        out[:] = np.sqrt(np.maximum.reduceat(distance2[self.order], self.starts))
+
+    def raise_bounds(self, bounds, indices, positions, rest):
+        """ Widens the bounds of the cells of the given points to cover their current displacement. """
+        indices = indices[indices < len(self.order)] # Inserted points are always query candidates
+        if len(indices) == 0:
+            return
+        offset = positions[indices] - rest[indices]
+        np.maximum.at(bounds, self.point_cells()[indices], np.sqrt(np.einsum('ij,ij->i', offset, offset)))
+
+    def query_capsule_displaced(self, a, b, radius, bounds):
+        """
+        query_capsule() over points that may have moved from their rest position by up to
+        bounds[cell] (per cell, see displacement_bounds). Cells that moved less than
+        DISPLACED_SLACK cells are covered by widening the capsule by that much; the ones that
+        moved farther are tested against the segment with their own bound. Inserted points are
+        always candidates.
+        """
+        a = np.asarray(a, dtype=np.float64)
+        b = np.asarray(b, dtype=np.float64)
+        slack = DISPLACED_SLACK * self.cell_size
+        parts = [self.query_capsule(a, b, radius + slack)]
+        far = np.flatnonzero(bounds > slack)
+        if len(far):
+            centers = (_cell_coords(self.keys[far]) + 0.5) * self.cell_size
+            reach = radius + bounds[far] + 0.87 * self.cell_size # + half the cell diagonal
+            near = far[segment_distance(centers, a, b) <= reach]
+            if len(near):
+                parts.append(self._query_keys(self.keys[near]))
+        if len(self.extra_indices):
+            parts.append(self.extra_indices)
+        return np.unique(np.concatenate(parts)) if len(parts) > 1 else parts[0]
+
+    def query_box(self, lo, hi):
+        """ Indices of the points in every cell overlapping the box [lo, hi]. """
+        keys = _cell_keys(self._cells_of_box(lo, hi))
+        extra = self.extra_indices[np.isin(self.extra_keys, keys)] if len(self.extra_keys) else None
+        found = self._query_keys(keys)
+        return found if extra is None or len(extra) == 0 else np.concatenate([found, extra])
+
+    def _query_keys(self, keys):
+        slot = np.searchsorted(self.keys, keys)
+        inside = slot < len(self.keys)
+        slot, keys = slot[inside], keys[inside]
+        slot = slot[self.keys[slot] == keys] # Only cells that actually hold points
+        if len(slot) == 0:
+            return np.empty(0, dtype=np.int32)
+        # Concatenate the slices [start, end) of every hit cell without a Python loop
+        starts = self.starts[slot]
+        lengths = self.ends[slot] - starts
+        first = np.cumsum(lengths) - lengths
+        return self.order[np.repeat(starts - first, lengths) + np.arange(lengths.sum())]
+
+    def query_spheres(self, centers, radii):
+        """
+        Batched query for several spheres.
+        Returns (point indices, sphere indices), one entry per candidate pair.
+        """
+        indices, owners = [], []
+        for i, (center, radius) in enumerate(zip(centers, radii)):
+            idx = self.query_sphere(center, radius)
+            indices.append(idx)
+            owners.append(np.full(len(idx), i, dtype=np.int32))
+        if not indices:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        return np.concatenate(indices), np.concatenate(owners)
@@ -0,0 +1,88 @@
+import numpy as np
+from panda3d.core import BoundingSphere, BoundingVolume, Point3
+
+# NOTE: Vertex clusters of a soft body and their visibility from the camera.
+# The rest pose is split into clusters by a coarse grid (CLUSTER_CELLS per axis). Every
+# cluster keeps a bounding sphere and a cone around its rest normals. Each frame the render
+# thread classifies the clusters in mesh space: a cluster is hidden when its sphere lies
+# outside the view frustum, or when all of its normals face away from the camera (normal-cone
+# test, so only closed back sides are culled). With the PBD solver, SoftBody steps visible
+# clusters and clusters a contact reaches every step; hidden ones take turns, each stepped every
+# HIDDEN_INTERVAL steps over the time it fell behind, so the cost per step stays even. Only the
+# edge constraints of the stepped vertices are projected (their hidden neighbours stay pinned).
+# Other solvers step the whole body (explicit steps are cheaper whole than gathered, implicit
+# couples every vertex), so nose.py makes PBD its default while culling is on and skips the
+# classification for the other solvers.
+# Clusters come back to full rate on the first step after they are visible again.
+
+CLUSTER_CELLS = 6        # Grid cells per axis (at most CLUSTER_CELLS^3 clusters)
+VISIBILITY_MARGIN = 1.0  # Mesh units added to every bounding sphere (room for deformation)
+HIDDEN_INTERVAL = 4      # Hidden clusters are stepped every Nth physics step
+
+
+class VertexClusters:
+    def __init__(self, rest_positions, rest_normals, cells=CLUSTER_CELLS):
+        n = len(rest_positions)
+        lo, hi = rest_positions.min(axis=0), rest_positions.max(axis=0)
+        size = np.maximum((hi - lo) / cells, 1e-6)
+        cell = np.minimum(((rest_positions - lo) / size).astype(np.int64), cells - 1)
+        keys = (cell[:, 0] * cells + cell[:, 1]) * cells + cell[:, 2]
+        _, self.vertex_cluster = np.unique(keys, return_inverse=True)
+        self.vertex_cluster = self.vertex_cluster.reshape(-1).astype(np.int32)
+        self.num_vertices = n
+        self.count = int(self.vertex_cluster.max()) + 1 if n else 0
+        self.sizes = np.bincount(self.vertex_cluster, minlength=self.count)
+
+        # Bounding spheres (box center, farthest member)
+        self.centers = np.zeros((self.count, 3), dtype=np.float32)
+        self.radii = np.zeros(self.count, dtype=np.float32)
+        self.axes = np.zeros((self.count, 3), dtype=np.float32)
+        self.spread = np.zeros(self.count, dtype=np.float32) # Normal cone half angle (radians)
+        order = np.argsort(self.vertex_cluster, kind="stable")
+        bounds = np.searchsorted(self.vertex_cluster[order], np.arange(self.count + 1))
+        for c in range(self.count):
+            idx = order[bounds[c]:bounds[c + 1]]
+            p = rest_positions[idx]
+            center = (p.min(axis=0) + p.max(axis=0)) / 2
+            self.centers[c] = center
+            self.radii[c] = np.sqrt(((p - center) ** 2).sum(axis=1).max())
+            nrm = rest_normals[idx]
+            axis = nrm.sum(axis=0)
+            length = np.linalg.norm(axis)
+            if length < 1e-6:
+                self.spread[c] = np.pi # Normals cancel out: never back-facing
+                continue
+            axis /= length
+            self.axes[c] = axis
+            lengths = np.maximum(np.linalg.norm(nrm, axis=1), 1e-9)
+            self.spread[c] = float(np.arccos(np.clip((nrm @ axis / lengths).min(), -1.0, 1.0)))
+        self.radii += VISIBILITY_MARGIN
+
+    def classify(self, frustum, camera_pos):
+        """
+        Visible mask (count,) bool. frustum is the camera lens bounds and camera_pos the camera
+        position, both in mesh space.
+        """
+        visible = np.ones(self.count, dtype=bool)
+        # Back-facing: the whole cone points away from every point of the sphere
+        to_camera = np.asarray(camera_pos, dtype=np.float32) - self.centers
+        distance = np.linalg.norm(to_camera, axis=1)
+        outside = distance > self.radii
+        cos_view = np.einsum('ij,ij->i', self.axes, to_camera) / np.maximum(distance, 1e-9)
+        angular = np.arcsin(np.clip(self.radii / np.maximum(distance, 1e-9), 0.0, 1.0))
+        limit = self.spread + angular
+        visible &= ~(outside & (limit < np.pi / 2) & (cos_view < -np.sin(np.minimum(limit, np.pi / 2))))
+        # Frustum: only the clusters not already culled
+        for c in np.flatnonzero(visible):
+            sphere = BoundingSphere(Point3(*self.centers[c]), float(self.radii[c]))
+            if frustum.contains(sphere) == BoundingVolume.IF_no_intersection:
+                visible[c] = False
+        return visible
+
+    def touched(self, centers, radii):
+        """ Clusters whose sphere overlaps any of the given contact spheres (mesh space). """
+        hit = np.zeros(self.count, dtype=bool)
+        for center, radius in zip(centers, radii):
+            offset = self.centers - center
+            hit |= np.einsum('ij,ij->i', offset, offset) < (self.radii + radius) ** 2
+        return hit